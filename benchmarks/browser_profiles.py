@@ -0,0 +1,80 @@
+"""
+Measures Firefox startup and page load time of the default and lean
+browser profiles against the local fake site, and reports the change
+the lean profile makes to each.
+
+Usage, from the repository root:
+  python -m benchmarks.browser_profiles [--pages N] [--rows N] [--asset-latency SECONDS] [--json PATH]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from selenium.webdriver import Firefox
+
+from src.bpm_supreme.classes.BrowserProfile import BrowserProfile
+from tests.fake_site import FakeSite
+
+def measure(name, profile, options, site, pages):
+  """
+  Starts Firefox with profile and loads pages listing pages
+
+  Returns:
+    - dict of startup seconds, page load seconds and requests served
+  """
+  served = len(site.requests)
+  start = time.perf_counter()
+  driver = Firefox(profile, options=options)
+  startup = time.perf_counter() - start
+
+  loads = []
+  try:
+    for page in range(1, pages + 1):
+      start = time.perf_counter()
+      driver.get("{}?page={}".format(site.genre_url(), page))
+      loads.append(time.perf_counter() - start)
+  finally:
+    driver.quit()
+
+  return {"name": name, "startup": startup, "loads": loads, "requests": len(site.requests) - served}
+
+def main():
+  parser = argparse.ArgumentParser(description="Compare the default and lean Firefox profiles against a local fake site")
+  parser.add_argument("--pages", type=int, default=10, help="Listing pages loaded per profile")
+  parser.add_argument("--rows", type=int, default=25, help="Rows per listing page")
+  parser.add_argument("--asset-latency", type=float, default=0.05, help="Seconds added to every artwork and font response")
+  parser.add_argument("--json", help="Also write the results to this JSON file")
+  args = parser.parse_args()
+
+  download_path = tempfile.mkdtemp()
+  cache_path = os.path.join(tempfile.mkdtemp(), "firefox-cache")
+
+  with FakeSite(rows_per_page=args.rows, pages=args.pages, asset_latency=args.asset_latency) as site:
+    results = [
+      measure("default", BrowserProfile.default(download_path), BrowserProfile.options(headless=False), site, args.pages),
+      measure("lean", BrowserProfile.lean(download_path, cache_path), BrowserProfile.options(), site, args.pages),
+    ]
+
+  print("{:<10}{:>12}{:>16}{:>16}{:>12}".format("profile", "startup s", "first load s", "median load s", "requests"))
+  for result in results:
+    result["first_load"] = result["loads"][0]
+    result["median_load"] = statistics.median(result["loads"])
+    print("{:<10}{:>12.2f}{:>16.3f}{:>16.3f}{:>12}".format(
+      result["name"], result["startup"], result["first_load"], result["median_load"], result["requests"]))
+
+  # Change made by the lean profile, relative to the default one
+  before, after = results
+  change = {key: (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0 for key in ("startup", "first_load", "median_load", "requests")}
+  print("{:<10}{:>+11.0f}%{:>+15.0f}%{:>+15.0f}%{:>+11.0f}%".format(
+    "change", change["startup"], change["first_load"], change["median_load"], change["requests"]))
+
+  if args.json:
+    with open(args.json, "w") as output:
+      json.dump({"args": vars(args), "profiles": results, "change_percent": change}, output, indent=2)
+
+if __name__ == "__main__":
+  main()
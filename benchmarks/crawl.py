@@ -0,0 +1,136 @@
+"""
+End-to-end crawl benchmarks against the local fake site. Every crawl
+method runs with an empty library, and the runner reports rows/sec,
+downloads/sec and WebDriver commands per row, counted by DriverMetrics
+along with the crawl phase they were sent in.
+
+Usage, from the repository root:
+  python -m benchmarks.crawl [--pages N] [--rows N] [--history N] [--latency SECONDS] [--http] [--json PATH]
+"""
+
+import argparse
+import collections
+import json
+import tempfile
+import time
+
+from selenium.webdriver import Firefox
+
+from src.bpm_supreme.classes.BpmSupreme import BpmSupreme
+from src.bpm_supreme.classes.BrowserProfile import BrowserProfile
+from src.bpm_supreme.classes.DownloadWatcher import DownloadWatcher
+from src.bpm_supreme.classes.DriverMetrics import DriverMetrics
+from src.bpm_supreme.classes.HttpDownloader import HttpDownloader
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+from src.bpm_supreme.classes.RateLimiter import RateLimiter
+from tests.fake_site import FakeSite
+
+SCENARIOS = ("download_genre", "download_exclusives", "download_new_releases", "download_account_history")
+
+def command_counts(metrics):
+  """
+  Returns a collections.Counter of crawl phase to the number of
+  WebDriver commands metrics recorded in it
+  """
+  counts = collections.Counter()
+  for entry in metrics.to_json()["commands"]:
+    counts[entry["phase"]] += entry["count"]
+  return counts
+
+def run(scenario, driver, metrics, site, download_path, args, login=False):
+  """
+  Runs one crawl method against site with an empty library
+
+  Returns:
+    - dict of the scenario's measurements
+  """
+  http_downloader = HttpDownloader(download_path) if args.http else None
+  download_watcher = DownloadWatcher(download_path) if not args.http else None
+
+  account = BpmSupreme(driver, "benchmark@example.com", "password", download_path,
+    http_downloader=http_downloader,
+    download_workers=HttpDownloader.WORKERS if http_downloader else None,
+    rate_limiter=RateLimiter(rate=args.rate, max_rate=args.rate),
+    download_watcher=download_watcher,
+    library=LibraryIndex())
+  site.configure(account)
+
+  if login:
+    account.login()
+
+  served = sum(1 for path in site.requests if path.startswith("/download/"))
+  sent = command_counts(metrics)
+  start = time.perf_counter()
+
+  if scenario == "download_genre":
+    account.download_genre(site.genre_url("dance"), args.pages)
+    rows = args.pages * args.rows
+  elif scenario == "download_exclusives":
+    account.download_exclusives(args.pages)
+    rows = args.pages * args.rows
+  elif scenario == "download_new_releases":
+    account.download_new_releases(args.pages)
+    rows = args.pages * args.rows
+  else:
+    account.download_account_history(max_rows=args.history)
+    rows = args.history
+
+  elapsed = time.perf_counter() - start
+  if http_downloader:
+    http_downloader.close()
+  if download_watcher:
+    download_watcher.close()
+
+  downloads = sum(1 for path in site.requests if path.startswith("/download/")) - served
+  phases = command_counts(metrics)
+  phases.subtract(sent)
+  sent = sum(phases.values())
+  return {
+    "scenario": scenario,
+    "rows": rows,
+    "downloads": downloads,
+    "seconds": elapsed,
+    "rows_per_second": rows / elapsed,
+    "downloads_per_second": downloads / elapsed,
+    "commands": sent,
+    "commands_per_row": sent / rows if rows else 0.0,
+    "commands_by_phase": {phase: count for phase, count in sorted(phases.items()) if count},
+  }
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark the crawl methods against a local fake site")
+  parser.add_argument("--pages", type=int, default=3, help="Listing pages crawled")
+  parser.add_argument("--rows", type=int, default=25, help="Rows per listing page")
+  parser.add_argument("--history", type=int, default=100, help="Download history rows")
+  parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every page and API response")
+  parser.add_argument("--rate", type=float, default=20.0, help="Downloads per second allowed by the rate limiter")
+  parser.add_argument("--http", action="store_true", help="Download over HTTP instead of clicking")
+  parser.add_argument("--headed", action="store_true", help="Show the browser window")
+  parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Crawl method to run, by default all of them")
+  parser.add_argument("--json", help="Also write the results to this JSON file")
+  args = parser.parse_args()
+
+  results = []
+  download_path = tempfile.mkdtemp()
+  with FakeSite(rows_per_page=args.rows, pages=args.pages, history_rows=args.history, latency=args.latency) as site:
+    driver = Firefox(BrowserProfile.lean(download_path, cache_path=None), options=BrowserProfile.options(headless=not args.headed))
+    metrics = DriverMetrics()
+    metrics.instrument(driver)
+    try:
+      for index, scenario in enumerate(args.scenario or SCENARIOS):
+        results.append(run(scenario, driver, metrics, site, download_path, args, login=index == 0))
+    finally:
+      driver.quit()
+
+  print("{:<26}{:>8}{:>11}{:>10}{:>10}{:>13}{:>14}".format("scenario", "rows", "downloads", "seconds", "rows/s", "downloads/s", "commands/row"))
+  for result in results:
+    print("{scenario:<26}{rows:>8}{downloads:>11}{seconds:>10.2f}{rows_per_second:>10.1f}{downloads_per_second:>13.2f}{commands_per_row:>14.2f}".format(**result))
+  print()
+  print(metrics.report())
+
+  if args.json:
+    with open(args.json, "w") as output:
+      json.dump(results, output, indent=2)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,109 @@
+"""
+Benchmarks fuzzy duplicate lookups on a synthetic library, and reports
+the near-duplicate pairs found in existing library directories.
+
+Usage, from the repository root:
+  python -m benchmarks.fuzzy [--entries N] [--words N] [--lookups N] [--threshold T] [--library PATH ...] [--json PATH]
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+from src.bpm_supreme.classes.FuzzyMatcher import FuzzyMatcher
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+
+SYLLABLES = ("ba", "be", "bo", "da", "di", "do", "ka", "ke", "la", "li", "lo", "ma", "me", "mi", "na", "ne", "no", "ra",
+  "re", "ri", "sa", "se", "so", "ta", "te", "to", "va", "vi", "ya", "yo", "za", "ch", "sh", "th", "st", "tr")
+VERSIONS = ("Intro Dirty", "Intro Clean", "Quick Hit Dirty", "Quick Hit Clean", "Dirty", "Clean", "Clean Short Edit")
+
+def vocabulary(count, generator):
+  """
+  Returns count pseudo-words built from SYLLABLES, standing in for the
+  vocabulary of a real catalog
+  """
+  return ["".join(generator.choice(SYLLABLES) for syllable in range(generator.randint(2, 4))) for word in range(count)]
+
+def synthetic_names(count, generator, words):
+  """
+  Returns count file names of the form "Artist - Title (Version).mp3"
+  """
+  names = []
+  for index in range(count):
+    title = " ".join(generator.choice(words).title() for word in range(generator.randint(1, 4)))
+    names.append("Artist {} - {} ({}).mp3".format(index % 5000, title, generator.choice(VERSIONS)))
+  return names
+
+def typo(text, generator):
+  """
+  Drops one character of text
+  """
+  index = generator.randrange(len(text))
+  return text[:index] + text[index + 1:]
+
+def lookups_per_second(library, queries):
+  start = time.perf_counter()
+  found = sum(1 for query in queries if query in library)
+  elapsed = time.perf_counter() - start
+  return len(queries) / elapsed, found
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark fuzzy duplicate lookups and report near duplicates")
+  parser.add_argument("--entries", type=int, default=200000, help="Songs in the synthetic library")
+  parser.add_argument("--words", type=int, default=20000, help="Distinct words in the synthetic titles")
+  parser.add_argument("--lookups", type=int, default=5000, help="Lookups per measurement")
+  parser.add_argument("--threshold", type=float, default=FuzzyMatcher.THRESHOLD, help="Title similarity of a match")
+  parser.add_argument("--library", nargs="*", default=[], help="Library directories to report near duplicates of")
+  parser.add_argument("--json", help="Also write the results to this JSON file")
+  args = parser.parse_args()
+
+  generator = random.Random(0)
+  words = vocabulary(args.words, generator)
+  names = synthetic_names(args.entries, generator, words)
+
+  start = time.perf_counter()
+  exact = LibraryIndex(names)
+  exact_build = time.perf_counter() - start
+
+  start = time.perf_counter()
+  fuzzy = LibraryIndex(names, fuzzy_threshold=args.threshold)
+  fuzzy_build = time.perf_counter() - start
+
+  # Misses are the worst case: every lookup falls through to the trigram index
+  sample = generator.sample(names, args.lookups)
+  queries = {
+    "exact hit": [LibraryIndex.parse_name(name) for name in sample],
+    "near miss": [(artist, typo(title, generator), version) for artist, title, version in map(LibraryIndex.parse_name, sample)],
+    "miss": [("Nobody", " ".join(generator.sample(words, 3)).title(), generator.choice(VERSIONS)) for index in range(args.lookups)],
+  }
+
+  print("{} entries, exact index built in {:.2f}s, fuzzy in {:.2f}s".format(args.entries, exact_build, fuzzy_build))
+  print("{:<12}{:>18}{:>10}{:>18}{:>10}".format("lookup", "exact lookups/s", "found", "fuzzy lookups/s", "found"))
+  results = {"entries": args.entries, "threshold": args.threshold, "exact_build": exact_build, "fuzzy_build": fuzzy_build, "lookups": []}
+  for kind, batch in queries.items():
+    exact_rate, exact_found = lookups_per_second(exact, batch)
+    fuzzy_rate, fuzzy_found = lookups_per_second(fuzzy, batch)
+    print("{:<12}{:>18.0f}{:>10}{:>18.0f}{:>10}".format(kind, exact_rate, exact_found, fuzzy_rate, fuzzy_found))
+    results["lookups"].append({"kind": kind, "exact_per_second": exact_rate, "exact_found": exact_found,
+      "fuzzy_per_second": fuzzy_rate, "fuzzy_found": fuzzy_found})
+
+  if args.library:
+    files = []
+    for path in args.library:
+      for directory, subdirectories, filenames in os.walk(path):
+        files.extend(name for name in filenames if name.lower().endswith(LibraryIndex.EXTENSIONS))
+
+    pairs = LibraryIndex(files, fuzzy_threshold=args.threshold).near_duplicates()
+    print("\n{} near-duplicate pairs among {} files".format(len(pairs), len(files)))
+    for score, name, other in pairs:
+      print("{:.2f}  {}  |  {}".format(score, name, other))
+    results["near_duplicates"] = [{"similarity": score, "first": name, "second": other} for score, name, other in pairs]
+
+  if args.json:
+    with open(args.json, "w") as output:
+      json.dump(results, output, indent=2)
+
+if __name__ == "__main__":
+  main()
@@ -6,5 +6,6 @@ setup(
     package_dir={"":"src"},
 
     scripts=["src/bpm_supreme/download.py"],
-    install_requires=["selenium>=3.141.0"]
+    install_requires=["selenium>=3.141.0"],
+    extras_require={"session": ["cryptography"]}
 )
\ No newline at end of file
@@ -1,6 +1,5 @@
 # Selenium imports
 from selenium.webdriver import Firefox
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import JavascriptException
@@ -13,6 +12,39 @@ from selenium.webdriver.common.by import By
 import time
 import getpass
 import os
+from urllib.parse import parse_qsl
+from urllib.parse import unquote
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+
+# Local imports
+try:
+  from .LibraryCache import LibraryCache
+  from .LibraryScanner import LibraryScanner
+  from .DownloadPipeline import DownloadPipeline
+  from .HttpDownloader import HttpDownloader
+  from .RateLimiter import RateLimiter
+  from .SessionStore import SessionStore
+  from .CrawlJournal import CrawlJournal
+  from .DownloadWatcher import DownloadWatcher
+  from .VersionPolicy import VersionPolicy
+  from .PageEvents import PageEvents
+  from .DriverMetrics import DriverMetrics
+  from .DownloadPlan import DownloadPlan
+except ImportError:
+  from LibraryCache import LibraryCache
+  from LibraryScanner import LibraryScanner
+  from DownloadPipeline import DownloadPipeline
+  from HttpDownloader import HttpDownloader
+  from RateLimiter import RateLimiter
+  from SessionStore import SessionStore
+  from CrawlJournal import CrawlJournal
+  from DownloadWatcher import DownloadWatcher
+  from VersionPolicy import VersionPolicy
+  from PageEvents import PageEvents
+  from DriverMetrics import DriverMetrics
+  from DownloadPlan import DownloadPlan
 
 class BpmSupreme:  
   """
@@ -24,14 +56,98 @@ class BpmSupreme:
     - download_library()
     - scroll_page()
     - detect_duplicates()
+    - extract_page()
+    - download()
+    - plan()
+    - execute()
   """
 
+  # Site locations, overridable per instance e.g. to point at a stand-in site
+  LOGIN_URL = "https://www.bpmsupreme.com/login"
+  APP_URL = "https://app.bpmsupreme.com"
+
+  # Query parameter selecting a page of a paginated listing
+  PAGE_PARAMETER = "page"
+
   # Amount of time to wait for a WebElement to load
   TIMEOUT = 120
+  SESSION_PROBE_TIMEOUT = 10
   SCROLL_PAGE_WAIT_TIME = 5
   DOWNLOAD_RATE_LIMIT_TIMEOUT = 2
+
+  # Consecutive known rows after which an incremental crawl stops
+  INCREMENTAL_STOP_ROWS = 10
+
+  # Times a clicked download that never landed is clicked again
+  MAX_REQUEUES = 1
+
+  # Version priority tiers of every page type, see VersionPolicy
+  VERSION_TIERS = {
+    # Intro and Quick Hit Dirty, only done when both are present,
+    # then the first of the clean tiers that has any version present
+    "genre": (
+      (("Intro Dirty", "Quick Hit Dirty"), VersionPolicy.ALL),
+      (("Intro Clean", "Quick Hit Clean"), VersionPolicy.ANY),
+      (("Dirty", "Clean"), VersionPolicy.ANY),
+      (("Clean Short Edit",), VersionPolicy.ANY),
+    ),
+    # Dirty short and extended, else dirty, else clean, else clean
+    # extended and short
+    "exclusives": (
+      (("Dirty Short Edit", "Dirty Extended"), VersionPolicy.ANY),
+      (("Dirty",), VersionPolicy.ANY),
+      (("Clean",), VersionPolicy.ANY),
+      (("Clean Extended", "Clean Short Edit"), VersionPolicy.ANY),
+    ),
+    "new_releases": (
+      (("Intro Dirty", "Quick Hit Dirty"), VersionPolicy.ANY),
+    ),
+  }
+
+  # Collects every row-item on the page as plain JSON in one round trip
+  EXTRACT_PAGE_SCRIPT = """
+    window.__bpmPage = (window.__bpmPage || 0) + 1;
+    var rows = document.querySelectorAll('.table-media .row-item');
+    var result = [];
+    for (var i = 0; i < rows.length; ++i) {
+      var track = rows[i].querySelector('.row-track-name span');
+      var artists = [];
+      var links = rows[i].querySelectorAll('.row-artist .link');
+      for (var j = 0; j < links.length; ++j) {
+        artists.push(links[j].innerText);
+      }
+      var versions = {};
+      var urls = {};
+      var buttons = rows[i].getElementsByClassName('tag-link');
+      for (var j = 0; j < buttons.length; ++j) {
+        var label = buttons[j].innerText.trim();
+        if (label in versions) continue;
+        var id = window.__bpmPage + '-' + i + '-' + j;
+        buttons[j].setAttribute('data-bpm-button', id);
+        versions[label] = id;
+        var link = buttons[j].closest('a[href]');
+        urls[label] = buttons[j].getAttribute('data-download-url') || (link ? link.href : null);
+      }
+      result.push({index: i, name: track ? track.innerText : 'Unknown', artists: artists, versions: versions, urls: urls});
+    }
+    return result;
+  """
   
-  def __init__(self, driver, username, password, download_path, duplicate_path):
+  # Reads and writes every localStorage item of the current domain
+  EXPORT_LOCAL_STORAGE_SCRIPT = """
+    var items = {};
+    for (var i = 0; i < localStorage.length; ++i) {
+      items[localStorage.key(i)] = localStorage.getItem(localStorage.key(i));
+    }
+    return items;
+  """
+  IMPORT_LOCAL_STORAGE_SCRIPT = """
+    for (var key in arguments[0]) {
+      localStorage.setItem(key, arguments[0][key]);
+    }
+  """
+
+  def __init__(self, driver, username, password, download_path, *library_paths, cache_path=None, rebuild_library=False, scan_workers=LibraryScanner.WORKERS, http_downloader=None, download_workers=None, rate_limiter=None, library=None, session_path=None, journal_path=None, download_watcher=None, version_tiers=None, metrics=None, fuzzy_threshold=None, read_tags=False, organizer=None):
     """
     Constructor for BpmSupreme object
 
@@ -39,6 +155,23 @@ class BpmSupreme:
       - driver: WebDriver object
       - username: Username string
       - password: Password string
+      - download_path: Directory songs are downloaded into
+      - library_paths: Any number of library root directories
+      - cache_path: Optional SQLite file caching library directory listings
+      - rebuild_library: Ignore the library cache and rescan every directory
+      - scan_workers: Number of library directories listed concurrently
+      - http_downloader: Optional HttpDownloader used instead of clicking download buttons
+      - download_workers: Number of downloader threads draining a DownloadPipeline of HTTP downloads, or None to download inline
+      - rate_limiter: RateLimiter shared by every download, by default one download per DOWNLOAD_RATE_LIMIT_TIMEOUT
+      - library: LibraryIndex to share instead of scanning library_paths
+      - session_path: Optional encrypted file the logged in session is saved to, letting later runs skip login()
+      - journal_path: Optional CrawlJournal file recording crawl progress, letting download_genre() resume
+      - download_watcher: Optional DownloadWatcher confirming that clicked downloads land in download_path
+      - version_tiers: Optional dict of page type to tiers overriding VERSION_TIERS
+      - metrics: Optional DriverMetrics counting and timing every WebDriver command by crawl phase
+      - fuzzy_threshold: Optional title similarity above which near duplicates in the library are skipped too, see FuzzyMatcher
+      - read_tags: Index library songs by the tags of their files too, see TagReader
+      - organizer: Optional Organizer moving completed downloads into the library during the crawl
     """
     # Check argument types
     # Check driver
@@ -54,24 +187,58 @@ class BpmSupreme:
     if not isinstance(download_path, str):
       raise TypeError("Wrong type: Expected str for download_path; Got {}".format(type(download_path)))
       
-    if not isinstance(duplicate_path, str):
-      raise TypeError("Wrong type: Expected str for duplicate_path; Got {}".format(type(duplicate_path)))
+    for library_path in library_paths:
+      if not isinstance(library_path, str):
+        raise TypeError("Wrong type: Expected str for library_paths; Got {}".format(type(library_path)))
 
     # Check path is valid
-    if not os.path.isdir(download_path) or not os.path.isdir(duplicate_path):
-      raise ValueError("Bad path: Expected valid path")
+    for path in (download_path,) + library_paths:
+      if not os.path.isdir(path):
+        raise ValueError("Bad path: Expected valid path")
     
     self.driver = driver
     self._username = username
     self._password = password
-    self.path = download_path
-    self.local_library = self.update_library()
-    self.path = duplicate_path
-    self.local_library.update(self.update_library())
+    self.library_cache = LibraryCache(cache_path) if cache_path is not None else None
+    self.scan_workers = scan_workers
+    self.read_tags = read_tags
+    self.download_path = download_path
+    self.library_paths = (download_path,) + library_paths
+    self.metrics = metrics
+    if metrics is not None:
+      metrics.instrument(driver)
+    self.events = PageEvents(driver, BpmSupreme.TIMEOUT)
+    self.journal = CrawlJournal(journal_path) if journal_path is not None else None
+    self.session_store = SessionStore(session_path, password) if session_path is not None else None
+    self.local_library = library if library is not None else self.update_library(rebuild_library)
+    if fuzzy_threshold is not None and self.local_library.fuzzy is None:
+      self.local_library.enable_fuzzy(fuzzy_threshold)
+    self.http_downloader = http_downloader
+    self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(rate=1 / BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
+    self.policies = {page_type: VersionPolicy(tiers) for page_type, tiers in dict(BpmSupreme.VERSION_TIERS, **(version_tiers or {})).items()}
+    self.organizer = organizer
+    if organizer is not None and organizer.library is None:
+      organizer.library = self.local_library
+    self.genre = None
+    self.location = None
+    self.requeues = dict()
+    self._requeue_later = []
+    self.failure_listeners = []
+    self._confirmed = set()
+    self.download_watcher = download_watcher
+    if download_watcher is not None and download_watcher.library is None:
+      download_watcher.library = self.local_library
+    if download_watcher is not None and download_watcher.organizer is None:
+      download_watcher.organizer = organizer
+    self.download_workers = download_workers
+    self.pipeline = None
 
   def login(self):
     """
-    Logs into https://www.bpmsupreme.com using the defined user credentials
+    Logs into https://www.bpmsupreme.com using the defined user credentials.
+    When a session store is configured, a saved session is restored 
+    instead if it is still valid, and a new session is saved after
+    logging in.
     
     Args:
       - none
@@ -80,47 +247,58 @@ class BpmSupreme:
       - True if successful login
       - False if failed login
     """
-    # Get the login page and let the page load
-    self.driver.get("https://www.bpmsupreme.com/login")
+    with self.phase("login"):
+      if self.restore_session():
+        return True
+
+      # Get the login page and let the page load
+      self.driver.get(self.LOGIN_URL)
 
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.invisibility_of_element((By.CLASS_NAME, "loader")))
+      self.events.wait_until_gone(".loader")
 
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.ID, "login-form-email")))
+      self.events.wait_for("#login-form-email")
     
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.ID, "login-form-password")))
+      self.events.wait_for("#login-form-password")
 
-    # Input user credentials
-    user_name_box = self.driver.find_element(By.ID, "login-form-email")
-    user_name_box.click()
-    user_name_box.send_keys(self._username)
+      # Input user credentials
+      user_name_box = self.driver.find_element(By.ID, "login-form-email")
+      user_name_box.click()
+      user_name_box.send_keys(self._username)
 
-    # Input password credentials
-    pass_box = self.driver.find_element(By.ID, "login-form-password")
-    pass_box.click()
-    pass_box.send_keys(self._password + Keys.ENTER)
+      # Input password credentials
+      pass_box = self.driver.find_element(By.ID, "login-form-password")
+      pass_box.click()
+      pass_box.send_keys(self._password + Keys.ENTER)
 
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.visibility_of_element_located((By.CSS_SELECTOR, ".account-menu-toggle")))
+      self.events.wait_for(".account-menu-toggle")
 
-    # Check if site log in was successful
-    if self.driver.current_url == "https://www.bpmsupreme.com/login":
-      # Site login failed
-      raise ValueError("Could not log into account using credentials:\nUser: {}\n Password: {}".format(self._username, self._password))
+      # Check if site log in was successful
+      if self.driver.current_url == self.LOGIN_URL:
+        # Site login failed
+        raise ValueError("Could not log into account using credentials:\nUser: {}\n Password: {}".format(self._username, self._password))
+
+    if self.session_store:
+      self.session_store.save(self.export_session())
 
     return True
           
-  def download_account_history(self):
+  def download_account_history(self, bulk=True, max_rows=None):
     """
     Downloads account-history library
     
     Args:
-      - none
+      - bulk: Scroll until the history is loaded, then download every
+        row as a batch instead of walking and scrolling row by row
+      - max_rows: Optional number of history rows to load in bulk mode
     """
 
-    # Navigate to download-history
-    self.driver.get("https://app.bpmsupreme.com/account/download-history")
+    # Navigate to download-history and let the page load
+    self.load_page(self.APP_URL + "/account/download-history", ".table-media")
 
-    # Let the page load
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "table-media")))
+    if bulk:
+      self.download_rows(self.load_history(max_rows))
+      self.finish_crawl()
+      return
     
     # Initialize the current song to first row-container of div.table-media
     current_song = Song(self.driver, self.driver.execute_script(
@@ -135,15 +313,10 @@ class BpmSupreme:
     failed_downloads = set()
     try:
       while current_song.get_next_song():    
-        # If current song is a duplicate, track it
-        if self.check_duplicate(current_song):
-          print("Skipped duplicate: {} - {}".format(current_song.artist, current_song.name))
+        # Track duplicates and songs that could not be downloaded
+        if not self.download(current_song):
+          print("Skipped: {} - {}".format(current_song.artist, current_song.name))
           failed_downloads.add(current_song)
-          current_song = current_song.get_next_song()
-          continue
-        print("Downloading {} - {}".format(current_song.artist, current_song.name))
-        if current_song.download_song() == False:
-          print("Could not download {} - {}".format(current_song.artist, current_song.name))
 
         while self.scroll_page() != True:
           pass
@@ -156,123 +329,71 @@ class BpmSupreme:
       if len(self.local_library) < len(failed_downloads):
         print("Did not download all songs!")
 
+    self.finish_crawl()
+
+  def load_history(self, max_rows=None):
+    """
+    Scrolls the download history until it is fully loaded, or holds
+    max_rows rows, then extracts every row in one round trip
+
+    Args:
+      - max_rows: Optional number of rows to stop at
+
+    Returns:
+      - List of row dicts, see extract_page()
+    """
+    start = time.perf_counter()
+    loaded = self.events.scroll_to_end(".table-media .row-item", max_rows, BpmSupreme.SCROLL_PAGE_WAIT_TIME, busy=".loader")
+    rows = self.extract_page()[:max_rows]
+    elapsed = time.perf_counter() - start
+
+    print("Loaded {} history rows in {} scroll rounds and {:.1f}s ({:.1f} rows/sec)".format(
+      len(rows), loaded["rounds"], elapsed, len(rows) / elapsed if elapsed else 0.0))
+    return rows
+
+  def download_rows(self, rows):
+    """
+    Downloads every version listed in each row as a batch
+
+    Args:
+      - rows: List of row dicts, see extract_page()
+
+    Returns:
+      - Number of songs downloaded or queued
+    """
+    songs = [Song.from_row(self.driver, row, version) for row in rows for version in row["versions"]]
+    return sum(1 for song in songs if self.download(song))
+
   def download_new_releases(self, page_count):
-    # Get the new-releases page
-    self.driver.get("https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b")
+    """
+    Download "Intro Dirty" and "Quick Hit Dirty" versions from the 
+    Hip-Hop/R&B new-releases page
 
-    # Wait until a .row-container is ready to be clickable
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "row-container")))
+    Args:
+      - page_count: Number of pages from 1 to page_count
+
+    Returns:
+      - none
+    """
+    # Get the new-releases page
+    self.load_page(self.APP_URL + "/new-releases/audio/hip-hop-r%26b")
 
     # Per amount of pages to download
     for page in range(page_count):
-      WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "row-container")))
+      # Wait until a .row-container is ready to be clickable
+      self.load_page()
 
-      # Initialize current_song to first row-item container on the page
-      current_song = self.driver.execute_script(
-      """
-        return document.getElementsByClassName('table-media')[0].firstChild.firstChild.firstChild
-      """)
-      
-      # While there is a next row-item
-      while current_song:
-        # Initialize booleans for duplicate detection on "Quick Hit Dirty" and "Intro Dirty" song versions
-        quick_hit_dirty_is_duplicate = False
-        intro_dirty_is_duplicate = False
-        intro_dirty_is_present = True
-        quick_hit_dirty_is_present = True
-      
-        # Find the "Intro Dirty" and "Quick Hit Dirty" download buttons
-        song_versions = self.driver.execute_script(
-        """
-          return arguments[0].getElementsByClassName('tag-link')
-        """, current_song
-        )
+      for row in self.extract_page():
+        self._download_row(row, self.policies["new_releases"])
+
+      print("Reached end of page: {}".format(page + 1))
 
-        # Attempt to find "intro dirty" download button
-        try:
-          intro_dirty = Song(self.driver, current_song, self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Intro Dirty')
-                return arguments[0][i];
-            }
-            return null;
-          """, song_versions))
-
-        except JavascriptException:
-          print("Failed finding 'Intro Dirty' download button for {} - {}".format(intro_dirty.artist, intro_dirty.name))
-          intro_dirty_is_present = False
-        
-        except TypeError:
-          print("Failed finding 'Intro Dirty' button for {} - {}".format(intro_dirty.artist, intro_dirty.name))
-          intro_dirty_is_present = False
-
-        # Attempt to find "quick hit dirty" download button
-        try:
-          quick_hit_dirty = Song(self.driver, current_song, self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Quick Hit Dirty')
-                return arguments[0][i];
-            }
-            return null;
-          """, song_versions))
-        
-        except JavascriptException:
-          print("Failed finding download 'Quick Hit Dirty' button for {} - {}".format(quick_hit_dirty.artist, quick_hit_dirty.name))
-          quick_hit_dirty_is_present = False
-
-        except TypeError:
-          print("Failed finding download 'Quick Hit Dirty' button for {} - {}".format(intro_dirty.artist, intro_dirty.name))
-          quick_hit_dirty_is_present = False
-
-        # Only check for duplicates if there is an existing download button for it
-        if intro_dirty_is_present:
-          # Check for duplicates
-          intro_dirty.name += " (Intro Dirty)"
-          intro_dirty_is_duplicate = self.check_duplicate(intro_dirty)
-        
-        if quick_hit_dirty_is_present:
-          quick_hit_dirty.name += " (Quick Hit Dirty)"
-          quick_hit_dirty_is_duplicate = self.check_duplicate(quick_hit_dirty)
-
-        # Download songs if not duplicate
-        if not intro_dirty_is_duplicate and intro_dirty_is_present:
-          print("Downloading: {} - {}".format(intro_dirty.artist, intro_dirty.name))
-          intro_dirty.download_song()
-          
-        if not quick_hit_dirty_is_duplicate and quick_hit_dirty_is_present:
-          print("Downloading: {} - {}".format(quick_hit_dirty.artist, quick_hit_dirty.name))          
-          quick_hit_dirty.download_song()
-        
-        # Set current_song to next song
-        try:
-          current_song = self.driver.execute_script(
-          """
-          arguments[0].parentNode.parentNode.nextSibling.getElementsByClassName('row-item')[0] ? return arguments[0].parentNode.parentNode.nextSibling.getElementsByClassName('row-item')[0] : return false
-          """, current_song)
-        except JavascriptException:
-          print("Reached end of page: {}".format(page + 1))
-          current_song = None
-        
       # Find and click the next page button
-      try:
-        WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "pagination")))
-        pagination = self.driver.find_element_by_class_name("pagination").find_elements_by_tag_name("li")
-        next_page = self.driver.execute_script(
-        """
-          for (var i = 0; i < arguments[0].length; ++i) {
-            if (arguments[0][i].innerText === '›') {
-              return arguments[0][i].firstChild
-            }
-          }
-          return null
-        """, pagination)
-        next_page.click()
-      except JavascriptException(stacktrace=True):
-        print("Unable to reach next page")
+      if page + 1 == page_count or not self.get_next_page():
         break
 
+    self.finish_crawl()
+
   def download_exclusives(self, page_count):
     """
     Download exclusives page from BpmSupreme New Releases > Exclusives
@@ -290,258 +411,47 @@ class BpmSupreme:
       If no clean, get clean extended and clean short edit
     """
     # Get the exclusives page
-    self.driver.get("https://app.bpmsupreme.com/new-releases/audio/exclusives")
-
-    # Wait until a .row container is ready to be clickable
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "row-container")))
+    self.load_page(self.APP_URL + "/new-releases/audio/exclusives")
 
     # Per amount of pages to download
     for page in range(page_count):
-      WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "row-container")))
-
-      # Initialize current_song to first row-item container on the page
-      current_song = self.driver.execute_script(
-      """
-        return document.getElementsByClassName('table-media')[0].firstChild.firstChild.firstChild.getElementsByClassName('row-item')[0]
-      """)  
-
-      # While there is a next row-item
-      while current_song:
-        # Find all song versions 
-        song_versions = self.driver.execute_script(
-          """
-            return arguments[0].getElementsByClassName('tag-link')
-          """, current_song
-        )
-
-        # Attempt to find "Dirty Short Edit" and "Dirty Extended" download buttons
-        dirty_short = self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Dirty Short Edit')
-                return arguments[0][i];
-            }
-            return null;
-          """
-        , song_versions)
-
-        # If there is a dirty short version, construct a Song()
-        if dirty_short:
-          dirty_short = Song(self.driver, current_song, dirty_short)
-          dirty_short.name += " (Dirty Short Edit)"
-
-          if self.check_duplicate(dirty_short):
-            print("Duplicate: {} - {}".format(dirty_short.artist, dirty_short.name))
-          else:
-            # Download the song 
-            print("Downloaded {} - {}: {}".format(dirty_short.artist, dirty_short.name, dirty_short.download_song()))
-            
-                  
-        dirty_extended = self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Dirty Extended')
-                return arguments[0][i];
-            }
-            return null;
-          """
-        , song_versions)
-
-        # If there is a dirty extended version, construct a Song()
-        if dirty_extended:
-          # Convert dirty extended to a Song() object
-          dirty_extended = Song(self.driver, current_song, dirty_extended)
-          dirty_extended.name += " (Dirty Extended)"
-          if self.check_duplicate(dirty_extended):
-            print("Duplicate: {} - {}".format(dirty_extended.artist, dirty_extended.name))
-          else:
-            # Download the song 
-            print("Downloaded {} - {}: {}".format(dirty_extended.artist, dirty_extended.name, dirty_extended.download_song()))
-            
-
-        # If either versions have been downloaded
-        if dirty_short or dirty_extended:
-          # Set current_song to next song
-          try:
-            current_song = self.driver.execute_script(
-            """
-            return arguments[0].parentNode.parentNode.parentNode.nextSibling.getElementsByClassName('row-item')[0]
-            """, current_song)
-            continue
-          except JavascriptException:
-            print("Reached end of page: {}".format(page + 1))
-            break
-
-        # Could not find 'dirty short' or 'dirty extended' so look for 'dirty'
-        dirty = self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Dirty')
-                return arguments[0][i];
-            }
-            return null;
-          """
-        , song_versions)
-
-        # If there is a 'dirty' version, construct a Song()
-        if dirty:
-          dirty = Song(self.driver, current_song, dirty)
-          dirty.name += " (Dirty)"
-
-          if self.check_duplicate(dirty):
-            print("Duplicate: {} - {}".format(dirty.artist, dirty.name))
-          else:
-            # Download the song 
-            print("Downloaded {} - {}: {}".format(dirty.artist, dirty.name, dirty.download_song()))
-            
-
-        # If there is a dirty version, skip to next song
-        if dirty:
-          # Set current_song to next song
-          try:
-            current_song = self.driver.execute_script(
-            """
-            return arguments[0].parentNode.parentNode.parentNode.nextSibling.getElementsByClassName('row-item')[0]
-            """, current_song)
-            continue
-          except JavascriptException:
-            print("Reached end of page: {}".format(page + 1))
-            break
-
-        # No 'dirty' version, so get 'clean' version
-        clean = self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Clean')
-                return arguments[0][i];
-            }
-            return null;
-          """
-        , song_versions)
-
-        # If there is a 'clean' version, construct a Song()
-        if clean:
-          clean = Song(self.driver, current_song, clean)
-          clean.name += " (Clean)"
-
-          if self.check_duplicate(clean):
-            print("Duplicate: {} - {}".format(clean.artist, clean.name))
-          else:
-            # Download the song 
-            print("Downloaded {} - {}: {}".format(clean.artist, clean.name, clean.download_song()))
-            
-
-        # If there is a clean version, skip to next song
-        if clean:
-          # Set current_song to next song
-          try:
-            current_song = self.driver.execute_script(
-            """
-            return arguments[0].parentNode.parentNode.parentNode.nextSibling.getElementsByClassName('row-item')[0]
-            """, current_song)
-            continue
-          except JavascriptException:
-            print("Reached end of page: {}".format(page + 1))
-            break
-
-        # If there is no 'clean' version, get 'clean extended' and 'clean short' edit
-        clean_extended = self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Clean Extended')
-                return arguments[0][i];
-            }
-            return null;
-          """
-        , song_versions)
+      # Wait until a .row container is ready to be clickable
+      self.load_page()
 
-        # If there is a 'clean extended' version, construct a Song()
-        if clean_extended:
-          clean_extended = Song(self.driver, current_song, clean_extended)
-          clean_extended.name += " (Clean Extended)"
+      for row in self.extract_page():
+        for song, result in self._download_row(row, self.policies["exclusives"]):
+          print("Downloaded {} - {}: {}".format(song.artist, song.name, result))
 
-          if self.check_duplicate(clean_extended):
-            print("Duplicate: {} - {}".format(clean_extended.artist, clean_extended.name))
-          else:
-            # Download the song 
-            print("Downloaded {} - {}: {}".format(clean_extended.artist, clean_extended.name, clean_extended.download_song()))
-            
-
-        clean_short = self.driver.execute_script(
-          """
-            for(var i = 0; i < arguments[0].length; ++i) {
-              if (arguments[0][i].innerText == 'Clean Short Edit')
-                return arguments[0][i];
-            }
-            return null;
-          """
-        , song_versions)
-
-        # If there is a 'Clean Short Edit' version, construct a Song()
-        if clean_short:
-          clean_short = Song(self.driver, current_song, clean_short)
-          clean_short.name += " (Clean Short Edit)"
-
-          if self.check_duplicate(clean_short):
-            print("Duplicate: {} - {}".format(clean_short.artist, clean_short.name))
-          else:
-            # Download the song 
-            print("Downloaded {} - {}: {}".format(clean_short.artist, clean_short.name, clean_short.download_song()))
-            
-
-        # If there is a 'Clean Short Edit' version or 'Clean Extended', skip to next song
-        if clean_extended or clean_short:
-          # Set current_song to next song
-          try:
-            current_song = self.driver.execute_script(
-            """
-            return arguments[0].parentNode.parentNode.parentNode.nextSibling.getElementsByClassName('row-item')[0]
-            """, current_song)
-            continue
-          except JavascriptException:
-            print("Reached end of page: {}".format(page + 1))
-            break
-        
-        # Move to the next song 
-        try:
-          current_song = self.driver.execute_script(
-          """
-          return arguments[0].parentNode.parentNode.parentNode.nextSibling.getElementsByClassName('row-item')[0]
-          """, current_song)
-        except JavascriptException:
-          print("Reached end of page: {}".format(page + 1))
-          break
+      print("Reached end of page: {}".format(page + 1))
 
       # Find and click the next page button after all songs have been parsed on page
-      try:
-        WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "pagination")))
-        pagination = self.driver.find_element_by_class_name("pagination").find_elements_by_tag_name("li")
-        next_page = self.driver.execute_script(
-        """
-          for (var i = 0; i < arguments[0].length; ++i) {
-            if (arguments[0][i].innerText === '›') {
-              return arguments[0][i].firstChild
-            }
-          }
-          return null
-        """, pagination)
-        next_page.click()
-      except JavascriptException(stacktrace=True):
-        print("Unable to reach next page")
+      if page + 1 == page_count or not self.get_next_page():
         break
 
-  def download_genre(self, page_url, page_count):
+    self.finish_crawl()
+
+  def download_genre(self, page_url, page_count, start_page=1, resume=False, policy=None, incremental=False, stop_rows=INCREMENTAL_STOP_ROWS):
     """
       Downloads songs according to order of priority
     
       Args:
         - page_url: Url of genre page
         - page_count: Number of pages to download
+        - start_page: Page number to start downloading from
+        - resume: Continue an unfinished crawl of page_url recorded in 
+          the journal, from its last page and skipping finished rows
+        - policy: VersionPolicy to use instead of the "genre" policy
+        - incremental: Stop at the first page, or run of stop_rows rows,
+          that is entirely known: rows within the high-water mark the
+          journal kept of the last crawl of page_url, or whose picked
+          versions are all in the library already. Listings are newest 
+          first, so everything after them was crawled before.
+        - stop_rows: Consecutive known rows after which an incremental crawl stops
 
       Returns:
         - none
     
-      Order of Priority
+      Default order of priority, VERSION_TIERS["genre"]
         1. Intro Dirty and Quick Hit Dirty
         2. Intro Clean and Quick Hit Clean
         3. Dirty and Clean
@@ -557,12 +467,26 @@ class BpmSupreme:
     # Check page_count amount
     if not page_count:
       raise ValueError("Error: Expected page_count greater than 0. Got {}".format(page_count))
-    
-    # Navigate to page_url
-    self.driver.get(page_url)
 
-    # Wait until a .row container is ready to be clickable
-    WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "row-container")))
+    if not isinstance(start_page, int) or start_page < 1:
+      raise ValueError("Error: Expected start_page greater than 0. Got {}".format(start_page))
+
+    if policy is None:
+      policy = self.policies["genre"]
+    elif not isinstance(policy, VersionPolicy):
+      raise TypeError("Wrong type: Expected VersionPolicy for policy; Got {}".format(type(policy)))
+
+    # Jump to the checkpointed page of an unfinished crawl
+    completed_rows = set()
+    checkpoint = self.journal.checkpoint(page_url) if resume and self.journal else None
+    if checkpoint and start_page <= checkpoint["page"] < start_page + page_count:
+      print("Resuming {} from page {} with {} rows done".format(page_url, checkpoint["page"], len(checkpoint["rows"])))
+      page_count -= checkpoint["page"] - start_page
+      start_page = checkpoint["page"]
+      completed_rows = checkpoint["rows"]
+    
+    # Navigate to page_url and wait until a .row container is ready to be clickable
+    self.load_page(self.page_url(page_url, start_page) if start_page > 1 else page_url)
     
     # Attempt to find a table-media container for songs
     url_isValid = self.driver.find_elements_by_class_name("table-media")
@@ -570,257 +494,687 @@ class BpmSupreme:
     if not url_isValid:
       raise ValueError("Invalid URL: {}".format(page_url))
 
-    for page in range(page_count):
+    # Rows seen by the last crawl, and the rows heading the listing now
+    high_water_mark = self.journal.high_water_mark(page_url) if incremental and self.journal else []
+    known_rows = set(high_water_mark)
+    newest_rows = []
+    known_run = 0
+    caught_up = False
+
+    for page in range(start_page - 1, start_page - 1 + page_count):
       # Wait until a .row container is ready to be clickable
-      WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "row-container")))
-      # Initialize current_song to first row-item container on the page
-      current_song = self.driver.execute_script(
-        """
-          return document.getElementsByClassName('table-media')[0].firstChild.firstChild.firstChild.getElementsByClassName('row-item')[0]
-        """
-      )
-
-      # While the current song is valid
-      while current_song:
-        # Find all song versions 
-        song_versions = set(self.get_song_versions(current_song))
-
-        # Initialize songs to detect
-        intro_dirty = None
-        quick_hit_dirty = None
-        intro_clean = None
-        quick_hit_clean = None
-        dirty = None
-        clean = None
-        clean_short = None
-
-        assert song_versions, "Unable to detect any song versions"
-        
-        """
-        Attempt to find Intro Dirty and Quick Hit Dirty buttons.
-        If the intro_dirty or quick_hit_dirty are not set to None
-        after this loop, then the current song has those song 
-        versions.
-        """
-        for version in song_versions:
-          if version.text == "Intro Dirty":
-            intro_dirty = Song(self.driver, current_song, version)
-            intro_dirty.name += " (Intro Dirty)"
-
-            # Check if intro_dirty is a duplicate song
-            if self.check_duplicate(intro_dirty):
-              print("Duplicate: {} - {}".format(intro_dirty.artist, intro_dirty.name))
-              continue
-
-            # If the song is not a duplicate, download it
-            print("Downloading {} - {}".format(intro_dirty.artist, intro_dirty.name))
-
-            # Add a timer to prevent reaching download rate limit
-            time.sleep(BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
-            
-            intro_dirty.download_song()
-            continue
+      self.load_page()
+
+      if self.journal:
+        self.journal.page(page_url, page + 1)
+
+      rows = self.extract_page()
+      known_on_page = 0
+      completed_on_page = 0
+      for row in rows:
+        key = BpmSupreme.row_key(row)
+        # Rows finished before the crawl was interrupted are neither new
+        # nor known, so the rest of the page decides whether it is known
+        if key in completed_rows:
+          completed_on_page += 1
+          continue
 
-          if version.text == "Quick Hit Dirty":
-            # Initialize quick_hit_dirty to a Song object and append the version to the name
-            quick_hit_dirty = Song(self.driver, current_song, version)
-            quick_hit_dirty.name += " (Quick Hit Dirty)"
+        if incremental and self._is_known(row, policy, known_rows):
+          known_on_page += 1
+          known_run += 1
+          if start_page == 1:
+            newest_rows.append((key, []))
+          if known_run >= stop_rows:
+            caught_up = True
+            break
+          continue
+        known_run = 0
 
-            # If the song is a duplicate, skip over it
-            if self.check_duplicate(quick_hit_dirty):
-              print("Duplicate: {} - {}".format(quick_hit_dirty.artist, quick_hit_dirty.name))
-              continue
+        downloads = self._download_row(row, policy)
+        if incremental and start_page == 1:
+          newest_rows.append((key, downloads))
 
-            # If the song is not a duplicate, download it 
-            print("Downloading: {} - {}".format(quick_hit_dirty.artist, quick_hit_dirty.name))
+        if self.journal:
+          self.journal.row(page_url, key)
 
-            # Add a timer to prevent reaching download rate limit
-            time.sleep(BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
-            
-            quick_hit_dirty.download_song()
-            continue
+      print("Reached end of page: {}".format(page + 1))
 
-        # If we have both "Intro Dirty" and "Quick Hit Dirty" song versions downloaded
-        if intro_dirty and quick_hit_dirty:
-          try:
-            current_song = self.get_next_song(current_song)        
-            continue
-          except JavascriptException:
-            print("Reached end of page: {}".format(page + 1))
-            break
+      if caught_up or (incremental and known_on_page and known_on_page + completed_on_page == len(rows)):
+        print("Caught up with {} on page {} after {} known rows".format(page_url, page + 1, known_run))
+        break
 
-        """
-          At this point in the loop, the first song versions to look 
-          for in the order of priority have not been found, so we will
-          move on to looking for the next versions of the song to 
-          parse based on the order of priority: "Intro Clean" and 
-          "Intro Dirty"
-        """
+      # Move to the next page after all songs on page have been parsed
+      if page + 2 == start_page + page_count or not self.get_next_page():
+        break
 
-        for version in song_versions:
-          if version.text == "Intro Clean":
-            # Initialize intro_clean to a Song object and append the version to the name
-            intro_clean = Song(self.driver, current_song, version)
-            intro_clean.name += " (Intro Clean)"
+    self.finish_crawl()
 
-            # If the song is a duplicate, skip over it
-            if self.check_duplicate(intro_clean):
-              print("Duplicate: {} - {}".format(intro_clean.artist, intro_clean.name))
-              continue
+    if self.journal:
+      # Only rows whose picked versions were all owned already or are
+      # confirmed to have completed move the high-water mark, so rows
+      # whose downloads failed or never landed are crawled again
+      if incremental and start_page == 1:
+        confirmed = self.confirmed()
+        newest = [key for key, downloads in newest_rows if all((song.row_key, song.name) in confirmed or (not result and self.check_duplicate(song)) for song, result in downloads)]
+        self.journal.mark(page_url, newest + [key for key in high_water_mark if key not in newest])
+      self.journal.done(page_url)
+      self.journal.flush()
 
-            # If the song is not a duplicate, download it 
-            print("Downloading: {} - {}".format(intro_clean.artist, intro_clean.name))
+  def plan(self, page_url, page_count, start_page=1, policy=None, plan=None):
+    """
+      Walks page_count pages of a listing like download_genre() and
+      plans the versions it would download, without clicking any 
+      download button. Versions already in the library are left out.
 
-            # Add a timer to prevent reaching download rate limit
-            time.sleep(BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
-            
-            intro_clean.download_song()
-            continue
+      Args:
+        - page_url: Url of the listing page
+        - page_count: Number of pages to plan
+        - start_page: Page number to start planning from
+        - policy: VersionPolicy to use instead of the "genre" policy
+        - plan: Optional DownloadPlan to add to, e.g. to plan several listings
 
-          if version.text == "Quick Hit Clean":
-            # Initialize quick_hit_clean to a Song object and append the version to the name
-            quick_hit_clean = Song(self.driver, current_song, version)
-            quick_hit_clean.name += " (Quick Hit Clean)"
+      Returns:
+        - DownloadPlan, to save() and later pass to execute()
+    """
+    if not isinstance(page_url, str):
+      raise TypeError("Error: Expected str() for page_url; got {}".format(type(page_url)))
 
-            # If the song is a duplicate, skip over it
-            if self.check_duplicate(quick_hit_clean):
-              print("Duplicate: {} - {}".format(quick_hit_clean.artist, quick_hit_clean.name))
-              continue
+    if not isinstance(page_count, int) or page_count < 1:
+      raise ValueError("Error: Expected page_count greater than 0. Got {}".format(page_count))
 
-            # If the song is not a duplicate, download it 
-            print("Downloading: {} - {}".format(quick_hit_clean.artist, quick_hit_clean.name))
+    if not isinstance(start_page, int) or start_page < 1:
+      raise ValueError("Error: Expected start_page greater than 0. Got {}".format(start_page))
 
-            # Add a timer to prevent reaching download rate limit
-            time.sleep(BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
-            
-            quick_hit_clean.download_song()
-            continue
+    if policy is None:
+      policy = self.policies["genre"]
+    elif not isinstance(policy, VersionPolicy):
+      raise TypeError("Wrong type: Expected VersionPolicy for policy; Got {}".format(type(policy)))
 
-        # If we have both "Intro Clean" or "Quick Hit Clean" song versions downloaded, get the next song
-        if intro_clean or quick_hit_clean:
-          try:
-            current_song = self.get_next_song(current_song)        
-            continue
-          except JavascriptException:
-            print("Reached end of page: {}".format(page + 1))
-            break
+    plan = plan if plan is not None else DownloadPlan()
 
-        """
-          At this point in the loop we will look for the Dirty and  
-          Clean versions of the song
-        """
-        for version in song_versions:
-          if version.text == "Dirty":
-            # Initialize dirty to a Song object and append the version to the name
-            dirty = Song(self.driver, current_song, version)
-            dirty.name += " (Dirty)"
-
-            # If the song is a duplicate, skip over it
-            if self.check_duplicate(dirty):
-              print("Duplicate: {} - {}".format(dirty.artist, dirty.name))
-              continue
-
-            # If the song is not a duplicate, download it 
-            print("Downloading: {} - {}".format(dirty.artist, dirty.name))
-
-            # Add a timer to prevent reaching download rate limit
-            time.sleep(BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
-            
-            dirty.download_song()
-            continue
+    self.load_page(self.page_url(page_url, start_page) if start_page > 1 else page_url)
+    for page in range(start_page, start_page + page_count):
+      self.load_page()
 
-          if version.text == "Clean":
-            # Initialize clean to a Song object and append the version to the name
-            clean = Song(self.driver, current_song, version)
-            clean.name += " (Clean)"
+      planned = 0
+      for row in self.extract_page():
+        with self.phase("duplicate_check"):
+          versions = [version for version in policy.select(row["versions"])
+            if not self.check_duplicate(Song.from_row(self.driver, row, version))]
+        planned += plan.add(page_url, page, BpmSupreme.row_key(row), versions, row.get("urls"))
 
-            # If the song is a duplicate, skip over it
-            if self.check_duplicate(clean):
-              print("Duplicate: {} - {}".format(clean.artist, clean.name))
-              continue
+      print("Planned {} rows on page: {}".format(planned, page))
 
-            # If the song is not a duplicate, download it 
-            print("Downloading: {} - {}".format(clean.artist, clean.name))
+      if page + 1 == start_page + page_count or not self.get_next_page():
+        break
 
-            # Add a timer to prevent reaching download rate limit
-            time.sleep(BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
-            
-            clean.download_song()
-            continue
+    print("Plan: {} downloads of {} rows".format(plan.downloads, len(plan)))
+    return plan
 
-        # If we have both "Dirty" or "Clean" song versions downloaded, get the next song
-        if dirty or clean:
-          try:
-            current_song = self.get_next_song(current_song)        
-            continue
-          except JavascriptException:
-            print("Reached end of page: {}".format(page + 1))
-            break
+  def execute(self, plan):
+    """
+      Performs the downloads of a DownloadPlan made by plan(). Every 
+      planned page is loaded directly and its planned rows are found by
+      key. Rows pushed down by new releases since the plan was made are
+      looked for once on the following page.
 
-        """
-          At this point in the program we will look for the "Clean 
-          Short Edit" version of the current song.
-        """
+      Args:
+        - plan: DownloadPlan
 
-        for version in song_versions:
-          if version.text == "Clean Short Edit":
-            # Initialize clean_short to a Song object and append the version to the name
-            clean_short = Song(self.driver, current_song, version)
-            clean_short.name += " (Clean Short Edit)"
-
-            # If the song is a duplicate, skip over it
-            if self.check_duplicate(clean_short):
-              print("Duplicate: {} - {}".format(clean_short.artist, clean_short.name))
-              continue
-
-            # If the song is not a duplicate, download it 
-            print("Downloading: {} - {}".format(clean_short.artist, clean_short.
-            name))
-
-            # Add a timer to prevent reaching download rate limit
-            time.sleep(BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT)
-            
-            clean_short.download_song()
+      Returns:
+        - List of (Song, result of download()) for every planned version found
+    """
+    if not isinstance(plan, DownloadPlan):
+      raise TypeError("Wrong type: Expected DownloadPlan for plan; Got {}".format(type(plan)))
+
+    downloads = []
+    retried = set()
+    pages = plan.pages()
+    while pages:
+      (page_url, page), entries = pages.popitem(last=False)
+      try:
+        self.load_page(self.page_url(page_url, page))
+      except TimeoutException:
+        print("Unable to load page {} of {}".format(page, page_url))
+        continue
+      rows = {BpmSupreme.row_key(row): row for row in self.extract_page()}
+
+      missing = []
+      for entry in entries:
+        row = rows.get(entry["key"])
+        if row is None:
+          missing.append(entry)
+          continue
+
+        for version in entry["versions"]:
+          if version not in row["versions"]:
+            print("No longer available: {} ({})".format(entry["key"], version))
             continue
+          song = Song.from_row(self.driver, row, version)
+          downloads.append((song, self.download(song)))
+
+      # Look for missing rows on the next page before giving up on them
+      retry = [entry for entry in missing if entry["key"] not in retried]
+      for entry in missing:
+        if entry["key"] in retried:
+          print("Not found: {}".format(entry["key"]))
+      if retry:
+        retried.update(entry["key"] for entry in retry)
+        following = (page_url, page + 1)
+        pages[following] = retry + pages.get(following, [])
+        pages.move_to_end(following, last=False)
+
+    self.finish_crawl()
+    return downloads
+
+  def download_page(self, page_url, page, policy=None):
+    """
+      Downloads the versions picked by policy on a single page of a 
+      listing, loaded directly by URL. Unlike download_genre() the crawl
+      is not finished, so many pages can be downloaded before a single
+      finish_crawl(), e.g. by the workers of a WorkerPool.
+
+      Args:
+        - page_url: Url of the listing's first page
+        - page: Page number, starting at 1
+        - policy: VersionPolicy to use instead of the "genre" policy
+
+      Returns:
+        - List of (Song, result of download()) for every picked version
+    """
+    if policy is None:
+      policy = self.policies["genre"]
+    elif not isinstance(policy, VersionPolicy):
+      raise TypeError("Wrong type: Expected VersionPolicy for policy; Got {}".format(type(policy)))
+
+    self.load_page(self.page_url(page_url, page))
+
+    downloads = []
+    for row in self.extract_page():
+      downloads.extend(self._download_row(row, policy))
+
+    print("Reached end of page {} of {}".format(page, page_url))
+    return downloads
+
+  def _download_row(self, row, policy):
+    """
+      Downloads the versions of a row picked by a VersionPolicy
+
+      Args:
+        - row: Row dict returned by extract_page()
+        - policy: VersionPolicy deciding which versions to download
+
+      Returns:
+        - List of (Song, result of download()) for every picked version
+    """
+    if not row["versions"]:
+      print("Unable to detect any song versions for {} - {}".format(", ".join(row["artists"]), row["name"]))
+      return []
+
+    downloads = []
+    for version in policy.select(row["versions"]):
+      song = Song.from_row(self.driver, row, version)
+      downloads.append((song, self.download(song)))
+    return downloads
+
+  def _is_known(self, row, policy, known_rows):
+    """
+      Returns True if a row is within known_rows, or if every version
+      of it picked by policy is in the library already
+    """
+    if BpmSupreme.row_key(row) in known_rows:
+      return True
+
+    with self.phase("duplicate_check"):
+      versions = policy.select(row["versions"])
+      return bool(versions) and all(self.check_duplicate(Song.from_row(self.driver, row, version)) for version in versions)
+
+  @staticmethod
+  def row_key(row):
+    """
+      Returns a key identifying a row returned by extract_page() across
+      page loads: "Artists - Track name"
+    """
+    return "{} - {}".format(", ".join(row["artists"]), row["name"])
+
+  def phase(self, name):
+    """
+      Returns a context manager tagging the WebDriver commands sent 
+      within it with a crawl phase, see DriverMetrics
+    """
+    return DriverMetrics.phase_of(self.driver, name)
+
+  def load_page(self, url=None, selector=".row-container"):
+    """
+      Navigates to url, if given, waits until an element matching
+      selector is ready and installs the popup monitor
+
+      Args:
+        - url: Optional URL to navigate to
+        - selector: CSS selector of the element signalling the page is ready
+    """
+    with self.phase("page_load"):
+      if url is not None:
+        self.driver.get(url)
+        self.genre = BpmSupreme.genre_of(url)
+      self.events.wait_for(selector)
+      self.location = url if url is not None else self.driver.current_url
+      self.events.monitor_popups()
+
+  @staticmethod
+  def genre_of(url):
+    """
+      Returns the genre of a listing URL, its last path segment, or 
+      None for account pages
+    """
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    return unquote(parts[-1]) if parts and parts[0] != "account" else None
+
+  def extract_page(self):
+    """
+      Extracts every row-item on the current page in a single 
+      WebDriver round trip. Each download button is tagged with a 
+      data-bpm-button attribute so it can be clicked later by id.
+
+      Args:
+        - none
+
+      Returns:
+        - List of dicts, one per row-item, with keys:
+          - index: Position of the row on the page
+          - name: Track name
+          - artists: List of artist names
+          - versions: Dict of version label to button id
+          - urls: Dict of version label to download URL, or None if the button has no link
+    """
+    with self.phase("extract"):
+      rows = self.driver.execute_script(BpmSupreme.EXTRACT_PAGE_SCRIPT)
+
+      # Share the app session with the HTTP downloader once we are on the app
+      if self.http_downloader and not self.http_downloader.cookies:
+        self.http_downloader.set_session(self.driver.get_cookies(), self.driver.execute_script("return navigator.userAgent"))
+
+    return rows
+
+  def download(self, song):
+    """
+      Downloads song unless it is already within self.local_library.
+      When download_workers is set, HTTP downloads are queued to a 
+      DownloadPipeline instead. Clicks always run inline: they need the
+      WebDriver, which is not thread-safe, on the page the song was
+      found on.
+
+      Args:
+        - song: Song to download
+
+      Returns:
+        - True if the song was downloaded or queued, else False
+    """
+    # Claim the song so no other worker sharing the library downloads it too
+    with self.phase("duplicate_check"):
+      claimed = self.local_library.claim_song(song)
+
+    if not claimed:
+      print("Duplicate: {} - {}".format(song.artist, song.name))
+      return False
+
+    # Remember the listing the song was found on for the organizer, and
+    # the page it was found on to re-extract it from if it never lands
+    if song.genre is None:
+      song.genre = self.genre
+    if song.page_url is None:
+      song.page_url = self.location
+
+    if self.download_workers and self.http_downloader and song.download_url:
+      if self.pipeline is None:
+        self.pipeline = DownloadPipeline(lambda song: self.fetch(song, block=True), self.download_workers)
+      self.pipeline.put(song)
+      return True
+
+    return self.fetch(song)
+
+  def page_url(self, page_url, page):
+    """
+      Returns the URL of a page of a paginated listing
+
+      Args:
+        - page_url: URL of the listing's first page
+        - page: Page number, starting at 1
+    """
+    parts = urlsplit(page_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != self.PAGE_PARAMETER]
+    query.append((self.PAGE_PARAMETER, str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query, safe="%")))
+
+  def export_session(self):
+    """
+      Collects the cookies and local storage of the site and app 
+      domains after login()
+
+      Returns:
+        - dict with "cookies" and "local_storage", each keyed by page URL
+    """
+    session = {"cookies": dict(), "local_storage": dict()}
+    for url in (self.LOGIN_URL, self.APP_URL):
+      self.driver.get(url)
+      session["cookies"][url] = self.driver.get_cookies()
+      session["local_storage"][url] = self.driver.execute_script(BpmSupreme.EXPORT_LOCAL_STORAGE_SCRIPT)
+
+    return session
+
+  def import_session(self, session):
+    """
+      Adds cookies and local storage collected by export_session() to
+      this driver, logging it in without going through login().
+      Expired cookies are skipped.
+
+      Args:
+        - session: dict returned by export_session()
+
+      Returns:
+        - Number of cookies imported
+    """
+    imported = 0
+    now = time.time()
+    for url in session["cookies"]:
+      # Cookies can only be added for the domain currently loaded
+      self.driver.get(url)
+      for cookie in session["cookies"][url]:
+        if cookie.get("expiry") is not None and cookie["expiry"] < now:
+          continue
+        self.driver.add_cookie({key: value for key, value in cookie.items() if key != "sameSite"})
+        imported += 1
+
+      if session["local_storage"].get(url):
+        self.driver.execute_script(BpmSupreme.IMPORT_LOCAL_STORAGE_SCRIPT, session["local_storage"][url])
+
+    return imported
+
+  def restore_session(self):
+    """
+      Restores the session saved by a previous login(), checking that 
+      it is still logged in
+
+      Returns:
+        - True if the saved session is valid, else False
+    """
+    if not self.session_store:
+      return False
+
+    session = self.session_store.load()
+    if not session or not self.import_session(session):
+      return False
+
+    if self.probe_session():
+      print("Restored saved session")
+      return True
+
+    print("Saved session has expired")
+    self.session_store.clear()
+    self.driver.delete_all_cookies()
+    return False
+
+  def probe_session(self):
+    """
+      Loads the app and waits for either the account menu, meaning we 
+      are logged in, or the login form, meaning we are not
+
+      Returns:
+        - True if logged in, else False
+    """
+    self.driver.get(self.APP_URL)
+    try:
+      self.events.wait_for(".account-menu-toggle, #login-form-email", BpmSupreme.SESSION_PROBE_TIMEOUT)
+    except TimeoutException:
+      return False
+
+    return self.events.count(".account-menu-toggle") > 0
+
+  def fetch(self, song, block=False):
+    """
+      Downloads song without checking for duplicates, once the rate 
+      limiter allows it
+
+      Args:
+        - song: Song to download
+        - block: Wait for HTTP downloads to finish instead of submitting them
+
+      Returns:
+        - True if the song was downloaded, else False
+    """
+    # Wait for the rate limiter to prevent reaching the download rate limit
+    with self.phase("rate_limit"):
+      self.rate_limiter.acquire()
+
+    print("Downloading: {} - {}".format(song.artist, song.name))
 
+    # Stream the file directly when the download URL is known
+    if self.http_downloader and song.download_url:
+      if block:
         try:
-            current_song = self.get_next_song(current_song)        
-            continue
-        except JavascriptException:
-          print("Reached end of page: {}".format(page + 1))
-          break
-        
-        # Move to the next page after all songs on page have been parsed
-      self.get_next_page()
-        
+          self.http_downloader.download(song.download_url, song.filename())
+        except Exception as error:
+          return self._report_http_download(song, error)
+        return self._report_http_download(song, None)
+
+      future = self.http_downloader.submit(song.download_url, song.filename())
+      future.add_done_callback(lambda future: self._report_http_download(song, future.exception()))
+      return True
+
+    with self.phase("click"):
+      result = song.download_song()
+    if song.rate_limited:
+      self.rate_limiter.on_limit()
+    elif result:
+      self.rate_limiter.on_success()
+
+    # Release the claim on the song so it can be downloaded again
+    if not result:
+      self.local_library.discard_song(song)
+      self._download_failed(song)
+    elif self.download_watcher:
+      self.download_watcher.expect(song)
+
+    if self.journal and song.row_key:
+      self.journal.download(song.row_key, song.name, result)
+    return result
+
+  def _report_http_download(self, song, error):
+    """
+      Feeds the outcome of an HTTP download back to the rate limiter
+
+      Returns:
+        - True if the download succeeded, else False
+    """
+    if self.journal and song.row_key:
+      self.journal.download(song.row_key, song.name, error is None)
+
+    if error is None:
+      self._confirmed.add((song.row_key, song.name))
+      self.rate_limiter.on_success()
+      if self.organizer:
+        self.organizer.submit(os.path.join(self.http_downloader.download_path, song.filename()), song)
+      return True
+
+    if isinstance(error, HttpDownloader.RateLimitError):
+      self.rate_limiter.on_limit()
+    self.local_library.discard_song(song)
+    print("Could not download {} - {}: {}".format(song.artist, song.name, error))
+    self._download_failed(song)
+    return False
+
+  def confirmed(self):
+    """
+      Returns the (row key, song name) of every download confirmed to 
+      have completed: streamed over HTTP, or seen landing in 
+      download_path by the download watcher
+    """
+    confirmed = set(self._confirmed)
+    if self.download_watcher:
+      confirmed.update((download["song"].row_key, download["song"].name) for download in list(self.download_watcher.completed)
+        if getattr(download["song"], "row_key", None))
+    return confirmed
+
+  def _download_failed(self, song):
+    """
+      Tells every failure listener that the download of a claimed song
+      failed for good, whether it was fetched inline, by the pipeline or
+      over HTTP, or given up on after it never landed
+    """
+    for listener in self.failure_listeners:
+      listener(song)
+
+  def finish_crawl(self):
+    """
+      Waits for every queued download, stops the pipeline and reports
+      its stats, and persists the learned download rate, the journal and
+      the metrics. Completed downloads are organized into the library
+      first. A later crawl starts a new pipeline.
+    """
+    if self.pipeline:
+      self.pipeline.join()
+
+    # Give clicked downloads that never landed one more try, giving up
+    # on those that never started once downloads have gone quiet
+    if self.download_watcher:
+      self.requeue_expired(wait=True)
+      if self.pipeline:
+        self.pipeline.join()
+      print(self.download_watcher.report())
+
+    if self.organizer:
+      self.organizer.flush()
+      print(self.organizer.report())
+
+    if self.pipeline:
+      self.pipeline.close()
+      print(self.pipeline.report())
+      self.pipeline = None
+
+    if self.journal:
+      self.journal.flush()
+
+    print("Download rate: {:.3f} downloads/sec after {} limit popups".format(self.rate_limiter.rate, self.rate_limiter.limits))
+    if self.rate_limiter.state_path:
+      self.rate_limiter.save()
+
+    if self.metrics:
+      print(self.metrics.report())
+      self.metrics.export()
+
+  def requeue_expired(self, wait=False):
+    """
+      Re-queues songs whose clicked download never landed in
+      download_path before the download_watcher deadline, at most
+      MAX_REQUEUES times each. Their button ids are stale once the page
+      is left, so every song is re-extracted by row key on the page it 
+      was found on: songs of the current page right away, the others 
+      once the crawl is finished and other pages can be loaded.
+
+      Args:
+        - wait: Wait for every pending download to land, expire or go 
+          idle first, then re-queue the songs of every page
+
+      Returns:
+        - Number of songs re-queued
+    """
+    if not self.download_watcher:
+      return 0
+
+    expired = self.download_watcher.wait(idle=DownloadWatcher.IDLE) if wait else self.download_watcher.expired()
+    self._requeue_later.extend(expired)
+
+    pages = dict()
+    for song in self._requeue_later:
+      pages.setdefault(song.page_url, []).append(song)
+
+    self._requeue_later = []
+    requeued = 0
+    for page_url, songs in pages.items():
+      if page_url is None:
+        requeued += sum(self._requeue(song, None, stale=False) for song in songs)
+        continue
+
+      if page_url != self.location:
+        if not wait:
+          self._requeue_later.extend(songs)
+          continue
+        try:
+          self.load_page(page_url)
+        except TimeoutException:
+          print("Unable to reload {} to re-queue {} songs".format(page_url, len(songs)))
+          for song in songs:
+            self.local_library.discard_song(song)
+            self._download_failed(song)
+          continue
+
+      rows = {BpmSupreme.row_key(row): row for row in self.extract_page()}
+      requeued += sum(self._requeue(song, rows.get(song.row_key)) for song in songs)
+    return requeued
+
+  def _requeue(self, song, row, stale=True):
+    """
+      Downloads an expired song once more, as found in its re-extracted 
+      row unless stale is False
+
+      Returns:
+        - True if the song was re-queued, else False
+    """
+    self.local_library.discard_song(song)
+    key = (song.row_key, song.name)
+    attempts = self.requeues.get(key, 0)
+    if attempts >= BpmSupreme.MAX_REQUEUES:
+      print("Giving up on {} - {} after {} attempts".format(song.artist, song.name, attempts + 1))
+      self._download_failed(song)
+      return False
+
+    if stale:
+      version = next((version for version in (row["versions"] if row else ()) if "{} ({})".format(row["name"], version) == song.name), None)
+      if version is None:
+        print("No longer listed on {}: {} - {}".format(song.page_url, song.artist, song.name))
+        self._download_failed(song)
+        return False
+      fresh = Song.from_row(self.driver, row, version)
+      fresh.genre, fresh.page_url = song.genre, song.page_url
+      song = fresh
+
+    self.requeues[key] = attempts + 1
+    print("Re-queueing: {} - {}".format(song.artist, song.name))
+    return self.download(song)
+
   def get_next_page(self):
     """
       Attempts to find the pagination button for next page.
       Returns True if able to click next page, else returns False
     """
-    # Find and click the next page button after all songs have been parsed on page
-    try:
-      WebDriverWait(self.driver, BpmSupreme.TIMEOUT).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "pagination")))
-      pagination = self.driver.find_element_by_class_name("pagination").find_elements_by_tag_name("li")
-      next_page = self.driver.execute_script(
-      """
-        for (var i = 0; i < arguments[0].length; ++i) {
-          if (arguments[0][i].innerText === '›') {
-            return arguments[0][i].firstChild
+    self.requeue_expired()
+
+    with self.phase("pagination"):
+      # Find and click the next page button after all songs have been parsed on page
+      try:
+        self.events.wait_for(".pagination")
+        pagination = self.driver.find_element_by_class_name("pagination").find_elements_by_tag_name("li")
+        next_page = self.driver.execute_script(
+        """
+          for (var i = 0; i < arguments[0].length; ++i) {
+            if (arguments[0][i].innerText === '›') {
+              return arguments[0][i].firstChild
+            }
           }
-        }
-        return null
-      """, pagination)
-      next_page.click()
-    except JavascriptException(stacktrace=True):
-      print("Unable to reach next page")
-      return False
+          return null
+        """, pagination)
+        if next_page is None:
+          print("Unable to reach next page")
+          return False
+        next_page.click()
+      except JavascriptException:
+        print("Unable to reach next page")
+        return False
 
-    # Just in case a popup appears that was not closed
-    except ElementClickInterceptedException:
-      close_button = WebDriverWait(self.driver, 0.25).until(expected_conditions.element_to_be_clickable((By.CSS_SELECTOR, "div.close")))
-      close_button.click()
-    return True
+      # Just in case a popup appears that was not closed
+      except ElementClickInterceptedException:
+        self.events.close_popups()
+      return True
 
   def get_next_song(self, current_song):
     """
@@ -870,50 +1224,36 @@ class BpmSupreme:
       - False if unsuccessful page scroll
     """
 
-    WebDriverWait(self.driver, load_page_time).until(expected_conditions.invisibility_of_element((By.CLASS_NAME, "loader")))
-    
-    last_height = 60
-    new_height = 0
-    
-    if new_height <= last_height + 60:      
-      # Get scroll height.
-      last_height = self.driver.execute_script("return document.body.scrollHeight")
-
-      # Scroll down
-      self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    self.events.wait_until_gone(".loader", load_page_time)
 
-      time.sleep(1)
+    # Scroll down and wait for the rows it loads to be inserted
+    rows = self.events.count(".row-item")
+    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-      # Calculate new scroll height and compare with last scroll height.
-      new_height = self.driver.execute_script("return document.body.scrollHeight")
-    
-    if new_height <= last_height + 60:
-      return False
-    
-    return True
+    return self.events.wait_for_count(".row-item", rows, load_page_time)
 
-
-  def update_library(self):
+  def update_library(self, rebuild=False):
     """
-    Initialize a library of current songs using path.
-    Returns a set containing all song names within path
+    Initialize a library of current songs by recursively scanning 
+    every directory within self.library_paths.
+    When a library cache is configured, only directories that 
+    changed since they were last cached are read. With read_tags, songs
+    are also indexed by the tags of their files.
 
     Args:
-      - None
+      - rebuild: Ignore the library cache and read every directory
 
     Returns:
-      - set containing all song names detected within path
+      - LibraryIndex containing all songs detected within self.library_paths
     """
-    # Check that path is valid
-    if os.path.isdir(self.path) == False:
-      raise ValueError("Error: Invalid path provided")
-    
-    library = set()
-    with os.scandir(self.path) as entries:
-      for entry in entries:
-        file_song_title = entry.name.split(sep=".mp3")[0].split(sep=" - ")[-1].strip()
-        library.add(file_song_title)
-
+    if self.library_cache:
+      library = self.library_cache.build(self.library_paths, rebuild, self.scan_workers, self.read_tags)
+      print(self.library_cache.report())
+      return library
+
+    scanner = LibraryScanner(self.library_paths, workers=self.scan_workers, tags=self.read_tags)
+    library = scanner.scan()
+    print(scanner.report())
     return library
 
   def check_duplicate(self, song):
@@ -930,13 +1270,7 @@ class BpmSupreme:
     if isinstance(song, Song) == False:
       raise TypeError("Expected argument of type Song() for arg song, instead got {}".format(type(song)))
     
-    for song_name in self.local_library:
-      if song.name == song_name:
-        # Duplicate song name found in library
-        return True
-
-    # No duplicate song found in library
-    return False
+    return self.local_library.contains_song(song)
 
 class Song():
   """
@@ -950,8 +1284,13 @@ class Song():
     - artist: Song artist
   """
 
-  SLEEP_INTERVAL = 1.25
-  
+  # Seconds to wait for a popup after clicking. Popups that appear
+  # later are picked up by the next click, so the happy path never waits.
+  POPUP_GRACE = 0
+
+  # Selects a download button tagged by BpmSupreme.extract_page()
+  BUTTON_SELECTOR = '[data-bpm-button="{}"]'
+
   def __init__(self, driver, container, download_button):
     """
     Song constructor
@@ -974,6 +1313,12 @@ class Song():
     self.driver = driver
     self._container = container
     self.download_button = download_button
+    self.button_id = None
+    self.download_url = None
+    self.rate_limited = False
+    self.row_key = None
+    self.genre = None
+    self.page_url = None
 
     # Find child elements of row-item container matching song details
     # Try to detect artist name
@@ -995,12 +1340,51 @@ class Song():
       print("Unable to detect artist name from {}".format(self._container.tag_name))
       self.artist = "Unknown"
 
+  @classmethod
+  def from_row(cls, driver, row, version):
+    """
+    Constructs a Song from a row returned by BpmSupreme.extract_page()
+    without any further WebDriver round trips
+
+    Args:
+      - driver: Selenium Firefox WebDriver object
+      - row: Row dict returned by BpmSupreme.extract_page()
+      - version: Version label within row["versions"]
+
+    Returns:
+      - Song with the version appended to its name
+    """
+    if version not in row["versions"]:
+      raise ValueError("Error: {} is not an available version of {}".format(version, row["name"]))
+
+    song = cls.__new__(cls)
+    song.driver = driver
+    song._container = None
+    song.download_button = None
+    song.button_id = row["versions"][version]
+    song.download_url = row.get("urls", dict()).get(version)
+    song.rate_limited = False
+    song.row_key = BpmSupreme.row_key(row)
+    song.genre = None
+    song.page_url = None
+    song.name = "{} ({})".format(row["name"], version)
+    song.artist = ", ".join(row["artists"]) if row["artists"] else "Unknown"
+    return song
+
+  def filename(self):
+    """
+    Returns the file name of the song: "Artist - Title (Version).mp3"
+    """
+    extension = os.path.splitext(urlsplit(self.download_url).path)[1] if self.download_url else ""
+    name = "{} - {}{}".format(self.artist, self.name, extension or ".mp3")
+    return name.replace("/", "-").replace("\\", "-")
+
   def __hash__(self):
-    return hash((self._container))
+    return hash((self._container, self.button_id))
 
   def __eq__(self, other):
     if not isinstance(other, type(self)): return NotImplemented
-    return self._container == other._container
+    return self._container == other._container and self.button_id == other.button_id
 
   def download_song(self):
     """
@@ -1010,36 +1394,34 @@ class Song():
       - none
     
     Returns:
-      - True if successful, else False
+      - True if successful, else False. self.rate_limited is set when
+        the "Download Limit" popup appears.
     """
-    result = True
-    try:
-      self.download_button.click()      
+    self.rate_limited = False
 
+    # Click and collect the popups recorded by the page's monitor
+    events = PageEvents(self.driver, None)
+    try:
+      target = self.download_button if self.download_button is not None else Song.BUTTON_SELECTOR.format(self.button_id)
+      outcome = events.click(target, Song.POPUP_GRACE)
     except:
+      outcome = {"clicked": False, "click": None, "popups": []}
+
+    result = outcome["clicked"]
+    if not result:
       print("Could not click download button!")
-      result = False
 
-    # Try to detect popup
-    try:      
-      # Look for popup on screen
-      popup = WebDriverWait(self.driver, Song.SLEEP_INTERVAL).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "popup_inner")))
-      
-      # Find useful popup elements
-      popup_text_title = WebDriverWait(self.driver, 0.25).until(expected_conditions.element_to_be_clickable((By.CLASS_NAME, "title")))
-      close_button = WebDriverWait(self.driver, 0.25).until(expected_conditions.element_to_be_clickable((By.CSS_SELECTOR, "div.close")))
-
-      # Double check we're looking at the correct popup
-      if popup_text_title.text == "Download Limit":
-        result = False
-        print("Detected max download popup! Attempting to resolve...")
-        # Wait until close_button is clickable
-        WebDriverWait(self.driver, 120).until(expected_conditions.element_to_be_clickable((By.CSS_SELECTOR, "div.close")))
-        close_button.click()
-
-    # No popup has been detected
-    except TimeoutException:
-      pass
+    # Only a popup raised by this click fails it. One of an earlier click
+    # arrived late: that download never lands and is re-queued by the
+    # download watcher, but the limit holds all the same.
+    limits = [popup for popup in outcome["popups"] if popup["title"] == "Download Limit"]
+    if any(popup["click"] == outcome["click"] for popup in limits):
+      result = False
+    if limits:
+      self.rate_limited = True
+      print("Detected max download popup! Attempting to resolve...")
+      with DriverMetrics.phase_of(self.driver, "popup_wait"):
+        events.close_popups()
 
     return result
 
@@ -0,0 +1,191 @@
+# Selenium imports
+from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
+from selenium.webdriver.firefox.options import Options
+
+# Standard imports
+import os
+import urllib.request
+from urllib.parse import quote
+from urllib.parse import urlsplit
+
+class BrowserProfile:
+  """
+  Firefox profiles for crawling the site. The default profile only
+  sets the download preferences. The lean profile, meant to run
+  headless with options(), also skips images, media and web fonts,
+  blocks trackers and keeps its disk cache in a directory reused
+  between runs. Trackers are blocked by Firefox's tracking protection
+  lists, and known tracker domains by a proxy auto-config script that
+  sends every other request on to the proxy configured in the
+  environment, if any, so a crawl behind a proxy keeps working.
+
+  Methods:
+    - default()
+    - lean()
+    - options()
+    - blocking_pac()
+    - upstream_proxy()
+  """
+
+  DOWNLOAD_MIME_TYPES = "audio/mpeg,audio/mp3"
+
+  # Analytics, ads and session recording hosts loaded by the site
+  TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "segment.com",
+    "segment.io",
+    "intercom.io",
+    "intercomcdn.com",
+    "fullstory.com",
+    "heapanalytics.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "sentry.io",
+  )
+
+  # Disk cache reused between runs of the lean profile
+  CACHE_PATH = os.path.join(os.path.expanduser("~"), ".bpm_supreme", "firefox-cache")
+  CACHE_SIZE_KB = 256 * 1024
+
+  @staticmethod
+  def default(download_path):
+    """
+    Returns a FirefoxProfile saving downloads to download_path without asking
+
+    Args:
+      - download_path: Directory downloads are saved to
+    """
+    if not isinstance(download_path, str):
+      raise TypeError("Wrong type: Expected str for download_path; Got {}".format(type(download_path)))
+
+    profile = FirefoxProfile()
+    profile.set_preference("browser.helperApps.neverAsk.openFile", "true")
+    profile.set_preference("browser.helperApps.neverAsk.saveFile", "true")
+    profile.set_preference("browser.helperApps.neverAsk.saveToDisk", BrowserProfile.DOWNLOAD_MIME_TYPES)
+    profile.set_preference("browser.download.dir", download_path)
+    profile.set_preference("browser.download.folderList", 2)
+    profile.set_preference("browser.download.manager.showWhenStarting", "false")
+    profile.set_preference("browser.download.panel.shown", "false")
+    profile.set_preference("browser.safebrowsing.downloads.enabled", "false")
+    return profile
+
+  @staticmethod
+  def lean(download_path, cache_path=CACHE_PATH, tracker_domains=TRACKER_DOMAINS, proxy=None):
+    """
+    Returns the default profile trimmed down for crawling
+
+    Args:
+      - download_path: Directory downloads are saved to
+      - cache_path: Directory the disk cache is kept in between runs, or None for a throwaway cache
+      - tracker_domains: Domains whose requests are refused, or none to
+        leave the proxy preferences alone and rely on tracking protection
+      - proxy: PAC directive of the proxy other requests go through, 
+        e.g. "PROXY proxy.example.com:3128", by default upstream_proxy()
+    """
+    profile = BrowserProfile.default(download_path)
+
+    # Skip images, audio/video and web fonts
+    profile.set_preference("permissions.default.image", 2)
+    profile.set_preference("media.autoplay.default", 5)
+    profile.set_preference("media.preload.default", 0)
+    profile.set_preference("media.preload.auto", 0)
+    profile.set_preference("gfx.downloadable_fonts.enabled", False)
+    profile.set_preference("browser.display.use_document_fonts", 0)
+
+    # Refuse tracker requests before they leave the browser
+    profile.set_preference("privacy.trackingprotection.enabled", True)
+    profile.set_preference("privacy.trackingprotection.socialtracking.enabled", True)
+    profile.set_preference("privacy.trackingprotection.cryptomining.enabled", True)
+    profile.set_preference("privacy.trackingprotection.fingerprinting.enabled", True)
+    if tracker_domains:
+      if proxy is None:
+        proxy, bypass = BrowserProfile.upstream_proxy()
+      else:
+        bypass = ()
+      profile.set_preference("network.proxy.type", 2)
+      profile.set_preference("network.proxy.autoconfig_url", BrowserProfile.blocking_pac(tracker_domains, proxy, bypass))
+
+    # Skip background traffic a crawl never needs
+    profile.set_preference("browser.safebrowsing.malware.enabled", False)
+    profile.set_preference("browser.safebrowsing.phishing.enabled", False)
+    profile.set_preference("browser.shell.checkDefaultBrowser", False)
+    profile.set_preference("app.update.enabled", False)
+    profile.set_preference("datareporting.healthreport.uploadEnabled", False)
+    profile.set_preference("datareporting.policy.dataSubmissionEnabled", False)
+    profile.set_preference("toolkit.telemetry.enabled", False)
+    profile.set_preference("network.prefetch-next", False)
+    profile.set_preference("browser.startup.homepage", "about:blank")
+    profile.set_preference("startup.homepage_welcome_url", "about:blank")
+
+    # Keep scripts and styles cached between runs
+    if cache_path is not None:
+      os.makedirs(cache_path, exist_ok=True)
+      profile.set_preference("browser.cache.disk.enable", True)
+      profile.set_preference("browser.cache.disk.parent_directory", cache_path)
+      profile.set_preference("browser.cache.disk.capacity", BrowserProfile.CACHE_SIZE_KB)
+      profile.set_preference("browser.cache.disk.smart_size.enabled", False)
+
+    return profile
+
+  @staticmethod
+  def options(headless=True):
+    """
+    Returns Firefox Options, headless by default
+    """
+    options = Options()
+    options.headless = headless
+    return options
+
+  @staticmethod
+  def blocking_pac(domains, proxy="DIRECT", bypass=()):
+    """
+    Returns a data: URL of a proxy auto-config script sending requests
+    for domains, and their subdomains, to a closed port, and every 
+    other request through proxy
+
+    Args:
+      - domains: Iterable of domain names
+      - proxy: PAC directive of the proxy other requests go through
+      - bypass: Iterable of domain names reached directly instead of through proxy
+    """
+    def matches(names):
+      return " || ".join("host == '{0}' || dnsDomainIs(host, '.{0}')".format(name.lstrip(".")) for name in names) or "false"
+
+    script = "function FindProxyForURL(url, host) { if (" + matches(domains) + ") return 'PROXY 127.0.0.1:9'; "
+    if proxy != "DIRECT" and bypass:
+      script += "if (" + matches(bypass) + ") return 'DIRECT'; "
+    script += "return '" + proxy + "'; }"
+    return "data:application/x-ns-proxy-autoconfig," + quote(script)
+
+  @staticmethod
+  def upstream_proxy():
+    """
+    Returns the proxy configured in the environment, e.g. by https_proxy
+    and no_proxy
+
+    Returns:
+      - Tuple of (PAC directive such as "PROXY proxy.example.com:3128",
+        or "DIRECT" when there is none, domains the proxy is bypassed for)
+    """
+    proxies = urllib.request.getproxies()
+    bypass = tuple(name.strip() for name in proxies.get("no", "").split(",") if name.strip())
+    if "*" in bypass:
+      return "DIRECT", ()
+    for scheme in ("https", "http", "all", "socks"):
+      if not proxies.get(scheme):
+        continue
+      url = proxies[scheme] if "://" in proxies[scheme] else "http://" + proxies[scheme]
+      parts = urlsplit(url)
+      if not parts.hostname:
+        continue
+      if parts.scheme.startswith("socks"):
+        return "SOCKS {}:{}".format(parts.hostname, parts.port or 1080), bypass
+      directive = "HTTPS" if parts.scheme == "https" else "PROXY"
+      return "{} {}:{}".format(directive, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)), bypass
+    return "DIRECT", ()
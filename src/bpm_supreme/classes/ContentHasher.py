@@ -0,0 +1,299 @@
+# Standard imports
+import argparse
+import filecmp
+import hashlib
+import mmap
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+class ContentHasher:
+  """
+  Finds the same audio saved under different file names across library
+  roots. Files are hashed by a process pool reading them through mmap.
+  The ID3 tags of MP3 files are left out so retagged MP3 copies of a
+  song still match; other formats keep their tags in chunks or atoms
+  and only match when byte-identical. Hashes are cached in SQLite keyed
+  by (path, size, mtime) so reruns only hash new or modified files.
+  Byte-identical duplicates can be replaced by hard links to a single
+  copy, which then share every later tag edit.
+
+  Methods:
+    - hash_files()
+    - duplicates()
+    - link_duplicates()
+    - payload()
+    - hash_file()
+    - clear()
+    - close()
+    - report()
+  """
+
+  SCHEMA_VERSION = 2
+
+  # Audio files that are hashed
+  EXTENSIONS = (".mp3", ".wav", ".m4a", ".aiff", ".aif", ".flac")
+
+  # Audio files whose ID3 tags are left out of the hash
+  ID3_EXTENSIONS = (".mp3",)
+
+  # Hashing is CPU bound, so use one worker per core
+  WORKERS = os.cpu_count() or 1
+
+  # Bytes hashed per update, keeping page faults of the mapping sequential
+  CHUNK_SIZE = 1 << 20
+
+  # Files modified this recently are hashed again on the next run, since
+  # a change within the same mtime tick would go unnoticed
+  RACY_WINDOW_NS = 2 * 10**9
+
+  def __init__(self, path, workers=WORKERS):
+    """
+    Constructor for ContentHasher object
+
+    Args:
+      - path: Path of the SQLite hash cache, created if missing
+      - workers: Number of files hashed in parallel
+    """
+    if not isinstance(path, str):
+      raise TypeError("Wrong type: Expected str for path; Got {}".format(type(path)))
+
+    if not isinstance(workers, int) or workers < 1:
+      raise ValueError("Error: Expected workers greater than 0. Got {}".format(workers))
+
+    self.path = path
+    self.workers = workers
+    self.hashes = dict()
+    self.reused = 0
+    self.hashed = 0
+    self.bytes_hashed = 0
+    self.cpu_seconds = 0.0
+    self.elapsed = 0.0
+    self.linked = 0
+    self.bytes_saved = 0
+    self._connection = sqlite3.connect(path)
+
+    if self._connection.execute("PRAGMA user_version").fetchone()[0] != ContentHasher.SCHEMA_VERSION:
+      self._connection.executescript(
+        """
+          DROP TABLE IF EXISTS hashes;
+          CREATE TABLE hashes (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, digest TEXT NOT NULL);
+        """)
+      self._connection.execute("PRAGMA user_version = {}".format(ContentHasher.SCHEMA_VERSION))
+      self._connection.commit()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  @staticmethod
+  def payload(data):
+    """
+    Returns the (start, end) offsets of the audio within the bytes of a
+    file, leaving out a leading ID3v2 tag and a trailing ID3v1 tag
+
+    Args:
+      - data: bytes-like contents of the file
+    """
+    start = 0
+    end = len(data)
+
+    # ID3v2: "ID3", version, flags, then a 28 bit syncsafe size, plus a footer when flagged
+    if end >= 10 and data[:3] == b"ID3" and all(byte < 0x80 for byte in data[6:10]):
+      size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+      start = min(end, 10 + size + (10 if data[5] & 0x10 else 0))
+
+    # ID3v1: the last 128 bytes starting with "TAG"
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+      end -= 128
+
+    return start, end
+
+  @staticmethod
+  def hash_file(path):
+    """
+    Hashes the audio of a file, see payload() for ID3_EXTENSIONS, else
+    its whole contents. Runs in a worker process.
+
+    Args:
+      - path: Path of the file
+
+    Returns:
+      - Tuple of (path, size, mtime_ns, hex digest, bytes hashed, CPU seconds)
+    """
+    start = time.process_time()
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as audio:
+      stat = os.fstat(audio.fileno())
+      hashed = 0
+      if stat.st_size:
+        with mmap.mmap(audio.fileno(), 0, access=mmap.ACCESS_READ) as data:
+          first, last = ContentHasher.payload(data) if path.lower().endswith(ContentHasher.ID3_EXTENSIONS) else (0, len(data))
+          view = memoryview(data)
+          try:
+            for offset in range(first, last, ContentHasher.CHUNK_SIZE):
+              digest.update(view[offset:min(offset + ContentHasher.CHUNK_SIZE, last)])
+          finally:
+            view.release()
+          hashed = last - first
+
+    return path, stat.st_size, stat.st_mtime_ns, digest.hexdigest(), hashed, time.process_time() - start
+
+  def hash_files(self, roots):
+    """
+    Hashes every audio file within roots and their subdirectories,
+    reusing cached hashes of files whose size and mtime are unchanged
+
+    Args:
+      - roots: Iterable of library root directories
+
+    Returns:
+      - dict of path to hex digest of every audio file found
+    """
+    start = time.perf_counter()
+    roots = [os.path.abspath(root) for root in roots]
+    cached = {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in self._connection.execute("SELECT path, size, mtime_ns, digest FROM hashes")}
+
+    pending = []
+    for root in roots:
+      if not os.path.isdir(root):
+        raise ValueError("Bad path: Expected valid path; Got {}".format(root))
+
+      for directory, subdirectories, filenames in os.walk(root):
+        for name in filenames:
+          if not name.lower().endswith(ContentHasher.EXTENSIONS):
+            continue
+          path = os.path.join(directory, name)
+          try:
+            stat = os.stat(path)
+          except OSError:
+            continue
+          entry = cached.get(path)
+          if entry and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            self.hashes[path] = entry[2]
+            self.reused += 1
+          else:
+            pending.append(path)
+
+    results = []
+    if pending:
+      with ProcessPoolExecutor(min(self.workers, len(pending))) as executor:
+        for result in executor.map(ContentHasher.hash_file, pending, chunksize=max(1, len(pending) // (self.workers * 8))):
+          path, size, mtime_ns, digest, hashed, cpu_seconds = result
+          self.hashes[path] = digest
+          self.hashed += 1
+          self.bytes_hashed += hashed
+          self.cpu_seconds += cpu_seconds
+          results.append((path, size, mtime_ns, digest))
+
+    now = time.time_ns()
+    with self._connection:
+      self._connection.executemany("INSERT OR REPLACE INTO hashes (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+        [result for result in results if now - result[2] >= ContentHasher.RACY_WINDOW_NS])
+      self._connection.executemany("DELETE FROM hashes WHERE path = ?",
+        [(path,) for path in cached if path not in self.hashes and any(path.startswith(os.path.join(root, "")) for root in roots)])
+
+    self.elapsed += time.perf_counter() - start
+    return dict(self.hashes)
+
+  def duplicates(self):
+    """
+    Groups the hashed files sharing the same audio
+
+    Returns:
+      - List of lists of paths, each sorted, of at least two files with the same digest
+    """
+    groups = dict()
+    for path, digest in self.hashes.items():
+      groups.setdefault(digest, []).append(path)
+    return sorted(sorted(paths) for paths in groups.values() if len(paths) > 1)
+
+  def link_duplicates(self, dry_run=False):
+    """
+    Replaces every byte-identical duplicate by a hard link to the first
+    file of its group. Files whose tags differ, that are on another
+    filesystem or that already are the same file are left alone. Linked
+    paths are a single file: editing the tags of one edits them all.
+
+    Args:
+      - dry_run: Only count what would be linked
+
+    Returns:
+      - List of (kept path, linked path) pairs
+    """
+    linked = []
+    for group in self.duplicates():
+      kept = group[0]
+      kept_stat = os.stat(kept)
+      for path in group[1:]:
+        stat = os.stat(path)
+        if stat.st_dev != kept_stat.st_dev or stat.st_ino == kept_stat.st_ino:
+          continue
+        if not filecmp.cmp(kept, path, shallow=False):
+          continue
+
+        if not dry_run:
+          # Link next to the duplicate first so it is replaced atomically
+          temporary_path = path + ".link"
+          if os.path.lexists(temporary_path):
+            # Left behind by an interrupted run
+            os.remove(temporary_path)
+          os.link(kept, temporary_path)
+          os.replace(temporary_path, path)
+        linked.append((kept, path))
+        self.linked += 1
+        self.bytes_saved += stat.st_size
+    return linked
+
+  def clear(self):
+    """
+    Removes every cached hash so the next run hashes everything
+    """
+    with self._connection:
+      self._connection.execute("DELETE FROM hashes")
+
+  def report(self):
+    """
+    Returns a str describing how many files were hashed and how fast
+    """
+    megabytes = self.bytes_hashed / 1e6
+    return "Hashes: {} reused, {} hashed, {:.1f} MB in {:.2f}s, {:.1f} MB/s, {:.1f} MB/s per core with {} workers".format(
+      self.reused, self.hashed, megabytes, self.elapsed,
+      megabytes / self.elapsed if self.elapsed else 0.0,
+      megabytes / self.cpu_seconds if self.cpu_seconds else 0.0,
+      self.workers)
+
+  def close(self):
+    self._connection.close()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Find, and optionally hard-link, duplicate audio within library directories")
+  parser.add_argument("cache", help="Path of the SQLite hash cache")
+  parser.add_argument("directories", nargs="+", help="Library roots to hash")
+  parser.add_argument("--workers", type=int, default=ContentHasher.WORKERS, help="Number of files hashed in parallel")
+  parser.add_argument("--link", action="store_true", help="Replace byte-identical duplicates by hard links, which share later tag edits")
+  parser.add_argument("--rebuild", action="store_true", help="Ignore the cache and hash every file")
+  args = parser.parse_args()
+
+  with ContentHasher(args.cache, workers=args.workers) as hasher:
+    if args.rebuild:
+      hasher.clear()
+    hasher.hash_files(args.directories)
+    print(hasher.report())
+
+    groups = hasher.duplicates()
+    wasted = 0
+    for group in groups:
+      files = {(stat.st_dev, stat.st_ino): stat.st_size for stat in map(os.stat, group)}
+      wasted += sum(files.values()) - max(files.values())
+    print("{} groups of duplicate audio, {:.1f} MB wasted".format(len(groups), wasted / 1e6))
+    for group in groups:
+      print("\n".join(["  " + path for path in group]) + "\n")
+
+    if args.link:
+      print("Warning: hard-linked duplicates are a single file, so tagging one of them tags them all")
+    linked = hasher.link_duplicates(dry_run=not args.link)
+    print("{} {} byte-identical duplicates, {:.1f} MB".format("Linked" if args.link else "Would link", len(linked), hasher.bytes_saved / 1e6))
@@ -0,0 +1,256 @@
+# Standard imports
+import json
+import os
+import threading
+
+class CrawlJournal:
+  """
+  Append-only JSON lines journal of a crawl: the page being crawled,
+  every row processed and every download outcome. Records are fsynced
+  in batches, and the journal is replayed on open so a crashed crawl
+  can resume from its last checkpoint. The newest rows of every listing
+  are kept as its high-water mark, so an incremental crawl can stop
+  once it reaches rows seen by the previous one. The journal is
+  compacted on open and whenever a crawl finishes: the live state is
+  rewritten to a new file that is renamed into place, so the rows of
+  finished crawls and superseded marks do not pile up across runs.
+
+  Methods:
+    - page()
+    - row()
+    - download()
+    - done()
+    - mark()
+    - checkpoint()
+    - high_water_mark()
+    - compact()
+    - flush()
+    - close()
+  """
+
+  # Records written between fsyncs
+  SYNC_EVERY = 32
+
+  # Row keys kept in the high-water mark of a listing
+  MARK_SIZE = 50
+
+  def __init__(self, path, sync_every=SYNC_EVERY):
+    """
+    Constructor for CrawlJournal object
+
+    Args:
+      - path: Path of the journal file, created if missing
+      - sync_every: Number of records written between fsyncs
+    """
+    if not isinstance(path, str):
+      raise TypeError("Wrong type: Expected str for path; Got {}".format(type(path)))
+
+    self.path = path
+    self.sync_every = sync_every
+    self.syncs = 0
+    self.compactions = 0
+    self.downloads = dict()
+    self._crawls = dict()
+    self._marks = dict()
+    self._unsynced = 0
+    self._lock = threading.Lock()
+    self._file = None
+
+    if os.path.exists(path) and self._replay() > len(self._records()):
+      self._compact()
+    else:
+      self._file = open(path, "a")
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def page(self, url, page):
+    """
+    Records that page of url is about to be crawled. Pages are always
+    synced so a checkpoint never points past a page that was reached.
+    """
+    self._write({"type": "page", "url": url, "page": page}, sync=True)
+
+  def row(self, url, key):
+    """
+    Records that the row with key on the current page of url is done
+    """
+    self._write({"type": "row", "url": url, "key": key})
+
+  def download(self, key, version, succeeded):
+    """
+    Records the outcome of downloading version of the row with key
+    """
+    self._write({"type": "download", "key": key, "version": version, "ok": succeeded})
+
+  def done(self, url):
+    """
+    Records that the crawl of url finished, so it is not resumed, and
+    compacts the journal
+    """
+    with self._lock:
+      self._apply({"type": "done", "url": url})
+      self._compact()
+
+  def mark(self, url, keys):
+    """
+    Records the row keys at the top of url, newest first, as its
+    high-water mark. Only the first MARK_SIZE keys are kept.
+    """
+    self._write({"type": "mark", "url": url, "keys": list(keys)[:CrawlJournal.MARK_SIZE]}, sync=True)
+
+  def high_water_mark(self, url):
+    """
+    Returns the row keys of the last mark() of url, newest first, or an
+    empty list if url was never marked
+    """
+    with self._lock:
+      return list(self._marks.get(url, ()))
+
+  def checkpoint(self, url):
+    """
+    Returns where a crawl of url stopped
+
+    Args:
+      - url: URL the crawl started from
+
+    Returns:
+      - dict with "page", the page being crawled, and "rows", the set
+        of row keys already processed on it, or None if there is no
+        unfinished crawl of url
+    """
+    with self._lock:
+      crawl = self._crawls.get(url)
+      if crawl is None:
+        return None
+      return {"page": crawl["page"], "rows": set(crawl["rows"])}
+
+  def compact(self):
+    """
+    Rewrites the journal to hold only the records needed to rebuild its
+    state: the download outcomes, the high-water marks and the page and
+    rows of every unfinished crawl
+    """
+    with self._lock:
+      self._compact()
+
+  def flush(self):
+    """
+    Writes and fsyncs every buffered record
+    """
+    with self._lock:
+      self._sync()
+
+  def close(self):
+    self.flush()
+    self._file.close()
+
+  def _write(self, record, sync=False):
+    with self._lock:
+      self._apply(record)
+      self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+      self._unsynced += 1
+      if sync or self._unsynced >= self.sync_every:
+        self._sync()
+
+  def _sync(self):
+    """
+    Must hold self._lock
+    """
+    if not self._unsynced:
+      return
+    self._file.flush()
+    os.fsync(self._file.fileno())
+    self._unsynced = 0
+    self.syncs += 1
+
+  def _compact(self):
+    """
+    Writes the live records to a temporary file, fsyncs it and renames it
+    over the journal, so a crash leaves either the old or the new journal.
+    Must hold self._lock.
+    """
+    temporary_path = self.path + ".tmp"
+    with open(temporary_path, "w") as journal:
+      for record in self._records():
+        journal.write(json.dumps(record, separators=(",", ":")) + "\n")
+      journal.flush()
+      os.fsync(journal.fileno())
+
+    if self._file is not None:
+      self._file.close()
+    os.replace(temporary_path, self.path)
+    CrawlJournal._fsync_directory(os.path.dirname(os.path.abspath(self.path)))
+    self._file = open(self.path, "a")
+    self._unsynced = 0
+    self.compactions += 1
+
+  def _records(self):
+    """
+    Returns the list of records that rebuild the in-memory state
+    """
+    records = [{"type": "download", "key": key, "version": version, "ok": succeeded}
+      for (key, version), succeeded in self.downloads.items()]
+    for url, keys in self._marks.items():
+      records.append({"type": "mark", "url": url, "keys": keys})
+    for url, crawl in self._crawls.items():
+      records.append({"type": "page", "url": url, "page": crawl["page"]})
+      records.extend({"type": "row", "url": url, "key": key} for key in sorted(crawl["rows"]))
+    return records
+
+  @staticmethod
+  def _fsync_directory(directory):
+    try:
+      descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+      return
+    try:
+      os.fsync(descriptor)
+    except OSError:
+      pass
+    finally:
+      os.close(descriptor)
+
+  def _apply(self, record):
+    """
+    Updates the in-memory state with a record
+    """
+    kind = record["type"]
+    if kind == "page":
+      crawl = self._crawls.get(record["url"])
+      if crawl is None or crawl["page"] != record["page"]:
+        self._crawls[record["url"]] = {"page": record["page"], "rows": set()}
+    elif kind == "row":
+      crawl = self._crawls.get(record["url"])
+      if crawl is not None:
+        crawl["rows"].add(record["key"])
+    elif kind == "download":
+      self.downloads[(record["key"], record["version"])] = record["ok"]
+    elif kind == "done":
+      self._crawls.pop(record["url"], None)
+    elif kind == "mark":
+      self._marks[record["url"]] = record["keys"]
+
+  def _replay(self):
+    """
+    Rebuilds the in-memory state from the journal file, ignoring a
+    final line left incomplete by a crash
+
+    Returns:
+      - Number of records replayed
+    """
+    with open(self.path, "rb") as journal:
+      data = journal.read()
+
+    lines = data.split(b"\n")
+    for line in lines[:-1]:
+      self._apply(json.loads(line))
+
+    # Drop an incomplete final record so new records start on a fresh line
+    if lines[-1]:
+      with open(self.path, "r+b") as journal:
+        journal.truncate(len(data) - len(lines[-1]))
+    return len(lines) - 1
@@ -0,0 +1,366 @@
+# Selenium imports
+from selenium.common.exceptions import TimeoutException
+
+# Standard imports
+import datetime
+import json
+import os
+import threading
+import time
+
+# Local imports
+try:
+  from .BpmSupreme import BpmSupreme
+  from .BpmSupreme import Song
+  from .VersionPolicy import VersionPolicy
+  from .WorkerPool import WorkerPool
+except ImportError:
+  from BpmSupreme import BpmSupreme
+  from BpmSupreme import Song
+  from VersionPolicy import VersionPolicy
+  from WorkerPool import WorkerPool
+
+class CrawlScheduler:
+  """
+  Crawls many listings in one run over one or more logged in accounts,
+  or the workers of a started WorkerPool. Jobs are interleaved a page at a
+  time, the job with the fewest pages crawled for its priority going
+  next, and the daily download quota is shared between them by
+  priority: each job may use its share of what is left, and the share
+  a finished job did not use goes to the jobs still running, so a
+  low priority genre can never starve a high priority one. Downloads
+  that fail, even long after their click, give their quota back.
+
+  Methods:
+    - add()
+    - entitlement()
+    - run()
+    - remaining()
+    - save()
+    - report()
+  """
+
+  # Downloads allowed per day
+  QUOTA = 500
+
+  def __init__(self, accounts, quota=QUOTA, state_path=None):
+    """
+    Constructor for CrawlScheduler object
+
+    Args:
+      - accounts: BpmSupreme account, or list of accounts crawled in parallel, that have logged in,
+        or a started WorkerPool whose workers crawl in parallel and whose crawl is finished once
+      - quota: Downloads allowed per day, across every job
+      - state_path: Optional JSON file the downloads used today are persisted to, shared across runs
+    """
+    self.pool = accounts if isinstance(accounts, WorkerPool) else None
+    if self.pool is not None:
+      accounts = self.pool.workers
+    accounts = [accounts] if isinstance(accounts, BpmSupreme) else list(accounts)
+    if not accounts:
+      raise ValueError("Error: Expected at least one account")
+
+    for account in accounts:
+      if not isinstance(account, BpmSupreme):
+        raise TypeError("Wrong type: Expected BpmSupreme for accounts; Got {}".format(type(account)))
+
+    if not isinstance(quota, int) or quota < 0:
+      raise ValueError("Error: Expected quota of at least 0. Got {}".format(quota))
+
+    self.accounts = accounts
+    self.quota = quota
+    self.state_path = state_path
+    self.used_before = 0
+    self.jobs = []
+    self.elapsed = 0.0
+    self._reserved = dict()
+    self._lock = threading.Lock()
+
+    if state_path and os.path.exists(state_path):
+      with open(state_path) as state:
+        state = json.load(state)
+      if state.get("date") == CrawlScheduler.today():
+        self.used_before = state.get("used", 0)
+
+  @staticmethod
+  def today():
+    return datetime.date.today().isoformat()
+
+  def add(self, page_url, page_count, priority=1, policy="genre", name=None):
+    """
+    Adds a listing to crawl
+
+    Args:
+      - page_url: Url of the listing's first page
+      - page_count: Number of pages to crawl
+      - priority: Positive weight of the job in the interleaving and the quota
+      - policy: VersionPolicy, or the page type of one of the accounts' policies
+      - name: Optional name of the job in the report, by default its genre
+
+    Returns:
+      - The job dict
+    """
+    if not isinstance(page_url, str):
+      raise TypeError("Wrong type: Expected str for page_url; Got {}".format(type(page_url)))
+
+    if not isinstance(page_count, int) or page_count < 1:
+      raise ValueError("Error: Expected page_count greater than 0. Got {}".format(page_count))
+
+    if not isinstance(priority, (int, float)) or priority <= 0:
+      raise ValueError("Error: Expected priority greater than 0. Got {}".format(priority))
+
+    if isinstance(policy, str):
+      if policy not in self.accounts[0].policies:
+        raise ValueError("Error: Expected one of {} for policy. Got {}".format(sorted(self.accounts[0].policies), policy))
+      policy = self.accounts[0].policies[policy]
+    elif not isinstance(policy, VersionPolicy):
+      raise TypeError("Wrong type: Expected VersionPolicy or str for policy; Got {}".format(type(policy)))
+
+    job = {
+      "name": name or BpmSupreme.genre_of(page_url) or page_url,
+      "page_url": page_url,
+      "page_count": page_count,
+      "priority": priority,
+      "policy": policy,
+      "pages": list(range(1, page_count + 1)),
+      "running": 0,
+      "finished": False,
+      "crawled": 0,
+      "rows": 0,
+      "used": 0,
+      "duplicates": 0,
+      "races": 0,
+      "failed": 0,
+      "elapsed": 0.0,
+    }
+    with self._lock:
+      self.jobs.append(job)
+    return job
+
+  def remaining(self):
+    """
+    Returns the downloads left in today's quota
+    """
+    with self._lock:
+      return self.quota - self.used_before - sum(job["used"] for job in self.jobs)
+
+  def entitlement(self, job):
+    """
+    Returns the downloads job may use in total: its priority's share of
+    the quota left by finished jobs, see _shares(). Only grows as other
+    jobs finish.
+    """
+    with self._lock:
+      return self._entitlement(job)
+
+  def run(self):
+    """
+    Crawls every job, one page per step, on every account in parallel,
+    until every job is finished or the quota is used up
+
+    Returns:
+      - List of job dicts, see report()
+    """
+    start = time.perf_counter()
+    # Pooled workers share the failure listeners of their account
+    for account in self.accounts:
+      if self._failed not in account.failure_listeners:
+        account.failure_listeners.append(self._failed)
+
+    try:
+      if len(self.accounts) == 1:
+        self._work(self.accounts[0])
+      else:
+        threads = [threading.Thread(target=self._work, args=(account,)) for account in self.accounts]
+        for thread in threads:
+          thread.start()
+        for thread in threads:
+          thread.join()
+
+      # Queued downloads and those that never landed may still fail
+      if self.pool is not None:
+        self.pool.finish_crawl()
+      else:
+        for account in self.accounts:
+          account.finish_crawl()
+    finally:
+      for account in self.accounts:
+        if self._failed in account.failure_listeners:
+          account.failure_listeners.remove(self._failed)
+      self._reserved.clear()
+
+    self.elapsed += time.perf_counter() - start
+    if self.state_path:
+      self.save()
+    print(self.report())
+    return self.jobs
+
+  def save(self):
+    """
+    Persists the downloads used today to state_path
+    """
+    if not self.state_path:
+      raise ValueError("Error: No state_path to save the quota usage to")
+
+    temporary_path = self.state_path + ".tmp"
+    with open(temporary_path, "w") as state:
+      json.dump({"date": CrawlScheduler.today(), "used": self.quota - self.remaining()}, state)
+    os.replace(temporary_path, self.state_path)
+
+  def report(self):
+    """
+    Returns a str of the quota usage and the throughput of every job
+    """
+    lines = ["Quota: {} of {} downloads used today, {} by this run over {} jobs in {:.1f}s".format(
+      self.quota - self.remaining(), self.quota, sum(job["used"] for job in self.jobs), len(self.jobs), self.elapsed)]
+    for job in self.jobs:
+      minutes = job["elapsed"] / 60
+      lines.append("  {}: priority {}, {} of {} pages, {} rows, {} downloads of {} allowed, {} duplicates, {} claimed by another worker, {} failed, {:.1f} downloads/min, {:.1f} pages/min".format(
+        job["name"], job["priority"], job["crawled"], job["page_count"], job["rows"], job["used"], self.entitlement(job),
+        job["duplicates"], job["races"], job["failed"], job["used"] / minutes if minutes else 0.0, job["crawled"] / minutes if minutes else 0.0))
+    return "\n".join(lines)
+
+  def _entitlement(self, job):
+    """
+    See entitlement(). Must hold self._lock.
+    """
+    if job["finished"]:
+      return job["used"]
+    return self._shares()[id(job)]
+
+  def _shares(self):
+    """
+    Splits the quota left by finished jobs between the running ones by
+    priority in whole downloads, by largest remainder: each job gets the
+    floor of its exact share, and the downloads left over go to the 
+    largest fractions, ties to the highest priority. The whole quota is
+    handed out, and the highest priority job gets at least one download
+    whenever any is left. Must hold self._lock.
+
+    Returns:
+      - dict of id() of every running job to its share
+    """
+    active = [job for job in self.jobs if not job["finished"]]
+    free = max(self.quota - self.used_before - sum(job["used"] for job in self.jobs if job["finished"]), 0)
+    if not active:
+      return dict()
+
+    total = sum(job["priority"] for job in active)
+    exact = [free * job["priority"] / total for job in active]
+    shares = [int(share) for share in exact]
+    order = sorted(range(len(active)), key=lambda index: (exact[index] - shares[index], active[index]["priority"]), reverse=True)
+    for index in order[:free - sum(shares)]:
+      shares[index] += 1
+    return {id(job): share for job, share in zip(active, shares)}
+
+  def _next_page(self):
+    """
+    Picks the job with the fewest pages crawled for its priority among
+    those with pages and quota left, and takes its next page
+
+    Returns:
+      - Tuple of (job, page), or None when nothing is left to crawl
+    """
+    with self._lock:
+      eligible = [job for job in self.jobs if job["pages"] and not job["finished"] and job["used"] + 1 <= self._entitlement(job)]
+      if not eligible:
+        return None
+
+      job = min(eligible, key=lambda job: (job["crawled"] + job["running"]) / job["priority"])
+      job["running"] += 1
+      return job, job["pages"].pop(0)
+
+  def _reserve(self, job, key):
+    """
+    Takes one download of the quota for job for the song of key, returns
+    False if it has none left
+    """
+    with self._lock:
+      if job["used"] + 1 > self._entitlement(job):
+        return False
+      job["used"] += 1
+      self._reserved[key] = job
+      return True
+
+  def _failed(self, song):
+    """
+    Gives back the download reserved for a song whose download failed,
+    called by the accounts when it does, possibly from another thread
+    """
+    with self._lock:
+      job = self._reserved.pop((song.row_key, song.name), None)
+      if job is not None:
+        job["used"] -= 1
+        job["failed"] += 1
+
+  def _count(self, job, key):
+    with self._lock:
+      job[key] += 1
+
+  def _work(self, account):
+    """
+    Crawls pages on account until nothing is left
+    """
+    while True:
+      step = self._next_page()
+      if step is None:
+        return
+
+      job, page = step
+      start = time.perf_counter()
+      rows, complete = self._crawl_page(account, job, page)
+      with self._lock:
+        job["running"] -= 1
+        job["elapsed"] += time.perf_counter() - start
+        job["rows"] += rows
+        if not complete:
+          # Quota ran out mid-page, finish it once more is allowed
+          job["pages"].insert(0, page)
+        else:
+          job["crawled"] += 1
+        if complete is None:
+          job["pages"] = []
+        if not job["pages"] and not job["running"]:
+          job["finished"] = True
+
+  def _crawl_page(self, account, job, page):
+    """
+    Downloads the versions picked by the job's policy on one page
+
+    Returns:
+      - Tuple of (rows seen, True if the page was done, False if the quota
+        ran out first, None if the listing has no such page)
+    """
+    try:
+      account.load_page(account.page_url(job["page_url"], page))
+    except TimeoutException:
+      print("No page {} of {}".format(page, job["name"]))
+      return 0, None
+
+    rows = account.extract_page()
+    if not rows:
+      return 0, None
+
+    for row in rows:
+      for version in job["policy"].select(row["versions"]):
+        song = Song.from_row(account.driver, row, version)
+
+        # Songs already in the library do not cost any quota
+        if account.check_duplicate(song):
+          self._count(job, "duplicates")
+          continue
+
+        key = (song.row_key, song.name)
+        if not self._reserve(job, key):
+          return len(rows), False
+
+        # A failed download was given back by _failed(), so the song was
+        # claimed by another account in between
+        if not account.download(song):
+          with self._lock:
+            if self._reserved.pop(key, None) is job:
+              job["used"] -= 1
+              job["races"] += 1
+
+    print("Reached end of page {} of {}".format(page, job["name"]))
+    return len(rows), True
@@ -0,0 +1,150 @@
+# Standard imports
+import queue
+import threading
+import time
+
+class DownloadPipeline:
+  """
+  Decouples page crawling from downloading. The crawler put()s download
+  jobs into a bounded queue that one or more downloader threads drain,
+  so the crawler blocks once it is queue_size jobs ahead.
+
+  Methods:
+    - put()
+    - join()
+    - close()
+    - stats()
+    - report()
+  """
+
+  QUEUE_SIZE = 4
+
+  def __init__(self, stage, workers=1, queue_size=QUEUE_SIZE):
+    """
+    Constructor for DownloadPipeline object
+
+    Args:
+      - stage: Callable run by a downloader thread on every job, returning True if the job succeeded
+      - workers: Number of downloader threads
+      - queue_size: Number of jobs the crawler may run ahead of the downloaders
+    """
+    if not callable(stage):
+      raise TypeError("Wrong type: Expected callable for stage; Got {}".format(type(stage)))
+
+    if not isinstance(workers, int) or workers < 1:
+      raise ValueError("Error: Expected workers greater than 0. Got {}".format(workers))
+
+    self._stage = stage
+    self._queue = queue.Queue(queue_size)
+    self._lock = threading.Lock()
+    self._start = time.perf_counter()
+    self.queue_size = queue_size
+    self.produced = 0
+    self.completed = 0
+    self.failed = 0
+    self.blocked_time = 0.0
+    self.busy_time = 0.0
+    self.max_depth = 0
+    self._depth_total = 0
+
+    self._threads = [threading.Thread(target=self._work, daemon=True) for worker in range(workers)]
+    for thread in self._threads:
+      thread.start()
+
+  def put(self, job):
+    """
+    Queues a download job, blocking while the queue is full
+
+    Args:
+      - job: Job passed to stage
+    """
+    start = time.perf_counter()
+    self._queue.put(job)
+    blocked = time.perf_counter() - start
+
+    with self._lock:
+      self.blocked_time += blocked
+      self.produced += 1
+      depth = self._queue.qsize()
+      self._depth_total += depth
+      self.max_depth = max(self.max_depth, depth)
+
+  def join(self):
+    """
+    Waits until every queued job has been processed
+    """
+    self._queue.join()
+
+  def close(self):
+    """
+    Processes every queued job and stops the downloader threads
+    """
+    for thread in self._threads:
+      self._queue.put(None)
+    for thread in self._threads:
+      thread.join()
+
+  def stats(self):
+    """
+    Returns a dict of queue depth, utilization and throughput per stage
+    """
+    with self._lock:
+      elapsed = time.perf_counter() - self._start
+      return {
+        "elapsed": elapsed,
+        "queue_size": self.queue_size,
+        "queue_depth": self._queue.qsize(),
+        "max_queue_depth": self.max_depth,
+        "mean_queue_depth": self._depth_total / self.produced if self.produced else 0.0,
+        "crawler": {
+          "jobs": self.produced,
+          "blocked_time": self.blocked_time,
+          "utilization": 1 - self.blocked_time / elapsed if elapsed else 0.0,
+          "throughput": self.produced / elapsed if elapsed else 0.0,
+        },
+        "downloader": {
+          "workers": len(self._threads),
+          "jobs": self.completed,
+          "failed": self.failed,
+          "busy_time": self.busy_time,
+          "utilization": self.busy_time / (elapsed * len(self._threads)) if elapsed else 0.0,
+          "throughput": self.completed / elapsed if elapsed else 0.0,
+        },
+      }
+
+  def report(self):
+    """
+    Returns a str summarizing stats()
+    """
+    stats = self.stats()
+    return ("Crawler: {} jobs, {:.0%} utilized, {:.2f} jobs/sec\n"
+      "Downloader: {} jobs ({} failed) on {} workers, {:.0%} utilized, {:.2f} jobs/sec\n"
+      "Queue depth: {:.1f} mean, {} max of {}").format(
+        stats["crawler"]["jobs"], stats["crawler"]["utilization"], stats["crawler"]["throughput"],
+        stats["downloader"]["jobs"], stats["downloader"]["failed"], stats["downloader"]["workers"],
+        stats["downloader"]["utilization"], stats["downloader"]["throughput"],
+        stats["mean_queue_depth"], stats["max_queue_depth"], stats["queue_size"])
+
+  def _work(self):
+    """
+    Downloader thread: runs stage on every job until a None job arrives
+    """
+    while True:
+      job = self._queue.get()
+      if job is None:
+        self._queue.task_done()
+        return
+
+      start = time.perf_counter()
+      try:
+        succeeded = self._stage(job)
+      except Exception as error:
+        print("Download job failed: {}".format(error))
+        succeeded = False
+
+      with self._lock:
+        self.busy_time += time.perf_counter() - start
+        self.completed += 1
+        if succeeded == False:
+          self.failed += 1
+      self._queue.task_done()
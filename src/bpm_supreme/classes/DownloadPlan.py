@@ -0,0 +1,148 @@
+# Standard imports
+import collections
+import json
+import os
+
+class DownloadPlan:
+  """
+  Downloads decided by BpmSupreme.plan() without clicking anything, to
+  be performed later, possibly on another machine, by
+  BpmSupreme.execute(). Saved as JSON lines, one line per row: its key,
+  the versions to download, their download URLs when known and the
+  listing page the row was found on.
+
+  Methods:
+    - add()
+    - contains()
+    - pages()
+    - split()
+    - save()
+    - load()
+  """
+
+  def __init__(self, entries=None):
+    """
+    Constructor for DownloadPlan object
+
+    Args:
+      - entries: Optional list of entry dicts, as written by save()
+    """
+    self.entries = list()
+    self._keys = set()
+    for entry in entries or ():
+      self._append(entry)
+
+  def __len__(self):
+    return len(self.entries)
+
+  @property
+  def downloads(self):
+    """
+    Number of versions planned across every row
+    """
+    return sum(len(entry["versions"]) for entry in self.entries)
+
+  def add(self, url, page, key, versions, urls=None):
+    """
+    Plans downloading versions of a row
+
+    Args:
+      - url: URL of the listing's first page
+      - page: Page number of the listing the row is on, starting at 1
+      - key: Key of the row, see BpmSupreme.row_key()
+      - versions: List of version labels to download
+      - urls: Optional dict of version label to download URL
+
+    Returns:
+      - True if the row was added, False if it already is planned or no versions were given
+    """
+    if not isinstance(page, int) or page < 1:
+      raise ValueError("Error: Expected page greater than 0. Got {}".format(page))
+
+    if not versions or key in self._keys:
+      return False
+
+    entry = {"url": url, "page": page, "key": key, "versions": list(versions)}
+    urls = {version: (urls or dict()).get(version) for version in versions}
+    if any(urls.values()):
+      entry["urls"] = {version: link for version, link in urls.items() if link}
+
+    self._append(entry)
+    return True
+
+  def contains(self, key):
+    """
+    Returns True if the row with key is planned
+    """
+    return key in self._keys
+
+  def pages(self):
+    """
+    Groups the entries by the page they were found on
+
+    Returns:
+      - OrderedDict of (url, page) to list of entries, in the order the pages were planned
+    """
+    pages = collections.OrderedDict()
+    for entry in self.entries:
+      pages.setdefault((entry["url"], entry["page"]), []).append(entry)
+    return pages
+
+  def split(self, count):
+    """
+    Splits the plan into count plans of about the same number of
+    downloads, keeping the rows of a page together so each page is
+    loaded by a single plan
+
+    Args:
+      - count: Number of plans
+
+    Returns:
+      - List of count DownloadPlans, some of them empty if there are fewer pages
+    """
+    if not isinstance(count, int) or count < 1:
+      raise ValueError("Error: Expected count greater than 0. Got {}".format(count))
+
+    plans = [DownloadPlan() for plan in range(count)]
+    for entries in sorted(self.pages().values(), key=lambda entries: -sum(len(entry["versions"]) for entry in entries)):
+      smallest = min(plans, key=lambda plan: plan.downloads)
+      for entry in entries:
+        smallest._append(entry)
+    return plans
+
+  def save(self, path):
+    """
+    Writes the plan to path, replacing it atomically
+
+    Args:
+      - path: Path of the plan file
+    """
+    if not isinstance(path, str):
+      raise TypeError("Wrong type: Expected str for path; Got {}".format(type(path)))
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as plan:
+      for entry in self.entries:
+        plan.write(json.dumps(entry, separators=(",", ":")) + "\n")
+    os.replace(temporary_path, path)
+
+  @classmethod
+  def load(cls, path):
+    """
+    Reads a plan written by save()
+
+    Args:
+      - path: Path of the plan file
+
+    Returns:
+      - DownloadPlan
+    """
+    if not isinstance(path, str):
+      raise TypeError("Wrong type: Expected str for path; Got {}".format(type(path)))
+
+    with open(path) as plan:
+      return cls([json.loads(line) for line in plan if line.strip()])
+
+  def _append(self, entry):
+    self.entries.append(entry)
+    self._keys.add(entry["key"])
@@ -0,0 +1,444 @@
+# Standard imports
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+# Local imports
+try:
+  from .LibraryIndex import LibraryIndex
+except ImportError:
+  from LibraryIndex import LibraryIndex
+
+class DownloadWatcher:
+  """
+  Watches download_path for files finished by the browser, using
+  inotify on Linux and polling elsewhere. Completed files are matched
+  back to the Song whose click started them and inserted into the
+  library index as soon as they land, then handed to the organizer if
+  any. Files whose name matches no clicked Song are logged and kept as
+  unmatched. A Song whose file does not land before the deadline is
+  assumed to be the first unmatched file that landed after its click,
+  since servers do not always name files "Artist - Title (Version)",
+  else it is reported as expired so it can be re-queued.
+
+  Methods:
+    - expect()
+    - expired()
+    - wait()
+    - close()
+    - report()
+    - mp3_duration()
+  """
+
+  # Seconds a clicked download may take to land
+  DEADLINE = 300
+
+  # Seconds without any file activity after which wait(idle=...) stops
+  # waiting for the deadline of downloads that never started
+  IDLE = 30
+
+  # Seconds between polls, and the longest an inotify read blocks
+  POLL_INTERVAL = 0.5
+
+  # Extensions of files that are still being written
+  PARTIAL_EXTENSIONS = (".part", ".crdownload", ".tmp")
+
+  # inotify constants from <sys/inotify.h>
+  IN_CLOSE_WRITE = 0x00000008
+  IN_MOVED_FROM = 0x00000040
+  IN_MOVED_TO = 0x00000080
+  IN_CREATE = 0x00000100
+  IN_DELETE = 0x00000200
+  IN_NONBLOCK = 0o4000
+  IN_CLOEXEC = 0o2000000
+  _EVENT = struct.Struct("iIII")
+
+  # MPEG audio frame header tables, indexed by version then layer
+  _BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+  }
+  _SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+
+  def __init__(self, download_path, library=None, deadline=DEADLINE, poll_interval=POLL_INTERVAL, use_inotify=True, organizer=None):
+    """
+    Constructor for DownloadWatcher object
+
+    Args:
+      - download_path: Directory the browser saves downloads to
+      - library: Optional LibraryIndex completed files are added to
+      - deadline: Seconds an expected download may take to land
+      - poll_interval: Seconds between checks of download_path and deadlines
+      - use_inotify: Use inotify when available instead of polling
+      - organizer: Optional Organizer completed files are moved into the library by
+    """
+    if not isinstance(download_path, str):
+      raise TypeError("Wrong type: Expected str for download_path; Got {}".format(type(download_path)))
+
+    if not os.path.isdir(download_path):
+      raise ValueError("Error: {} is not a directory".format(download_path))
+
+    if library is not None and not isinstance(library, LibraryIndex):
+      raise TypeError("Wrong type: Expected LibraryIndex for library; Got {}".format(type(library)))
+
+    self.download_path = download_path
+    self.library = library
+    self.organizer = organizer
+    self.deadline = deadline
+    self.poll_interval = poll_interval
+    self.completed = []
+    self.unmatched = []
+    self.partials = set()
+    self._pending = dict()
+    self._expired = []
+    self._condition = threading.Condition()
+    self._closed = threading.Event()
+    self._activity = time.monotonic()
+
+    # Files already present are not new downloads
+    self._sizes = self._snapshot()
+    self._seen = set(self._sizes)
+
+    self._inotify = DownloadWatcher._inotify_init(download_path) if use_inotify else None
+    self.mode = "inotify" if self._inotify is not None else "polling"
+
+    self._thread = threading.Thread(target=self._watch, daemon=True)
+    self._thread.start()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def expect(self, song):
+    """
+    Registers a Song whose download was just started
+
+    Args:
+      - song: Song that was clicked
+    """
+    title, version = LibraryIndex.split_version(song.name)
+    with self._condition:
+      self._activity = time.monotonic()
+      self._pending.setdefault(LibraryIndex.key(title, version), []).append((song, self._activity))
+
+  def expired(self):
+    """
+    Returns and forgets the Songs whose download missed the deadline
+
+    Returns:
+      - List of Song objects
+    """
+    with self._condition:
+      self._check_deadlines()
+      expired, self._expired = self._expired, []
+    return expired
+
+  def wait(self, timeout=None, idle=None):
+    """
+    Blocks until every expected download has landed or expired
+
+    Args:
+      - timeout: Optional seconds to wait for, by default up to the deadline
+      - idle: Optional seconds without any file activity after which the
+        pending downloads expire early, e.g. at the end of a crawl when
+        no download can start anymore
+
+    Returns:
+      - List of Song objects whose download expired
+    """
+    end = time.monotonic() + timeout if timeout is not None else None
+    with self._condition:
+      while self._pending and not self._closed.is_set():
+        now = time.monotonic()
+        if idle is not None and not self.partials and now - self._activity > idle:
+          print("No download activity for {}s, giving up on {} pending downloads".format(idle, sum(len(songs) for songs in self._pending.values())))
+          self._check_deadlines(expire_all=True)
+          break
+        if end is not None and now >= end:
+          break
+        self._condition.wait(self.poll_interval if end is None else min(self.poll_interval, end - now))
+    return self.expired()
+
+  def close(self):
+    """
+    Stops watching download_path
+    """
+    self._closed.set()
+    self._thread.join()
+    if self._inotify is not None:
+      os.close(self._inotify)
+      self._inotify = None
+
+    with self._condition:
+      self._condition.notify_all()
+
+  def report(self):
+    """
+    Returns a summary of the downloads confirmed so far
+    """
+    with self._condition:
+      completed = list(self.completed)
+      pending = sum(len(songs) for songs in self._pending.values())
+      unmatched = len(self.unmatched)
+
+    size = sum(download["size"] for download in completed)
+    elapsed = [download["elapsed"] for download in completed if download["elapsed"] is not None]
+    return "Confirmed {} downloads ({:.1f} MB, {:.1f}s average to land) with {} pending and {} unmatched ({})".format(
+      len(completed), size / 1e6, sum(elapsed) / len(elapsed) if elapsed else 0.0, pending, unmatched, self.mode)
+
+  @staticmethod
+  def mp3_duration(path):
+    """
+    Estimates the duration of an MP3 from its first frame header, using
+    the Xing/Info frame count when present and the bitrate otherwise
+
+    Args:
+      - path: Path of the MP3 file
+
+    Returns:
+      - Duration in seconds, or None if no frame header is found
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as audio:
+      data = audio.read(64 * 1024)
+
+    # Skip an ID3v2 tag, whose size is stored as a 28 bit syncsafe integer
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+      offset = 10 + ((data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f))
+      if offset + 4 > len(data):
+        with open(path, "rb") as audio:
+          audio.seek(offset)
+          data = data[:offset] + audio.read(64 * 1024)
+
+    while offset + 4 <= len(data):
+      if data[offset] != 0xff or data[offset + 1] & 0xe0 != 0xe0:
+        offset += 1
+        continue
+
+      version = {3: 1, 2: 2, 0: 2.5}.get(data[offset + 1] >> 3 & 0x03)
+      layer = {3: 1, 2: 2, 1: 3}.get(data[offset + 1] >> 1 & 0x03)
+      bitrate_index = data[offset + 2] >> 4
+      sample_rate_index = data[offset + 2] >> 2 & 0x03
+      if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        offset += 1
+        continue
+
+      bitrate = DownloadWatcher._BITRATES[(min(version, 2), layer)][bitrate_index] * 1000
+      sample_rate = DownloadWatcher._SAMPLE_RATES[version][sample_rate_index]
+      samples = 384 if layer == 1 else 1152 if layer == 2 or version == 1 else 576
+
+      # A Xing or Info frame holds the frame count of VBR files
+      mono = data[offset + 3] >> 6 == 3
+      side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+      xing = offset + 4 + side_info
+      if data[xing:xing + 4] in (b"Xing", b"Info") and data[xing + 7] & 0x01:
+        frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+        return frames * samples / sample_rate
+
+      return (size - offset) * 8 / bitrate
+
+    return None
+
+  def _snapshot(self):
+    """
+    Returns the size of every file within download_path
+    """
+    sizes = dict()
+    with os.scandir(self.download_path) as entries:
+      for entry in entries:
+        try:
+          if entry.is_file():
+            sizes[entry.name] = entry.stat().st_size
+        except FileNotFoundError:
+          pass
+    return sizes
+
+  def _watch(self):
+    """
+    Runs until close(), feeding changed file names to _check()
+    """
+    while not self._closed.is_set():
+      if self._inotify is not None:
+        names = self._read_events()
+        if names:
+          self._activity = time.monotonic()
+        for name in names:
+          self._check(name)
+      else:
+        self._closed.wait(self.poll_interval)
+        self._poll()
+
+      with self._condition:
+        self._check_deadlines()
+
+  def _read_events(self):
+    """
+    Returns the names of files changed since the last read, waiting up
+    to poll_interval for any
+    """
+    readable = select.select([self._inotify], [], [], self.poll_interval)[0]
+    if not readable:
+      return []
+
+    try:
+      data = os.read(self._inotify, 64 * 1024)
+    except BlockingIOError:
+      return []
+
+    names = []
+    offset = 0
+    while offset + DownloadWatcher._EVENT.size <= len(data):
+      watch, mask, cookie, length = DownloadWatcher._EVENT.unpack_from(data, offset)
+      offset += DownloadWatcher._EVENT.size
+      names.append(data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape"))
+      offset += length
+    return names
+
+  def _poll(self):
+    """
+    Checks every file whose size has settled since the last poll
+    """
+    sizes = self._snapshot()
+    for name, size in sizes.items():
+      if name.endswith(DownloadWatcher.PARTIAL_EXTENSIONS):
+        self.partials.add(name)
+      elif name not in self._seen and self._sizes.get(name) == size:
+        self._check(name)
+
+    self.partials.intersection_update(sizes)
+    if sizes != self._sizes:
+      self._activity = time.monotonic()
+    self._sizes = sizes
+
+  def _check(self, name):
+    """
+    Updates the state of a changed file, recording it once complete
+    """
+    if name.endswith(DownloadWatcher.PARTIAL_EXTENSIONS):
+      if os.path.exists(os.path.join(self.download_path, name)):
+        self.partials.add(name)
+        return
+
+      # The partial file was renamed over or removed, check its final file
+      self.partials.discard(name)
+      name = os.path.splitext(name)[0]
+
+    if name in self._seen:
+      return
+
+    path = os.path.join(self.download_path, name)
+    try:
+      size = os.path.getsize(path)
+    except (FileNotFoundError, NotADirectoryError):
+      return
+
+    # Browsers create an empty placeholder next to the partial file
+    if not size or any(name + extension in self.partials for extension in DownloadWatcher.PARTIAL_EXTENSIONS):
+      return
+
+    self._seen.add(name)
+    self._complete(name, path, size)
+
+  def _complete(self, name, path, size):
+    """
+    Matches a completed file to its Song, adds it to the library and
+    queues it to be organized
+    """
+    try:
+      duration = DownloadWatcher.mp3_duration(path) if name.lower().endswith(".mp3") else None
+    except (OSError, IndexError, struct.error):
+      duration = None
+
+    artist, title, version = LibraryIndex.parse_name(os.path.splitext(name)[0])
+    artists = LibraryIndex.normalize_artists(artist)
+    song, elapsed = None, None
+
+    with self._condition:
+      key = LibraryIndex.key(title, version)
+      candidates = self._pending.get(key, [])
+      for candidate in candidates:
+        candidate_artists = LibraryIndex.normalize_artists(candidate[0].artist)
+        if not artists or not candidate_artists or artists & candidate_artists:
+          candidates.remove(candidate)
+          song, elapsed = candidate[0], time.monotonic() - candidate[1]
+          break
+      if not candidates:
+        self._pending.pop(key, None)
+
+      download = {"name": name, "song": song, "size": size, "duration": duration, "elapsed": elapsed}
+      self.completed.append(download)
+      if song is None:
+        print("Unmatched download: {}".format(name))
+        download["landed"] = time.monotonic()
+        self.unmatched.append(download)
+      self._condition.notify_all()
+
+    if self.library is not None:
+      self.library.add(artist, title, version)
+
+    if self.organizer is not None:
+      self.organizer.submit(path, song)
+
+  def _check_deadlines(self, expire_all=False):
+    """
+    Matches songs past the deadline, or every pending song when 
+    expire_all is set, to the unmatched files that landed after their
+    click, else moves them to the expired list. Must hold self._condition.
+    """
+    now = time.monotonic()
+    for key in list(self._pending):
+      for candidate in list(self._pending[key]):
+        if expire_all or now - candidate[1] > self.deadline:
+          self._pending[key].remove(candidate)
+          self._expire(*candidate)
+      if not self._pending[key]:
+        del self._pending[key]
+        self._condition.notify_all()
+
+  def _expire(self, song, clicked):
+    """
+    Assigns song the oldest unmatched file that landed after it was
+    clicked, else reports it as expired. Must hold self._condition.
+    """
+    for download in self.unmatched:
+      if download["landed"] >= clicked:
+        self.unmatched.remove(download)
+        download["song"], download["elapsed"] = song, download["landed"] - clicked
+        print("Assuming {} is the download of {} - {}".format(download["name"], song.artist, song.name))
+        return
+
+    print("Download did not land within {}s: {} - {}".format(self.deadline, song.artist, song.name))
+    self._expired.append(song)
+
+  @staticmethod
+  def _inotify_init(directory):
+    """
+    Returns an inotify file descriptor watching directory, or None when
+    inotify is unavailable
+    """
+    try:
+      libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+      descriptor = libc.inotify_init1(DownloadWatcher.IN_NONBLOCK | DownloadWatcher.IN_CLOEXEC)
+    except (OSError, AttributeError):
+      return None
+
+    if descriptor < 0:
+      return None
+
+    mask = DownloadWatcher.IN_CLOSE_WRITE | DownloadWatcher.IN_MOVED_FROM | DownloadWatcher.IN_MOVED_TO | DownloadWatcher.IN_CREATE | DownloadWatcher.IN_DELETE
+    if libc.inotify_add_watch(descriptor, os.fsencode(directory), mask) < 0:
+      os.close(descriptor)
+      return None
+
+    return descriptor
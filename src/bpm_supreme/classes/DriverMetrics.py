@@ -0,0 +1,203 @@
+# Standard imports
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+import weakref
+
+class DriverMetrics:
+  """
+  Counts and times every WebDriver command sent by the drivers it
+  instruments, tagged by the crawl phase it was sent in, and times the
+  phases themselves. Totals and latency histograms can be exported as
+  JSON and Prometheus text.
+
+  Phases used by BpmSupreme:
+    login, page_load, extract, duplicate_check, rate_limit, click,
+    popup_wait, pagination
+
+  Methods:
+    - instrument()
+    - phase()
+    - phase_of()
+    - record()
+    - to_json()
+    - to_prometheus()
+    - export()
+    - report()
+  """
+
+  # Upper bounds in seconds of the latency histogram buckets
+  BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+  # Phase of commands sent outside any phase
+  NO_PHASE = "other"
+
+  # Metrics of every instrumented driver
+  _drivers = weakref.WeakKeyDictionary()
+  _null_phase = contextlib.nullcontext()
+
+  def __init__(self, json_path=None, prometheus_path=None):
+    """
+    Constructor for DriverMetrics object
+
+    Args:
+      - json_path: Optional file export() writes JSON to
+      - prometheus_path: Optional file export() writes Prometheus text to
+    """
+    self.json_path = json_path
+    self.prometheus_path = prometheus_path
+    self.commands = dict()
+    self.phases = dict()
+    self._local = threading.local()
+    self._lock = threading.Lock()
+
+  def instrument(self, driver):
+    """
+    Wraps driver.execute so every command sent by the driver, or its
+    WebElements, is counted and timed
+
+    Args:
+      - driver: Selenium WebDriver object
+
+    Returns:
+      - driver
+    """
+    if DriverMetrics._drivers.get(driver) is self:
+      return driver
+
+    execute = driver.execute
+    def timed(command, params=None):
+      start = time.perf_counter()
+      try:
+        return execute(command, params)
+      finally:
+        self.record(self.commands, (self._phase(), command), time.perf_counter() - start)
+
+    driver.execute = timed
+    DriverMetrics._drivers[driver] = self
+    return driver
+
+  @staticmethod
+  def phase_of(driver, name):
+    """
+    Returns phase(name) of the metrics instrumenting driver, or a
+    context manager doing nothing if the driver is not instrumented
+    """
+    metrics = DriverMetrics._drivers.get(driver)
+    if metrics is None:
+      return DriverMetrics._null_phase
+    return metrics.phase(name)
+
+  @contextlib.contextmanager
+  def phase(self, name):
+    """
+    Context manager tagging the commands sent by this thread with name,
+    and timing the time spent within it
+    """
+    stack = self._stack()
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      stack.pop()
+      self.record(self.phases, name, time.perf_counter() - start)
+
+  def record(self, table, key, seconds):
+    """
+    Adds a sample to the count, total and histogram of key in table
+    """
+    bucket = bisect.bisect_left(DriverMetrics.BUCKETS, seconds)
+    with self._lock:
+      stats = table.get(key)
+      if stats is None:
+        stats = table[key] = {"count": 0, "seconds": 0.0, "buckets": [0] * (len(DriverMetrics.BUCKETS) + 1)}
+      stats["count"] += 1
+      stats["seconds"] += seconds
+      stats["buckets"][bucket] += 1
+
+  def to_json(self):
+    """
+    Returns the totals and histograms as a JSON serializable dict
+    """
+    def histogram(stats):
+      return {"count": stats["count"], "seconds": stats["seconds"],
+        "buckets": dict(zip([str(bound) for bound in DriverMetrics.BUCKETS] + ["+Inf"], DriverMetrics._cumulative(stats["buckets"])))}
+
+    with self._lock:
+      return {
+        "commands": [dict(phase=phase, command=command, **histogram(stats)) for (phase, command), stats in sorted(self.commands.items())],
+        "phases": [dict(phase=phase, **histogram(stats)) for phase, stats in sorted(self.phases.items())],
+        "total_commands": sum(stats["count"] for stats in self.commands.values()),
+      }
+
+  def to_prometheus(self):
+    """
+    Returns the totals and histograms in the Prometheus text format
+    """
+    lines = []
+    with self._lock:
+      for name, table, help_text in (
+          ("bpm_webdriver_command_seconds", self.commands, "WebDriver command latency by crawl phase"),
+          ("bpm_phase_seconds", self.phases, "Time spent within each crawl phase")):
+        lines.append("# HELP {} {}".format(name, help_text))
+        lines.append("# TYPE {} histogram".format(name))
+        for key, stats in sorted(table.items()):
+          labels = 'phase="{}",command="{}"'.format(*key) if isinstance(key, tuple) else 'phase="{}"'.format(key)
+          for bound, count in zip([str(bound) for bound in DriverMetrics.BUCKETS] + ["+Inf"], DriverMetrics._cumulative(stats["buckets"])):
+            lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound, count))
+          lines.append("{}_sum{{{}}} {}".format(name, labels, stats["seconds"]))
+          lines.append("{}_count{{{}}} {}".format(name, labels, stats["count"]))
+    return "\n".join(lines) + "\n"
+
+  def export(self):
+    """
+    Writes JSON to json_path and Prometheus text to prometheus_path,
+    for whichever of them is set
+    """
+    for path, content in ((self.json_path, lambda: json.dumps(self.to_json(), indent=2)), (self.prometheus_path, self.to_prometheus)):
+      if not path:
+        continue
+      temporary_path = path + ".tmp"
+      with open(temporary_path, "w") as output:
+        output.write(content())
+      os.replace(temporary_path, path)
+
+  def report(self):
+    """
+    Returns a summary of the commands sent and the time spent per phase
+    """
+    with self._lock:
+      commands = dict()
+      for (phase, command), stats in self.commands.items():
+        count, seconds = commands.get(phase, (0, 0.0))
+        commands[phase] = (count + stats["count"], seconds + stats["seconds"])
+      phases = {phase: stats["seconds"] for phase, stats in self.phases.items()}
+
+    lines = ["{:<16}{:>10}{:>14}{:>12}".format("phase", "commands", "command s", "phase s")]
+    for phase in sorted(set(commands) | set(phases)):
+      count, seconds = commands.get(phase, (0, 0.0))
+      lines.append("{:<16}{:>10}{:>14.3f}{:>12.3f}".format(phase, count, seconds, phases.get(phase, 0.0)))
+    return "\n".join(lines)
+
+  def _stack(self):
+    stack = getattr(self._local, "stack", None)
+    if stack is None:
+      stack = self._local.stack = []
+    return stack
+
+  def _phase(self):
+    stack = getattr(self._local, "stack", None)
+    return stack[-1] if stack else DriverMetrics.NO_PHASE
+
+  @staticmethod
+  def _cumulative(buckets):
+    total = 0
+    cumulative = []
+    for count in buckets:
+      total += count
+      cumulative.append(total)
+    return cumulative
@@ -0,0 +1,206 @@
+# Standard imports
+import collections
+import math
+import re
+import threading
+
+class FuzzyMatcher:
+  """
+  Approximate duplicate detection over normalized (title, version,
+  artists) entries, e.g. those of a LibraryIndex. Titles are compared
+  by the Dice similarity of their character trigrams, looked up in an
+  inverted index of trigram to entries partitioned by version. A title
+  similar enough must share a minimum number of trigrams with a query,
+  so only entries counted often enough in the posting lists of the
+  query's rarer trigrams are compared, and the most common trigrams are
+  never looked up at all, keeping lookups sub-linear in the size of the
+  library.
+
+  Versions must be equal, and artists must share a name, be similar
+  enough or be unknown on either side, like LibraryIndex.contains().
+
+  Methods:
+    - add()
+    - discard()
+    - match()
+    - contains()
+    - near_duplicates()
+    - trigrams()
+    - similarity()
+    - fold()
+  """
+
+  # Lowest Dice similarity of two titles considered the same song
+  THRESHOLD = 0.8
+
+  _APOSTROPHES = re.compile(r"['\u2019`]")
+  _PUNCTUATION = re.compile(r"[^\w\s]+")
+  _WHITESPACE = re.compile(r"\s+")
+
+  def __init__(self, threshold=THRESHOLD):
+    """
+    Constructor for FuzzyMatcher object
+
+    Args:
+      - threshold: Lowest title similarity, between 0 and 1, of a match
+    """
+    if not isinstance(threshold, (int, float)) or not 0 < threshold <= 1:
+      raise ValueError("Error: Expected threshold between 0 and 1. Got {}".format(threshold))
+
+    self.threshold = threshold
+    self._entries = dict()
+    self._ids = dict()
+    self._postings = collections.defaultdict(set)
+    self._next_id = 0
+    self._lock = threading.RLock()
+
+  def __len__(self):
+    return len(self._entries)
+
+  @staticmethod
+  def fold(text):
+    """
+    Folds apostrophes, punctuation and "&" of normalized text, e.g. a
+    title normalized by LibraryIndex.normalize()
+    """
+    text = FuzzyMatcher._APOSTROPHES.sub("", text.replace("&", " and "))
+    text = FuzzyMatcher._PUNCTUATION.sub(" ", text)
+    return FuzzyMatcher._WHITESPACE.sub(" ", text).strip()
+
+  @staticmethod
+  def trigrams(text):
+    """
+    Returns the frozenset of character trigrams of folded text, padded
+    so that short words still have trigrams
+    """
+    padded = "  {} ".format(FuzzyMatcher.fold(text))
+    return frozenset(padded[index:index + 3] for index in range(len(padded) - 2))
+
+  @staticmethod
+  def similarity(first, second):
+    """
+    Returns the Dice similarity, between 0 and 1, of two trigram sets
+    """
+    if not first and not second:
+      return 1.0
+    return 2 * len(first & second) / (len(first) + len(second))
+
+  def add(self, title, version, artists, name=None):
+    """
+    Adds an entry
+
+    Args:
+      - title: Normalized title
+      - version: Normalized version
+      - artists: frozenset of normalized artist names, empty if unknown
+      - name: Optional name of the entry reported by near_duplicates()
+    """
+    entry_key = (title, version, artists)
+    with self._lock:
+      if entry_key in self._ids:
+        return
+
+      grams = FuzzyMatcher.trigrams(title)
+      entry_id = self._next_id
+      self._next_id += 1
+      self._ids[entry_key] = entry_id
+      self._entries[entry_id] = (title, version, artists, grams, name or title)
+      for gram in grams:
+        self._postings[(version, gram)].add(entry_id)
+
+  def discard(self, title, version, artists):
+    """
+    Removes an entry added by add()
+    """
+    with self._lock:
+      entry_id = self._ids.pop((title, version, artists), None)
+      if entry_id is None:
+        return
+
+      grams = self._entries.pop(entry_id)[3]
+      for gram in grams:
+        postings = self._postings[(version, gram)]
+        postings.discard(entry_id)
+        if not postings:
+          del self._postings[(version, gram)]
+
+  def match(self, title, version, artists, limit=1):
+    """
+    Finds the entries most similar to a song
+
+    Args:
+      - title: Normalized title
+      - version: Normalized version
+      - artists: frozenset of normalized artist names, empty if unknown
+      - limit: Most matches returned
+
+    Returns:
+      - List of (similarity, name) tuples of at least self.threshold, most similar first
+    """
+    grams = FuzzyMatcher.trigrams(title)
+    with self._lock:
+      matches = [(score, self._entries[entry_id][4]) for score, entry_id in self._search(grams, version, artists)]
+    matches.sort(key=lambda match: -match[0])
+    return matches[:limit]
+
+  def contains(self, title, version, artists):
+    """
+    Returns True if any entry matches the song, see match()
+    """
+    return bool(self.match(title, version, artists))
+
+  def near_duplicates(self):
+    """
+    Finds every pair of entries matching each other that are not
+    exact duplicates
+
+    Returns:
+      - List of (similarity, name, name) tuples, most similar first
+    """
+    pairs = []
+    with self._lock:
+      for entry_id, (title, version, artists, grams, name) in self._entries.items():
+        for score, other_id in self._search(grams, version, artists):
+          if other_id > entry_id and self._entries[other_id][0] != title:
+            pairs.append((score, name, self._entries[other_id][4]))
+    pairs.sort(key=lambda pair: (-pair[0], pair[1]))
+    return pairs
+
+  def _search(self, grams, version, artists):
+    """
+    Yields (similarity, entry id) of every entry matching the trigrams,
+    version and artists of a song. Must hold self._lock
+
+    A title similar enough to grams shares at least m = t * |grams| / (2 - t)
+    of its trigrams. Entries are counted in the posting lists of all but
+    the m // 2 most common trigrams of grams, so only those counted at
+    least m - m // 2 times can match and are compared in full.
+    """
+    if not grams:
+      return
+
+    least_shared = max(1, math.ceil(self.threshold * len(grams) / (2 - self.threshold) - 1e-9))
+    skipped = least_shared // 2
+    rarest = sorted(grams, key=lambda gram: len(self._postings.get((version, gram), ())))
+
+    counts = collections.Counter()
+    for gram in rarest[:len(grams) - skipped]:
+      counts.update(self._postings.get((version, gram), ()))
+
+    needed = least_shared - skipped
+    for entry_id in [entry_id for entry_id, count in counts.items() if count >= needed]:
+      entry_artists, entry_grams = self._entries[entry_id][2:4]
+      score = FuzzyMatcher.similarity(grams, entry_grams)
+      if score >= self.threshold and self._same_artists(artists, entry_artists):
+        yield score, entry_id
+
+  def _same_artists(self, artists, other):
+    if not artists or not other or artists & other:
+      return True
+
+    for artist in artists:
+      grams = FuzzyMatcher.trigrams(artist)
+      for candidate in other:
+        if FuzzyMatcher.similarity(grams, FuzzyMatcher.trigrams(candidate)) >= self.threshold:
+          return True
+    return False
@@ -0,0 +1,344 @@
+# Standard imports
+import http.client
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+class HttpDownloader:
+  """
+  Downloads songs straight over HTTP using the authenticated session
+  cookies of a WebDriver, instead of clicking through the browser.
+  Files are streamed to a .part file, resumed with Range requests and
+  atomically renamed into download_path once complete. The ETag or
+  Last-Modified of the file is kept next to its .part file and sent as
+  If-Range, so a file changed on the server is downloaded from scratch
+  instead of being appended to the old bytes. Responses that
+  are not audio, e.g. a login page served once the session expired, are
+  never written, and a .part file is only taken as complete when the 
+  server confirms its length.
+
+  Methods:
+    - set_session()
+    - download()
+    - submit()
+    - close()
+    - complete_length()
+    - range_start()
+  """
+
+  class RateLimitError(http.client.HTTPException):
+    """
+    Raised when the server answers HTTP 429 Too Many Requests
+    """
+
+  WORKERS = 4
+  CHUNK_SIZE = 64 * 1024
+  TIMEOUT = 60
+  MAX_REDIRECTS = 5
+
+  # Content-Type prefixes of the files downloaded
+  CONTENT_TYPES = ("audio/", "application/octet-stream")
+
+  # Suffix of the file keeping the validator of a .part file, itself a
+  # partial file so download watchers ignore it
+  VALIDATOR_SUFFIX = ".validator.part"
+
+  def __init__(self, download_path, workers=WORKERS, chunk_size=CHUNK_SIZE, timeout=TIMEOUT, progress=None):
+    """
+    Constructor for HttpDownloader object
+
+    Args:
+      - download_path: Directory completed files are moved into
+      - workers: Number of concurrent downloads started by submit()
+      - chunk_size: Number of bytes read and written at a time
+      - timeout: Socket timeout in seconds
+      - progress: Optional callable(filename, received, total) called after every chunk
+    """
+    if not isinstance(download_path, str):
+      raise TypeError("Wrong type: Expected str for download_path; Got {}".format(type(download_path)))
+
+    if not os.path.isdir(download_path):
+      raise ValueError("Bad path: Expected valid path")
+
+    self.download_path = download_path
+    self.chunk_size = chunk_size
+    self.timeout = timeout
+    self.progress = progress
+    self.cookies = []
+    self.user_agent = None
+    self.connections_opened = 0
+    self._idle = dict()
+    self._lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(workers)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def set_session(self, cookies, user_agent=None):
+    """
+    Sets the session used for every request
+
+    Args:
+      - cookies: List of cookie dicts, as returned by WebDriver.get_cookies()
+      - user_agent: Optional User-Agent header, e.g. the browser's navigator.userAgent
+    """
+    self.cookies = list(cookies)
+    self.user_agent = user_agent
+
+  def submit(self, url, filename):
+    """
+    Queues a download on the worker pool
+
+    Args:
+      - url: URL of the file
+      - filename: Name of the file within download_path
+
+    Returns:
+      - concurrent.futures.Future resolving to the downloaded file path
+    """
+    return self._executor.submit(self.download, url, filename)
+
+  def download(self, url, filename):
+    """
+    Downloads url into download_path/filename, resuming from a previous
+    .part file when one exists
+
+    Args:
+      - url: URL of the file
+      - filename: Name of the file within download_path
+
+    Returns:
+      - Path of the downloaded file
+    """
+    path = os.path.join(self.download_path, filename)
+    part_path = path + ".part"
+    validator_path = path + HttpDownloader.VALIDATOR_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    validator = HttpDownloader._read_validator(validator_path) if offset else None
+
+    response, connection, key = self._request(url, offset, validator)
+    restart = False
+    try:
+      if response.status == 416 and offset:
+        # The .part file holds the whole file only if the server reports
+        # its length as the complete length
+        restart = HttpDownloader.complete_length(response) != offset
+      elif response.status == 206 and offset:
+        # Only a range starting where the .part file ends may be appended
+        restart = HttpDownloader.range_start(response) != offset
+        if not restart:
+          HttpDownloader._check_type(response, url)
+          self._write(response, part_path, filename, offset, "ab")
+      elif response.status == 200:
+        HttpDownloader._check_type(response, url)
+        HttpDownloader._write_validator(validator_path, response)
+        self._write(response, part_path, filename, 0, "wb")
+      elif response.status == 429:
+        raise HttpDownloader.RateLimitError("Error: Got HTTP 429 for {}".format(url))
+      else:
+        raise http.client.HTTPException("Error: Got HTTP {} for {}".format(response.status, url))
+    except:
+      connection.close()
+      raise
+
+    if restart:
+      # The rest of a mismatched range is not worth reading
+      connection.close()
+      print("Discarding {}: {} bytes do not match the file at {}".format(part_path, offset, url))
+      os.remove(part_path)
+      if os.path.exists(validator_path):
+        os.remove(validator_path)
+      return self.download(url, filename)
+
+    self._release(key, connection, response)
+    os.replace(part_path, path)
+    if os.path.exists(validator_path):
+      os.remove(validator_path)
+    return path
+
+  def close(self):
+    """
+    Waits for every submitted download and closes all pooled connections
+    """
+    self._executor.shutdown(wait=True)
+    with self._lock:
+      for connections in self._idle.values():
+        for connection in connections:
+          connection.close()
+      self._idle.clear()
+
+  @staticmethod
+  def complete_length(response):
+    """
+    Returns the complete length of the file in the Content-Range header
+    of a response, e.g. 1000 of "bytes */1000", or None if unknown
+    """
+    content_range = response.getheader("Content-Range") or ""
+    length = content_range.rpartition("/")[2].strip()
+    return int(length) if content_range.startswith("bytes") and length.isdigit() else None
+
+  @staticmethod
+  def range_start(response):
+    """
+    Returns the first byte of the range in the Content-Range header of
+    a response, e.g. 100 of "bytes 100-999/1000", or None if unknown
+    """
+    content_range = response.getheader("Content-Range") or ""
+    start = content_range[len("bytes"):].partition("-")[0].strip()
+    return int(start) if content_range.startswith("bytes") and start.isdigit() else None
+
+  @staticmethod
+  def _read_validator(validator_path):
+    """
+    Returns the ETag or Last-Modified a .part file was downloaded with, or None
+    """
+    try:
+      with open(validator_path) as validator:
+        return validator.read().strip() or None
+    except FileNotFoundError:
+      return None
+
+  @staticmethod
+  def _write_validator(validator_path, response):
+    """
+    Keeps the strong ETag, or else the Last-Modified, of a response to
+    send as If-Range when its .part file is resumed
+    """
+    etag = response.getheader("ETag")
+    validator = etag if etag and not etag.startswith("W/") else response.getheader("Last-Modified")
+    if validator:
+      with open(validator_path, "w") as validator_file:
+        validator_file.write(validator)
+    elif os.path.exists(validator_path):
+      os.remove(validator_path)
+
+  @staticmethod
+  def _check_type(response, url):
+    """
+    Raises http.client.HTTPException unless response holds a file of CONTENT_TYPES
+    """
+    content_type = (response.getheader("Content-Type") or "").split(";")[0].strip().lower()
+    if not content_type.startswith(HttpDownloader.CONTENT_TYPES):
+      raise http.client.HTTPException("Error: Expected audio for {}. Got {}".format(url, content_type or "no Content-Type"))
+
+  def _write(self, response, part_path, filename, offset, mode):
+    """
+    Streams response into part_path in chunks and flushes it to disk
+    """
+    length = response.getheader("Content-Length")
+    total = offset + int(length) if length is not None else None
+    received = offset
+
+    with open(part_path, mode) as part:
+      while True:
+        chunk = response.read(self.chunk_size)
+        if not chunk:
+          break
+        part.write(chunk)
+        received += len(chunk)
+        if self.progress:
+          self.progress(filename, received, total)
+
+      part.flush()
+      os.fsync(part.fileno())
+
+    if total is not None and received != total:
+      raise http.client.IncompleteRead(b"", total - received)
+
+  def _request(self, url, offset, validator=None):
+    """
+    Sends a GET request for url, following redirects. From a non-zero
+    offset only the rest of the file is asked for, and only if it still
+    matches validator when one is given.
+
+    Returns:
+      - Tuple of (response, connection, pool key)
+    """
+    for redirect in range(HttpDownloader.MAX_REDIRECTS + 1):
+      parts = urlsplit(url)
+      key = (parts.scheme, parts.hostname, parts.port)
+      headers = {"Accept-Encoding": "identity"}
+
+      cookie = self._cookie_header(parts.hostname, parts.path or "/", parts.scheme == "https")
+      if cookie:
+        headers["Cookie"] = cookie
+      if self.user_agent:
+        headers["User-Agent"] = self.user_agent
+      if offset:
+        headers["Range"] = "bytes={}-".format(offset)
+        if validator:
+          headers["If-Range"] = validator
+
+      target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+      connection = self._acquire(key)
+      try:
+        connection.request("GET", target, headers=headers)
+        response = connection.getresponse()
+      except (http.client.HTTPException, OSError):
+        # A pooled connection may have been closed by the server, so retry once on a new one
+        connection.close()
+        connection = self._connect(key)
+        connection.request("GET", target, headers=headers)
+        response = connection.getresponse()
+
+      if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+        url = urljoin(url, response.getheader("Location"))
+        self._release(key, connection, response)
+        continue
+
+      return response, connection, key
+
+    raise http.client.HTTPException("Error: Too many redirects for {}".format(url))
+
+  def _cookie_header(self, host, path, secure):
+    """
+    Returns the Cookie header for a request to host, or None
+    """
+    cookies = []
+    for cookie in self.cookies:
+      domain = cookie.get("domain", host).lstrip(".")
+      if host != domain and not host.endswith("." + domain):
+        continue
+      if not path.startswith(cookie.get("path", "/")):
+        continue
+      if cookie.get("secure") and not secure:
+        continue
+      cookies.append("{}={}".format(cookie["name"], cookie["value"]))
+
+    return "; ".join(cookies) or None
+
+  def _acquire(self, key):
+    """
+    Takes an idle pooled connection for key, or opens a new one
+    """
+    with self._lock:
+      if self._idle.get(key):
+        return self._idle[key].pop()
+
+    return self._connect(key)
+
+  def _connect(self, key):
+    scheme, host, port = key
+    with self._lock:
+      self.connections_opened += 1
+
+    if scheme == "https":
+      return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+    return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+  def _release(self, key, connection, response):
+    """
+    Returns connection to the pool once response has been fully read
+    """
+    response.read()
+    if response.will_close:
+      connection.close()
+      return
+
+    with self._lock:
+      self._idle.setdefault(key, []).append(connection)
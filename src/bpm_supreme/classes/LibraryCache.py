@@ -0,0 +1,221 @@
+# Standard imports
+import argparse
+import os
+import sqlite3
+import time
+
+# Local imports
+try:
+  from .LibraryScanner import LibraryScanner
+except ImportError:
+  from LibraryScanner import LibraryScanner
+
+class LibraryCache:
+  """
+  SQLite snapshot of library directories so that only directories
+  whose mtime changed since the last run are read again. The tags of
+  their files are kept too when they were read, see LibraryScanner.
+
+  Methods:
+    - scan()
+    - build()
+    - load()
+    - store()
+    - prune()
+    - clear()
+    - close()
+    - report()
+  """
+
+  SCHEMA_VERSION = 3
+
+  # Directories modified this recently are rescanned on the next run,
+  # since a change within the same mtime tick would go unnoticed
+  RACY_WINDOW_NS = 2 * 10**9
+
+  def __init__(self, path):
+    """
+    Constructor for LibraryCache object
+
+    Args:
+      - path: Path of the SQLite database file, created if missing
+    """
+    if not isinstance(path, str):
+      raise TypeError("Wrong type: Expected str for path; Got {}".format(type(path)))
+
+    self.path = path
+    self.reused = 0
+    self.rescanned = 0
+    self._connection = sqlite3.connect(path)
+
+    if self._connection.execute("PRAGMA user_version").fetchone()[0] != LibraryCache.SCHEMA_VERSION:
+      self._connection.executescript(
+        """
+          DROP TABLE IF EXISTS directories;
+          DROP TABLE IF EXISTS entries;
+          CREATE TABLE directories (path TEXT PRIMARY KEY, mtime_ns INTEGER, entry_count INTEGER NOT NULL, tagged INTEGER NOT NULL DEFAULT 0);
+          CREATE TABLE entries (directory TEXT NOT NULL, name TEXT NOT NULL, is_dir INTEGER NOT NULL, title TEXT, artist TEXT, version TEXT, PRIMARY KEY (directory, name));
+        """)
+      self._connection.execute("PRAGMA user_version = {}".format(LibraryCache.SCHEMA_VERSION))
+      self._connection.commit()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def load(self):
+    """
+    Reads the whole snapshot. Directories whose entry count does not
+    match their cached entries are left out so they get rescanned.
+
+    Returns:
+      - dict of directory to (mtime_ns, files, subdirs, tags), where tags
+        is a dict of file name to the tags read by TagReader, or None if
+        the tags of the directory were not read
+    """
+    snapshot = dict()
+    for directory, mtime_ns, entry_count, tagged in self._connection.execute("SELECT path, mtime_ns, entry_count, tagged FROM directories"):
+      snapshot[directory] = (mtime_ns, [], [], dict() if tagged else None, entry_count)
+
+    for directory, name, is_dir, title, artist, version in self._connection.execute("SELECT directory, name, is_dir, title, artist, version FROM entries"):
+      if directory in snapshot:
+        listing = snapshot[directory]
+        listing[2 if is_dir else 1].append(name)
+        if listing[3] is not None and not is_dir:
+          listing[3][name] = {field: value for field, value in (("title", title), ("artist", artist), ("version", version)) if value}
+
+    return {directory: (mtime_ns, files, subdirs, tags)
+      for directory, (mtime_ns, files, subdirs, tags, entry_count) in snapshot.items()
+      if mtime_ns is not None and len(files) + len(subdirs) == entry_count}
+
+  def store(self, listings):
+    """
+    Replaces the cached listings of the given directories in one transaction
+
+    Args:
+      - listings: Iterable of (directory, mtime_ns, files, subdirs), or
+        of (directory, mtime_ns, files, subdirs, tags) where tags is a
+        dict of file name to the tags read by TagReader
+    """
+    now = time.time_ns()
+    with self._connection:
+      for directory, mtime_ns, files, subdirs, *tags in listings:
+        tags = tags[0] if tags else None
+        if now - mtime_ns < LibraryCache.RACY_WINDOW_NS:
+          mtime_ns = None
+
+        self._connection.execute("DELETE FROM entries WHERE directory = ?", (directory,))
+        self._connection.executemany("INSERT INTO entries (directory, name, is_dir, title, artist, version) VALUES (?, ?, ?, ?, ?, ?)",
+          [(directory, name, 0) + tuple((tags or dict()).get(name, dict()).get(field) for field in ("title", "artist", "version")) for name in files] +
+          [(directory, name, 1, None, None, None) for name in subdirs])
+        self._connection.execute("INSERT OR REPLACE INTO directories (path, mtime_ns, entry_count, tagged) VALUES (?, ?, ?, ?)",
+          (directory, mtime_ns, len(files) + len(subdirs), tags is not None))
+
+  def prune(self, roots, visited):
+    """
+    Removes cached directories under roots that no longer exist
+
+    Args:
+      - roots: Library roots that were scanned
+      - visited: Set of every directory found under roots
+    """
+    with self._connection:
+      for (directory,) in self._connection.execute("SELECT path FROM directories").fetchall():
+        if directory in visited:
+          continue
+        if any(directory.startswith(os.path.join(root, "")) for root in roots):
+          self._connection.execute("DELETE FROM entries WHERE directory = ?", (directory,))
+          self._connection.execute("DELETE FROM directories WHERE path = ?", (directory,))
+
+  def scan(self, directory, rebuild=False):
+    """
+    Lists the file names within directory, reading the directory only
+    if it changed since it was last cached
+
+    Args:
+      - directory: Directory to list
+      - rebuild: Ignore the cached snapshot and always read the directory
+
+    Returns:
+      - list of file names within directory
+    """
+    if not os.path.isdir(directory):
+      raise ValueError("Error: Invalid path provided")
+
+    directory = os.path.abspath(directory)
+    mtime_ns = os.stat(directory).st_mtime_ns
+
+    row = self._connection.execute("SELECT mtime_ns, entry_count FROM directories WHERE path = ?", (directory,)).fetchone()
+    if row and row[0] == mtime_ns and not rebuild:
+      names = [name for (name,) in self._connection.execute("SELECT name FROM entries WHERE directory = ? AND is_dir = 0", (directory,))]
+      subdir_count = self._connection.execute("SELECT COUNT(*) FROM entries WHERE directory = ? AND is_dir = 1", (directory,)).fetchone()[0]
+      if len(names) + subdir_count == row[1]:
+        self.reused += len(names)
+        return names
+
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+      for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+          subdirs.append(entry.name)
+        elif entry.is_file():
+          files.append(entry.name)
+    self.rescanned += len(files)
+
+    self.store([(directory, mtime_ns, files, subdirs)])
+    return files
+
+  def build(self, directories, rebuild=False, workers=LibraryScanner.WORKERS, tags=False):
+    """
+    Builds a LibraryIndex of every file within directories and their
+    subdirectories
+
+    Args:
+      - directories: Iterable of library roots to index
+      - rebuild: Ignore the cached snapshot and read every directory
+      - workers: Number of directories listed concurrently
+      - tags: Index songs by the tags of their files too, see LibraryScanner
+
+    Returns:
+      - LibraryIndex of all files within directories
+    """
+    scanner = LibraryScanner(directories, workers=workers, cache=self, rebuild=rebuild, tags=tags)
+    library = scanner.scan()
+    self.reused += scanner.reused
+    self.rescanned += scanner.rescanned
+    print(scanner.report())
+    return library
+
+  def clear(self):
+    """
+    Removes every cached directory so the next scan reads everything
+    """
+    with self._connection:
+      self._connection.execute("DELETE FROM entries")
+      self._connection.execute("DELETE FROM directories")
+
+  def report(self):
+    """
+    Returns a str describing how many entries were reused vs rescanned
+    """
+    return "Library: {} entries reused, {} entries rescanned".format(self.reused, self.rescanned)
+
+  def close(self):
+    self._connection.close()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Update the cached snapshot of a local library")
+  parser.add_argument("cache", help="Path of the SQLite library cache")
+  parser.add_argument("directories", nargs="+", help="Library roots to index")
+  parser.add_argument("--rebuild", action="store_true", help="Ignore the cache and rescan every directory")
+  parser.add_argument("--workers", type=int, default=LibraryScanner.WORKERS, help="Number of directories listed concurrently")
+  parser.add_argument("--tags", action="store_true", help="Read the tags of audio files too")
+  args = parser.parse_args()
+
+  with LibraryCache(args.cache) as cache:
+    library = cache.build(args.directories, rebuild=args.rebuild, workers=args.workers, tags=args.tags)
+    print("{} songs indexed".format(len(library)))
+    print(cache.report())
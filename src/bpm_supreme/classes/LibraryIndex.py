@@ -0,0 +1,365 @@
+# Standard imports
+import re
+import threading
+
+# Local imports
+try:
+  from .FuzzyMatcher import FuzzyMatcher
+except ImportError:
+  from FuzzyMatcher import FuzzyMatcher
+
+class LibraryIndex:
+  """
+  Index of songs within a local library keyed on a normalized
+  (title, version) pair, with the artists of every entry sharing
+  that pair kept alongside for constant time duplicate detection.
+  Optionally songs missing from the index are also looked up in a
+  FuzzyMatcher, so near duplicates count as duplicates too.
+
+  Methods:
+    - add()
+    - add_file()
+    - contains()
+    - contains_song()
+    - contains_many()
+    - claim()
+    - claim_song()
+    - discard()
+    - discard_song()
+    - update()
+    - enable_fuzzy()
+    - near_duplicates()
+    - normalize()
+    - normalize_artists()
+    - parse_name()
+  """
+
+  # File extensions stripped from file names before parsing
+  EXTENSIONS = (".mp3", ".wav", ".m4a", ".aiff", ".aif")
+
+  # Artist names that mean no artist is known
+  UNKNOWN_ARTISTS = ("", "unknown")
+
+  # Patterns used to fold "feat." variations together
+  _FEAT_GROUP = re.compile(r"[\(\[]\s*(?:featuring|feat\.?|ft\.?)\s+([^\)\]]*)[\)\]]")
+  _FEAT_WORD = re.compile(r"(?<!\w)(?:featuring|feat\.?|ft\.?)(?=\s)")
+  _WHITESPACE = re.compile(r"\s+")
+  _ARTIST_SEPARATORS = re.compile(r"\s*(?:,|&|\s(?:feat|x|vs\.?)\s)\s*")
+  _VERSION = re.compile(r"^(.*?)\s*\(([^\(\)]*)\)$")
+
+  def __init__(self, names=(), fuzzy_threshold=None):
+    """
+    Constructor for LibraryIndex object
+
+    Args:
+      - names: Iterable of file names to index
+      - fuzzy_threshold: Optional title similarity enabling fuzzy matching, see enable_fuzzy()
+    """
+    self._entries = dict()
+    self._names = set()
+    self._lock = threading.RLock()
+    self.fuzzy = None
+
+    if fuzzy_threshold is not None:
+      self.enable_fuzzy(fuzzy_threshold)
+
+    for name in names:
+      self.add_file(name)
+
+  def __len__(self):
+    """
+    Returns the number of songs indexed, one per artist of each
+    (title, version) pair
+    """
+    with self._lock:
+      return sum(len(artists) for artists in self._entries.values())
+
+  def __iter__(self):
+    """
+    Iterates over the legacy "Title (Version)" names, shared by every
+    artist of a title, so there may be fewer of them than len()
+    """
+    with self._lock:
+      return iter(list(self._names))
+
+  def __contains__(self, item):
+    if isinstance(item, str):
+      return self.contains(*LibraryIndex.parse_name(item))
+
+    if isinstance(item, tuple):
+      return self.contains(*item)
+
+    return self.contains_song(item)
+
+  @staticmethod
+  def normalize(text):
+    """
+    Folds case, whitespace and "feat." variations of text
+
+    Args:
+      - text: str to normalize
+
+    Returns:
+      - Normalized str
+    """
+    text = text.casefold()
+    text = LibraryIndex._FEAT_GROUP.sub(r" feat \1", text)
+    text = LibraryIndex._FEAT_WORD.sub("feat", text)
+    return LibraryIndex._WHITESPACE.sub(" ", text).strip()
+
+  @staticmethod
+  def normalize_artists(artist):
+    """
+    Splits artist into a set of normalized artist names
+
+    Args:
+      - artist: str of one or more artists
+
+    Returns:
+      - frozenset of normalized artist names, empty if the artist is unknown
+    """
+    artist = LibraryIndex.normalize(artist)
+    if artist in LibraryIndex.UNKNOWN_ARTISTS:
+      return frozenset()
+
+    return frozenset(name for name in LibraryIndex._ARTIST_SEPARATORS.split(artist) if name)
+
+  @staticmethod
+  def parse_name(name):
+    """
+    Splits a file or song name of the form "Artist - Title (Version).mp3"
+    into its parts. Artist and version are optional.
+
+    Args:
+      - name: File or song name
+
+    Returns:
+      - Tuple of (artist, title, version) strs
+    """
+    for extension in LibraryIndex.EXTENSIONS:
+      if name.lower().endswith(extension):
+        name = name[:-len(extension)]
+        break
+
+    artist = ""
+    if " - " in name:
+      artist, name = name.rsplit(" - ", 1)
+
+    return (artist.strip(),) + LibraryIndex.split_version(name)
+
+  @staticmethod
+  def split_version(title):
+    """
+    Splits a trailing "(Version)" off of title. "(feat. Artist)" is
+    left as part of the title.
+
+    Args:
+      - title: Song title
+
+    Returns:
+      - Tuple of (title, version) strs
+    """
+    title = title.strip()
+    match = LibraryIndex._VERSION.match(title)
+    if not match or LibraryIndex.normalize(match.group(2)).startswith("feat "):
+      return title, ""
+
+    return match.group(1), match.group(2).strip()
+
+  @staticmethod
+  def key(title, version=""):
+    """
+    Returns the normalized (title, version) key used by the index
+    """
+    return LibraryIndex.normalize(title), LibraryIndex.normalize(version)
+
+  def add(self, artist, title, version=""):
+    """
+    Adds a song to the index
+
+    Args:
+      - artist: Song artist, empty if unknown
+      - title: Song title
+      - version: Song version, e.g. "Intro Dirty"
+    """
+    key = LibraryIndex.key(title, version)
+    artists = LibraryIndex.normalize_artists(artist)
+    with self._lock:
+      self._entries.setdefault(key, set()).add(artists)
+      self._names.add("{} ({})".format(title, version) if version else title)
+      if self.fuzzy is not None:
+        self.fuzzy.add(key[0], key[1], artists, "{} - {} ({})".format(artist, title, version) if version else "{} - {}".format(artist, title))
+
+  def add_file(self, name, tags=None):
+    """
+    Adds a file name of the form "Artist - Title (Version).mp3" to the index.
+    When the file's tags have a title, the song they describe is added
+    too, taking fields missing from the tags from the file name.
+
+    Args:
+      - name: File name
+      - tags: Optional dict of "title", "artist" and "version" read by TagReader
+    """
+    artist, title, version = LibraryIndex.parse_name(name)
+    if tags and tags.get("title"):
+      tagged_title, tagged_version = LibraryIndex.split_version(tags["title"])
+      tagged = (tags.get("artist") or artist, tagged_title, tags.get("version") or tagged_version or version)
+      self.add(*tagged)
+      if tagged == (artist, title, version):
+        return
+
+    self.add(artist, title, version)
+
+  def update(self, other):
+    """
+    Merges another LibraryIndex into this one
+
+    Args:
+      - other: LibraryIndex to merge
+    """
+    if not isinstance(other, LibraryIndex):
+      raise TypeError("Wrong type: Expected LibraryIndex for other; Got {}".format(type(other)))
+
+    with self._lock, other._lock:
+      for key, artists in other._entries.items():
+        self._entries.setdefault(key, set()).update(artists)
+        if self.fuzzy is not None:
+          for names in artists:
+            self.fuzzy.add(key[0], key[1], names)
+      self._names.update(other._names)
+
+  def enable_fuzzy(self, threshold=FuzzyMatcher.THRESHOLD):
+    """
+    Indexes every song in a FuzzyMatcher, kept up to date from then on,
+    which contains() falls back to when a song is not in the index
+
+    Args:
+      - threshold: Lowest title similarity, between 0 and 1, of a match
+    """
+    fuzzy = FuzzyMatcher(threshold)
+    with self._lock:
+      for (title, version), artists in self._entries.items():
+        for names in artists:
+          fuzzy.add(title, version, names)
+      self.fuzzy = fuzzy
+
+  def near_duplicates(self):
+    """
+    Returns the pairs of songs in the index matched by fuzzy matching,
+    see FuzzyMatcher.near_duplicates()
+    """
+    if self.fuzzy is None:
+      raise ValueError("Error: Expected fuzzy matching enabled; Got None")
+
+    return self.fuzzy.near_duplicates()
+
+  def contains(self, artist, title, version=""):
+    """
+    Checks if a song is within the index. Songs match when their titles
+    and versions are equal and they share an artist, or either artist is
+    unknown. When fuzzy matching is enabled similar titles and artists
+    match too.
+
+    Args:
+      - artist: Song artist, empty if unknown
+      - title: Song title
+      - version: Song version
+
+    Returns:
+      - True if the song is within the index, else False
+    """
+    key = LibraryIndex.key(title, version)
+    artists = LibraryIndex.normalize_artists(artist)
+
+    with self._lock:
+      known_artists = self._entries.get(key)
+      if known_artists is not None:
+        if not artists:
+          return True
+
+        for known in known_artists:
+          if not known or known & artists:
+            return True
+
+      if self.fuzzy is not None:
+        return self.fuzzy.contains(key[0], key[1], artists)
+
+    return False
+
+  def contains_song(self, song):
+    """
+    Checks if a Song, whose name has its version appended, is within the index
+
+    Args:
+      - song: Song object
+
+    Returns:
+      - True if the song is within the index, else False
+    """
+    return self.contains(song.artist, *LibraryIndex.split_version(song.name))
+
+  def claim(self, artist, title, version=""):
+    """
+    Atomically adds a song unless it is already within the index, so
+    that concurrent workers never download the same version twice
+
+    Args:
+      - artist: Song artist, empty if unknown
+      - title: Song title
+      - version: Song version
+
+    Returns:
+      - True if the song was added, False if it was already within the index
+    """
+    with self._lock:
+      if self.contains(artist, title, version):
+        return False
+      self.add(artist, title, version)
+      return True
+
+  def claim_song(self, song):
+    """
+    claim() for a Song whose name has its version appended
+    """
+    return self.claim(song.artist, *LibraryIndex.split_version(song.name))
+
+  def discard(self, artist, title, version=""):
+    """
+    Removes a song added by claim(), e.g. after its download failed
+
+    Args:
+      - artist: Song artist, empty if unknown
+      - title: Song title
+      - version: Song version
+    """
+    key = LibraryIndex.key(title, version)
+    with self._lock:
+      known_artists = self._entries.get(key)
+      if known_artists is None:
+        return
+
+      artists = LibraryIndex.normalize_artists(artist)
+      known_artists.discard(artists)
+      if self.fuzzy is not None:
+        self.fuzzy.discard(key[0], key[1], artists)
+      if not known_artists:
+        del self._entries[key]
+        self._names.discard("{} ({})".format(title, version) if version else title)
+
+  def discard_song(self, song):
+    """
+    discard() for a Song whose name has its version appended
+    """
+    self.discard(song.artist, *LibraryIndex.split_version(song.name))
+
+  def contains_many(self, candidates):
+    """
+    Checks a whole batch of candidates against the index
+
+    Args:
+      - candidates: Iterable of Song objects or (artist, title, version) tuples
+
+    Returns:
+      - List of bools in the same order as candidates
+    """
+    return [candidate in self for candidate in candidates]
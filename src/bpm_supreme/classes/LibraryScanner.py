@@ -0,0 +1,167 @@
+# Standard imports
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+
+# Local imports
+try:
+  from .LibraryIndex import LibraryIndex
+  from .TagReader import TagReader
+except ImportError:
+  from LibraryIndex import LibraryIndex
+  from TagReader import TagReader
+
+class LibraryScanner:
+  """
+  Recursively scans any number of library roots with a thread pool,
+  one directory per task, and merges every file into one LibraryIndex.
+  Optionally the tags of every audio file are read too, one file per
+  task, so songs are indexed by their tags as well as their file names.
+  Tags are cached along with the listing of their directory, so a file
+  retagged in place is only read again with rebuild.
+
+  Methods:
+    - scan()
+    - report()
+  """
+
+  # Directory listings are I/O bound, so use more workers than cores
+  WORKERS = 16
+
+  def __init__(self, roots, workers=WORKERS, cache=None, rebuild=False, tags=False):
+    """
+    Constructor for LibraryScanner object
+
+    Args:
+      - roots: Iterable of library root directories
+      - workers: Number of directories listed, or files read, concurrently
+      - cache: Optional LibraryCache used to skip unchanged directories
+      - rebuild: Ignore the cache and list every directory
+      - tags: Read the tags of every audio file, see TagReader
+    """
+    self.roots = [os.path.abspath(root) for root in roots]
+    for root in self.roots:
+      if not os.path.isdir(root):
+        raise ValueError("Bad path: Expected valid path; Got {}".format(root))
+
+    if not isinstance(workers, int) or workers < 1:
+      raise ValueError("Error: Expected workers greater than 0. Got {}".format(workers))
+
+    self.workers = workers
+    self.cache = cache
+    self.rebuild = rebuild
+    self.tags = tags
+    self.tagged = 0
+    self.directories = 0
+    self.reused = 0
+    self.rescanned = 0
+    self.elapsed = 0.0
+
+  @property
+  def entries(self):
+    return self.reused + self.rescanned
+
+  def scan(self):
+    """
+    Scans every root and all of their subdirectories
+
+    Returns:
+      - LibraryIndex of every file found
+    """
+    start = time.perf_counter()
+    snapshot = self.cache.load() if self.cache and not self.rebuild else dict()
+    library = LibraryIndex()
+    visited = set(self.roots)
+    changed = []
+    readers = dict()
+    tagged = dict()
+
+    with ThreadPoolExecutor(self.workers) as executor:
+      pending = {executor.submit(self._scan_directory, root, snapshot.get(root)) for root in visited}
+
+      while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          # Tags of a file within a rescanned directory
+          if future in readers:
+            directory, name = readers.pop(future)
+            tags = future.result()
+            tagged[directory][name] = tags
+            self.tagged += bool(tags)
+            library.add_file(name, tags)
+            continue
+
+          directory, mtime_ns, files, subdirs, tags, reused = future.result()
+          self.directories += 1
+
+          if reused:
+            self.reused += len(files)
+          else:
+            self.rescanned += len(files)
+            changed.append((directory, mtime_ns, files, subdirs))
+
+          if self.tags and not reused:
+            tagged[directory] = dict()
+            for name in files:
+              if name.lower().endswith(TagReader.EXTENSIONS):
+                reader = executor.submit(TagReader.read, os.path.join(directory, name))
+                readers[reader] = (directory, name)
+                pending.add(reader)
+              else:
+                library.add_file(name)
+          else:
+            for name in files:
+              library.add_file(name, tags.get(name) if self.tags else None)
+
+          for name in subdirs:
+            path = os.path.join(directory, name)
+            if path not in visited:
+              visited.add(path)
+              pending.add(executor.submit(self._scan_directory, path, snapshot.get(path)))
+
+    if self.cache:
+      self.cache.store([listing + (tagged.get(listing[0]),) for listing in changed])
+      self.cache.prune(self.roots, visited)
+
+    self.elapsed = time.perf_counter() - start
+    return library
+
+  def report(self):
+    """
+    Returns a str describing the scan throughput
+    """
+    rate = self.entries / self.elapsed if self.elapsed else 0.0
+    report = "Scanned {} entries in {} directories in {:.2f}s ({:.0f} entries/sec); {} reused, {} rescanned".format(
+      self.entries, self.directories, self.elapsed, rate, self.reused, self.rescanned)
+    if self.tags:
+      report += "; {} tagged files read".format(self.tagged)
+    return report
+
+  def _scan_directory(self, directory, cached):
+    """
+    Lists a single directory, reusing the cached listing if its mtime
+    and entry count are unchanged, and its tags were read when needed
+
+    Args:
+      - directory: Directory to list
+      - cached: Cached (mtime_ns, files, subdirs, tags) for directory, or None
+
+    Returns:
+      - Tuple of (directory, mtime_ns, files, subdirs, tags, reused)
+    """
+    mtime_ns = os.stat(directory).st_mtime_ns
+    if cached and cached[0] == mtime_ns and (not self.tags or cached[3] is not None):
+      return directory, mtime_ns, cached[1], cached[2], cached[3], True
+
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+      for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+          subdirs.append(entry.name)
+        elif entry.is_file():
+          files.append(entry.name)
+
+    return directory, mtime_ns, files, subdirs, None, False
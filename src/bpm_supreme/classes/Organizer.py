@@ -0,0 +1,323 @@
+# Standard imports
+import os
+import queue
+import shutil
+import threading
+import time
+
+# Local imports
+try:
+  from .LibraryIndex import LibraryIndex
+  from .LibraryCache import LibraryCache
+except ImportError:
+  from LibraryIndex import LibraryIndex
+  from LibraryCache import LibraryCache
+
+class Organizer:
+  """
+  Moves completed downloads into the library in a background thread
+  during a crawl. Files are renamed to "Artist - Title (Version).ext"
+  and moved into a folder layout under the library root, in batches:
+  renamed when on the same device, else copied, fsynced and removed.
+  After each batch the library index is updated, and so are the cached
+  listings of every directory touched once their mtime is old enough for
+  LibraryCache to trust, so the library is not rescanned next run.
+
+  Methods:
+    - submit()
+    - destination()
+    - canonical_name()
+    - flush()
+    - close()
+    - report()
+  """
+
+  # Folders under the library root, filled in from the song
+  LAYOUT = os.path.join("{genre}", "{version}")
+
+  # Folder name of a layout field the song does not have
+  UNKNOWN = "Unknown"
+
+  # Files moved per batch, and the longest seconds a file waits for its batch
+  BATCH_SIZE = 32
+  FLUSH_INTERVAL = 2.0
+
+  def __init__(self, library_root, library=None, cache_path=None, layout=LAYOUT, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+    """
+    Constructor for Organizer object
+
+    Args:
+      - library_root: Directory the layout is created under
+      - library: Optional LibraryIndex the renamed files are added to
+      - cache_path: Optional path of the LibraryCache whose listings are updated
+      - layout: Folder layout, a format string of {genre}, {version}, {artist} and {initial}
+      - batch_size: Files moved per batch
+      - flush_interval: Longest seconds a file waits for its batch
+    """
+    if not isinstance(library_root, str):
+      raise TypeError("Wrong type: Expected str for library_root; Got {}".format(type(library_root)))
+
+    if not os.path.isdir(library_root):
+      raise ValueError("Error: {} is not a directory".format(library_root))
+
+    if library is not None and not isinstance(library, LibraryIndex):
+      raise TypeError("Wrong type: Expected LibraryIndex for library; Got {}".format(type(library)))
+
+    if not isinstance(batch_size, int) or batch_size < 1:
+      raise ValueError("Error: Expected batch_size greater than 0. Got {}".format(batch_size))
+
+    self.library_root = os.path.abspath(library_root)
+    self.library = library
+    self.cache_path = cache_path
+    self.layout = layout
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+    self.moved = []
+    self.renamed = 0
+    self.copied = 0
+    self.conflicts = []
+    self.failed = []
+    self.batches = 0
+    self.elapsed = 0.0
+    self._unsettled = set()
+    self._queue = queue.Queue()
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  @staticmethod
+  def canonical_name(path, song=None):
+    """
+    Returns the "Artist - Title (Version).ext" name of a downloaded file,
+    from its Song when known, else from its current name
+
+    Args:
+      - path: Path of the file
+      - song: Optional Song the file was downloaded for
+    """
+    base, extension = os.path.splitext(os.path.basename(path))
+    if song is not None:
+      artist, (title, version) = song.artist, LibraryIndex.split_version(song.name)
+    else:
+      artist, title, version = LibraryIndex.parse_name(base)
+
+    name = "{} ({})".format(title, version) if version else title
+    if artist and LibraryIndex.normalize_artists(artist):
+      name = "{} - {}".format(artist, name)
+    return (name + extension.lower()).replace("/", "-").replace("\\", "-")
+
+  def destination(self, path, song=None, genre=None):
+    """
+    Returns the path a downloaded file is moved to
+
+    Args:
+      - path: Path of the file
+      - song: Optional Song the file was downloaded for
+      - genre: Optional genre, by default the song's
+    """
+    name = Organizer.canonical_name(path, song)
+    artist, title, version = LibraryIndex.parse_name(os.path.splitext(name)[0])
+    fields = {
+      "genre": genre or getattr(song, "genre", None),
+      "version": version,
+      "artist": artist,
+      "initial": artist[:1].upper(),
+    }
+    folders = self.layout.format(**{field: (value or Organizer.UNKNOWN).replace(os.sep, "-") for field, value in fields.items()})
+    return os.path.join(self.library_root, folders, name)
+
+  def submit(self, path, song=None, genre=None):
+    """
+    Queues a completed download to be moved into the library
+
+    Args:
+      - path: Path of the file
+      - song: Optional Song the file was downloaded for
+      - genre: Optional genre, by default the song's
+    """
+    self._queue.put((path, self.destination(path, song, genre)))
+
+  def flush(self):
+    """
+    Blocks until every submitted file has been moved
+    """
+    self._queue.join()
+
+  def close(self):
+    """
+    Moves the remaining files, stores the listings of the last
+    directories touched and stops the background thread
+    """
+    self._queue.put(None)
+    self._thread.join()
+
+  def report(self):
+    """
+    Returns a str describing the files moved
+    """
+    return "Organized {} files in {} batches in {:.2f}s ({} renamed, {} copied across devices); {} conflicts, {} failed".format(
+      len(self.moved), self.batches, self.elapsed, self.renamed, self.copied, len(self.conflicts), len(self.failed))
+
+  def _run(self):
+    """
+    Collects submitted files into batches and moves them
+    """
+    cache = LibraryCache(self.cache_path) if self.cache_path else None
+    try:
+      closed = False
+      while not closed:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while batch[-1] is not None and len(batch) < self.batch_size:
+          try:
+            batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+          except queue.Empty:
+            break
+
+        closed = batch[-1] is None
+        moves = [item for item in batch if item is not None]
+        try:
+          if moves:
+            self._move_batch(moves, cache)
+          if cache is not None:
+            self._store_listings(cache, wait=closed)
+        finally:
+          for item in batch:
+            self._queue.task_done()
+    finally:
+      if cache:
+        cache.close()
+
+  def _move_batch(self, moves, cache):
+    """
+    Moves a batch of files, then updates the library index and queues
+    the listings of every directory touched to be cached
+    """
+    start = time.perf_counter()
+    touched = set()
+    moved = []
+    for source, target in moves:
+      if os.path.exists(target):
+        print("Not organizing {}: {} already exists".format(source, target))
+        self.conflicts.append((source, target))
+        continue
+
+      try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        self._move(source, target)
+      except OSError as error:
+        print("Could not organize {}: {}".format(source, error))
+        self.failed.append((source, target))
+        continue
+
+      moved.append((source, target))
+      touched.update(self._parents(target))
+      touched.update(self._parents(source))
+
+    # Make the renames durable once per batch rather than once per file
+    for directory in touched | {os.path.dirname(source) for source, target in moved}:
+      Organizer._fsync_directory(directory)
+
+    if self.library is not None:
+      for source, target in moved:
+        self.library.add_file(os.path.basename(target))
+
+    if cache is not None:
+      self._unsettled.update(touched)
+
+    self.moved.extend(moved)
+    self.batches += 1
+    self.elapsed += time.perf_counter() - start
+
+  def _store_listings(self, cache, wait=False):
+    """
+    Caches the listings of the touched directories whose mtime is old
+    enough for LibraryCache to trust, in one transaction. A directory
+    modified more recently would be rescanned anyway, so it is kept
+    for a later batch, or waited for when wait is set.
+    """
+    listings = []
+    for directory in sorted(self._unsettled):
+      try:
+        listings.append(Organizer._listing(directory))
+      except OSError:
+        self._unsettled.discard(directory)
+
+    if wait and listings:
+      newest = max(listing[1] for listing in listings)
+      time.sleep(max(0, newest + LibraryCache.RACY_WINDOW_NS - time.time_ns()) / 1e9)
+
+    now = time.time_ns()
+    settled = [listing for listing in listings if now - listing[1] >= LibraryCache.RACY_WINDOW_NS]
+    if settled:
+      cache.store(settled)
+      self._unsettled.difference_update(listing[0] for listing in settled)
+
+  def _move(self, source, target):
+    """
+    Renames source to target on the same device, else copies it,
+    fsyncs the copy and then removes source
+    """
+    if os.stat(source).st_dev == os.stat(os.path.dirname(target)).st_dev:
+      os.rename(source, target)
+      self.renamed += 1
+      return
+
+    # Copy under a temporary name so a partial copy never looks complete
+    temporary_path = target + ".part"
+    with open(source, "rb") as original, open(temporary_path, "wb") as copy:
+      shutil.copyfileobj(original, copy, 1 << 20)
+      copy.flush()
+      os.fsync(copy.fileno())
+    shutil.copystat(source, temporary_path)
+    os.replace(temporary_path, target)
+    os.remove(source)
+    self.copied += 1
+
+  def _parents(self, path):
+    """
+    Returns the directories from the one holding path up to the library
+    root, whose listings change when path is added or removed
+    """
+    parents = []
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory == self.library_root or directory.startswith(os.path.join(self.library_root, "")):
+      parents.append(directory)
+      if directory == self.library_root:
+        break
+      directory = os.path.dirname(directory)
+    return parents
+
+  @staticmethod
+  def _fsync_directory(directory):
+    try:
+      descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+      return
+    try:
+      os.fsync(descriptor)
+    except OSError:
+      pass
+    finally:
+      os.close(descriptor)
+
+  @staticmethod
+  def _listing(directory):
+    """
+    Returns the (directory, mtime_ns, files, subdirs) listing of a
+    directory, as stored by LibraryCache
+    """
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+      for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+          subdirs.append(entry.name)
+        elif entry.is_file():
+          files.append(entry.name)
+    return os.path.abspath(directory), os.stat(directory).st_mtime_ns, files, subdirs
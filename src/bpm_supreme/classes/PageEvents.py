@@ -0,0 +1,351 @@
+# Selenium imports
+from selenium.common.exceptions import ElementClickInterceptedException
+from selenium.common.exceptions import TimeoutException
+
+class PageEvents:
+  """
+  Event driven waits on the page loaded by a WebDriver. Every wait is a
+  single execute_async_script call in which a MutationObserver reports
+  back the moment the awaited change happens, instead of WebDriverWait
+  polling every half second. Popups are recorded by an observer
+  installed on the page so checking for one costs no wait at all, and
+  each is tagged with the click that caused it.
+
+  Methods:
+    - wait_for()
+    - wait_until_gone()
+    - wait_for_count()
+    - count()
+    - scroll_to_end()
+    - monitor_popups()
+    - take_popups()
+    - click()
+    - titles()
+    - close_popups()
+  """
+
+  # Longest wait in seconds
+  TIMEOUT = 120
+
+  # Resolves once the number of visible elements matching arguments[0]
+  # is above arguments[1], or is zero when arguments[2] is false
+  WAIT_SCRIPT = """
+    var selector = arguments[0], count = arguments[1], present = arguments[2], timeout = arguments[3];
+    var done = arguments[arguments.length - 1];
+    function visible() {
+      var elements = document.querySelectorAll(selector);
+      var total = 0;
+      for (var i = 0; i < elements.length; ++i) {
+        if (elements[i].getClientRects().length && getComputedStyle(elements[i]).visibility !== 'hidden') total++;
+      }
+      return total;
+    }
+    function ready() {
+      return present ? visible() > count : visible() === 0;
+    }
+    if (ready()) return done(true);
+    var timer = null;
+    var observer = new MutationObserver(function() {
+      if (!ready()) return;
+      observer.disconnect();
+      clearTimeout(timer);
+      done(true);
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'style', 'hidden', 'disabled']});
+    timer = setTimeout(function() {
+      observer.disconnect();
+      done(ready());
+    }, timeout * 1000);
+  """
+
+  # Installs the popup monitor once per page. It records the type,
+  # title, click and time of every popup that appears into
+  # window.__bpmEvents. Popups are often rendered empty and filled in
+  # afterwards, so one is only recorded once its title is present, or
+  # after TITLE_WAIT ms without one. Every popup carries the sequence id
+  # of the last click started before it appeared.
+  MONITOR_SCRIPT = """
+    if (!window.__bpmEvents) {
+      var TITLE_WAIT = 2000;
+      var events = window.__bpmEvents = {popups: [], listeners: [], waiting: [], clicks: 0, timer: null};
+      var titleOf = function(container) {
+        var title = container.querySelector('.title, h1, h2, h3');
+        return title ? title.innerText.trim() : '';
+      };
+      var scan = function(node) {
+        if (node.nodeType !== 1) return;
+        var popups = node.matches('.popup_inner') ? [node] : node.querySelectorAll('.popup_inner');
+        for (var i = 0; i < popups.length; ++i) {
+          if (popups[i].__bpmSeen) continue;
+          popups[i].__bpmSeen = true;
+          var container = popups[i].parentNode && popups[i].parentNode.nodeType === 1 ? popups[i].parentNode : popups[i];
+          events.waiting.push({container: container, click: events.clicks, since: Date.now()});
+        }
+      };
+      var settle = function() {
+        var now = Date.now(), recorded = 0;
+        events.waiting = events.waiting.filter(function(popup) {
+          var title = titleOf(popup.container);
+          if (!title && now - popup.since < TITLE_WAIT) return true;
+          events.popups.push({
+            type: popup.container.className || 'popup',
+            title: title,
+            click: popup.click,
+            time: now / 1000
+          });
+          recorded++;
+          return false;
+        });
+        if (events.waiting.length && !events.timer) {
+          events.timer = setTimeout(function() {
+            events.timer = null;
+            settle();
+          }, TITLE_WAIT);
+        }
+        if (recorded) {
+          var listeners = events.listeners.splice(0);
+          for (var i = 0; i < listeners.length; ++i) listeners[i]();
+        }
+      };
+      scan(document.documentElement);
+      settle();
+      new MutationObserver(function(mutations) {
+        for (var i = 0; i < mutations.length; ++i) {
+          for (var j = 0; j < mutations[i].addedNodes.length; ++j) scan(mutations[i].addedNodes[j]);
+        }
+        if (events.waiting.length) settle();
+      }).observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    }
+  """
+
+  # Hands back every popup recorded since the last call, waiting up to
+  # arguments[0] seconds for one raised by click arguments[1] or later
+  TAKE_POPUPS_SCRIPT = MONITOR_SCRIPT + """
+    var grace = arguments[0], click = arguments[1];
+    var done = arguments[arguments.length - 1];
+    var events = window.__bpmEvents, timer = null, finished = false;
+    var raised = function() {
+      for (var i = 0; i < events.popups.length; ++i) {
+        if (events.popups[i].click >= click) return true;
+      }
+      return false;
+    };
+    var take = function() {
+      if (finished) return;
+      finished = true;
+      clearTimeout(timer);
+      done(events.popups.splice(0));
+    };
+    var listener = function() {
+      if (raised()) take();
+      else if (!finished) events.listeners.push(listener);
+    };
+    if (raised() || grace <= 0) return take();
+    timer = setTimeout(take, grace * 1000);
+    events.listeners.push(listener);
+  """
+
+  # Finds arguments[0], a WebElement or a CSS selector, and starts the
+  # next click sequence id, before the element is clicked natively
+  START_CLICK_SCRIPT = MONITOR_SCRIPT + """
+    var target = arguments[0];
+    var button = typeof target === 'string' ? document.querySelector(target) : target;
+    return {button: button, click: ++window.__bpmEvents.clicks};
+  """
+
+  # Scrolls to the bottom again as soon as the rows loaded by the
+  # previous scroll are inserted, until no rows arrive for arguments[2]
+  # seconds or there are at least arguments[1] rows
+  SCROLL_TO_END_SCRIPT = """
+    var selector = arguments[0], limit = arguments[1], quiet = arguments[2], timeout = arguments[3], busy = arguments[4];
+    var done = arguments[arguments.length - 1];
+    var start = Date.now(), rounds = 0, timer = null, finished = false;
+    function count() {
+      return document.querySelectorAll(selector).length;
+    }
+    var last = count();
+    function finish() {
+      if (finished) return;
+      finished = true;
+      observer.disconnect();
+      clearTimeout(timer);
+      done({count: count(), rounds: rounds});
+    }
+    function scroll() {
+      if ((limit && last >= limit) || Date.now() - start > timeout * 1000) return finish();
+      rounds++;
+      clearTimeout(timer);
+      window.scrollTo(0, document.body.scrollHeight);
+      timer = setTimeout(finish, quiet * 1000);
+    }
+    var observer = new MutationObserver(function() {
+      var now = count();
+      if (now <= last || (busy && document.querySelector(busy) && document.querySelector(busy).getClientRects().length)) return;
+      last = now;
+      scroll();
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'style']});
+    scroll();
+  """
+
+  CLOSE_POPUPS_SCRIPT = """
+    var buttons = document.querySelectorAll('.popup_inner div.close, div.close');
+    for (var i = 0; i < buttons.length; ++i) buttons[i].click();
+    return buttons.length;
+  """
+
+  def __init__(self, driver, timeout=TIMEOUT):
+    """
+    Constructor for PageEvents object
+
+    Args:
+      - driver: Selenium WebDriver object
+      - timeout: Longest wait in seconds, the driver's script timeout is raised to cover it
+    """
+    self.driver = driver
+    self.timeout = timeout
+    if timeout is not None:
+      self.driver.set_script_timeout(timeout + 5)
+
+  def wait_for(self, selector, timeout=None):
+    """
+    Waits until an element matching selector is visible
+
+    Args:
+      - selector: CSS selector
+      - timeout: Seconds to wait, by default self.timeout
+
+    Raises:
+      - TimeoutException if no element became visible
+    """
+    if not self._wait(selector, 0, True, timeout):
+      raise TimeoutException("Timed out waiting for {}".format(selector))
+
+  def wait_until_gone(self, selector, timeout=None):
+    """
+    Waits until no element matching selector is visible
+
+    Args:
+      - selector: CSS selector
+      - timeout: Seconds to wait, by default self.timeout
+
+    Raises:
+      - TimeoutException if an element is still visible
+    """
+    if not self._wait(selector, 0, False, timeout):
+      raise TimeoutException("Timed out waiting for {} to disappear".format(selector))
+
+  def wait_for_count(self, selector, count, timeout=None):
+    """
+    Waits until more than count elements matching selector are
+    visible, e.g. for rows inserted after scrolling
+
+    Args:
+      - selector: CSS selector
+      - count: Number of elements to exceed
+      - timeout: Seconds to wait, by default self.timeout
+
+    Returns:
+      - True if more elements appeared, else False
+    """
+    return self._wait(selector, count, True, timeout)
+
+  def count(self, selector):
+    """
+    Returns the number of elements matching selector
+    """
+    return self.driver.execute_script("return document.querySelectorAll(arguments[0]).length", selector)
+
+  def scroll_to_end(self, selector, limit=None, quiet=5, busy=None, timeout=None):
+    """
+    Scrolls an infinite scrolling page until every row is loaded, in a
+    single round trip. The next scroll starts as soon as the rows of
+    the previous one are inserted.
+
+    Args:
+      - selector: CSS selector of the rows
+      - limit: Optional number of rows to stop at
+      - quiet: Seconds without new rows after which the page is fully loaded
+      - busy: Optional CSS selector of a loading indicator to wait out before scrolling again
+      - timeout: Seconds to scroll for at most, by default self.timeout
+
+    Returns:
+      - dict with "count", the number of rows loaded, and "rounds", the number of scrolls
+    """
+    return self.driver.execute_async_script(PageEvents.SCROLL_TO_END_SCRIPT, selector, limit or 0, quiet, self._timeout(timeout), busy)
+
+  def monitor_popups(self):
+    """
+    Installs the popup monitor on the current page, unless it already
+    is, so popups appearing before the first click are recorded too
+    """
+    self.driver.execute_script(PageEvents.MONITOR_SCRIPT)
+
+  def take_popups(self, grace=0, click=0):
+    """
+    Returns every popup that appeared since the last call
+
+    Args:
+      - grace: Seconds to wait for a popup when none has appeared yet
+      - click: Sequence id of the click whose popup is waited for
+
+    Returns:
+      - List of popup dicts with "type", "title", "click", the sequence 
+        id of the last click before it appeared, and "time" in seconds 
+        since the epoch
+    """
+    return self.driver.execute_async_script(PageEvents.TAKE_POPUPS_SCRIPT, grace, click)
+
+  def click(self, target, grace=0):
+    """
+    Clicks target with a native WebDriver click, so the site sees a
+    trusted user event, then takes the popups
+
+    Args:
+      - target: WebElement or CSS selector of the element to click
+      - grace: Seconds to wait for a popup raised by this click when none has appeared yet
+
+    Returns:
+      - dict with "clicked", False if no element matched target or it
+        was covered, "click", the sequence id of this click, and 
+        "popups", as returned by take_popups(), including late popups
+        of earlier clicks
+    """
+    start = self.driver.execute_script(PageEvents.START_CLICK_SCRIPT, target)
+    clicked = start["button"] is not None
+    if clicked:
+      try:
+        start["button"].click()
+      except ElementClickInterceptedException:
+        # Most likely covered by a popup, which is taken below
+        clicked = False
+
+    return {"clicked": clicked, "click": start["click"], "popups": self.take_popups(grace, start["click"])}
+
+  @staticmethod
+  def titles(popups):
+    """
+    Returns the titles of popups returned by take_popups() or click()
+    """
+    return [popup["title"] for popup in popups]
+
+  def close_popups(self):
+    """
+    Clicks the close button of every open popup
+
+    Returns:
+      - Number of close buttons clicked
+    """
+    return self.driver.execute_script(PageEvents.CLOSE_POPUPS_SCRIPT)
+
+  def _timeout(self, timeout):
+    """
+    Returns timeout, or self.timeout when it is None, or TIMEOUT when
+    both are. An explicit 0 is kept: the page is checked once.
+    """
+    if timeout is not None:
+      return timeout
+    return self.timeout if self.timeout is not None else PageEvents.TIMEOUT
+
+  def _wait(self, selector, count, present, timeout):
+    return self.driver.execute_async_script(PageEvents.WAIT_SCRIPT, selector, count, present, self._timeout(timeout))
@@ -0,0 +1,139 @@
+# Standard imports
+import json
+import os
+import threading
+import time
+
+class RateLimiter:
+  """
+  Token bucket shared by every download. The rate grows additively
+  after each successful download and is cut multiplicatively whenever
+  the site shows its "Download Limit" popup (AIMD). The learned rate
+  can be persisted between runs.
+
+  Methods:
+    - acquire()
+    - on_success()
+    - on_limit()
+    - load()
+    - save()
+  """
+
+  # Downloads per second
+  RATE = 0.5
+  MIN_RATE = 1 / 120
+  MAX_RATE = 5.0
+
+  # Tokens that may be spent back to back
+  BURST = 1
+
+  # Rate added after every successful download
+  INCREASE = 0.01
+
+  # Factor the rate is multiplied by after a "Download Limit" popup
+  DECREASE = 0.5
+
+  def __init__(self, rate=RATE, burst=BURST, min_rate=MIN_RATE, max_rate=MAX_RATE, increase=INCREASE, decrease=DECREASE, state_path=None):
+    """
+    Constructor for RateLimiter object
+
+    Args:
+      - rate: Initial downloads per second, overridden by a saved rate at state_path
+      - burst: Maximum tokens held by the bucket
+      - min_rate: Lowest rate backed off to
+      - max_rate: Highest rate sped up to
+      - increase: Rate added after each successful download
+      - decrease: Factor between 0 and 1 the rate is multiplied by after a limit
+      - state_path: Optional JSON file the learned rate is persisted to
+    """
+    if not 0 < min_rate <= max_rate:
+      raise ValueError("Error: Expected 0 < min_rate <= max_rate. Got {} and {}".format(min_rate, max_rate))
+
+    if not 0 < decrease < 1:
+      raise ValueError("Error: Expected decrease between 0 and 1. Got {}".format(decrease))
+
+    self.burst = burst
+    self.min_rate = min_rate
+    self.max_rate = max_rate
+    self.increase = increase
+    self.decrease = decrease
+    self.state_path = state_path
+    self.rate = min(max(rate, min_rate), max_rate)
+    self.limits = 0
+    self.waited = 0.0
+    self._tokens = float(burst)
+    self._updated = time.monotonic()
+    self._lock = threading.Lock()
+
+    if state_path and os.path.exists(state_path):
+      self.load()
+
+  def acquire(self):
+    """
+    Blocks until a download may start
+
+    Returns:
+      - Seconds spent waiting
+    """
+    waited = 0.0
+    while True:
+      with self._lock:
+        self._refill()
+        if self._tokens >= 1:
+          self._tokens -= 1
+          self.waited += waited
+          return waited
+        delay = (1 - self._tokens) / self.rate
+
+      time.sleep(delay)
+      waited += delay
+
+  def on_success(self):
+    """
+    Speeds up after a download that was not rate limited
+    """
+    with self._lock:
+      self.rate = min(self.max_rate, self.rate + self.increase)
+
+  def on_limit(self):
+    """
+    Backs off after a "Download Limit" popup and empties the bucket
+    """
+    with self._lock:
+      self._refill()
+      self.rate = max(self.min_rate, self.rate * self.decrease)
+      self._tokens = min(self._tokens, 0.0)
+      self.limits += 1
+
+    if self.state_path:
+      self.save()
+
+  def load(self):
+    """
+    Restores the rate saved at state_path
+    """
+    with open(self.state_path) as state:
+      rate = json.load(state).get("rate", self.rate)
+
+    with self._lock:
+      self.rate = min(max(rate, self.min_rate), self.max_rate)
+
+  def save(self):
+    """
+    Persists the current rate to state_path
+    """
+    if not self.state_path:
+      raise ValueError("Error: No state_path to save the rate to")
+
+    temporary_path = self.state_path + ".tmp"
+    with open(temporary_path, "w") as state:
+      json.dump({"rate": self.rate, "saved": time.time()}, state)
+    os.replace(temporary_path, self.state_path)
+
+  def _refill(self):
+    """
+    Adds the tokens earned since the last refill. Must hold self._lock.
+    """
+    now = time.monotonic()
+    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+    self._updated = now
@@ -0,0 +1,111 @@
+# Standard imports
+import base64
+import hashlib
+import json
+import os
+import time
+
+# Optional imports
+try:
+  from cryptography.fernet import Fernet
+  from cryptography.fernet import InvalidToken
+except ImportError:
+  Fernet = None
+
+class SessionStore:
+  """
+  Encrypted file holding the cookies and local storage of a logged in
+  session so that later runs can skip BpmSupreme.login(). The file is
+  encrypted with a key derived from the account password.
+
+  Requires the optional cryptography package:
+    pip install bpm_supreme[session]
+
+  Methods:
+    - save()
+    - load()
+    - clear()
+  """
+
+  SALT_SIZE = 16
+  KDF_ITERATIONS = 200000
+
+  # Saved sessions older than this are not restored
+  MAX_AGE = 7 * 24 * 60 * 60
+
+  def __init__(self, path, secret, max_age=MAX_AGE):
+    """
+    Constructor for SessionStore object
+
+    Args:
+      - path: Path of the encrypted session file
+      - secret: str the encryption key is derived from, e.g. the account password
+      - max_age: Seconds after which a saved session is ignored
+    """
+    if Fernet is None:
+      raise ImportError("SessionStore requires the cryptography package: pip install cryptography")
+
+    if not isinstance(path, str):
+      raise TypeError("Wrong type: Expected str for path; Got {}".format(type(path)))
+
+    if not isinstance(secret, str):
+      raise TypeError("Wrong type: Expected str for secret; Got {}".format(type(secret)))
+
+    self.path = path
+    self.max_age = max_age
+    self._secret = secret.encode()
+
+  def save(self, session):
+    """
+    Encrypts and writes session to self.path
+
+    Args:
+      - session: JSON serializable session, e.g. from BpmSupreme.export_session()
+    """
+    salt = os.urandom(SessionStore.SALT_SIZE)
+    token = Fernet(self._key(salt)).encrypt(json.dumps({"saved": time.time(), "session": session}).encode())
+
+    temporary_path = self.path + ".tmp"
+    with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as session_file:
+      session_file.write(salt + token)
+    os.replace(temporary_path, self.path)
+
+  def load(self):
+    """
+    Reads and decrypts the session at self.path
+
+    Returns:
+      - The saved session, or None if there is none, it cannot be decrypted or it is too old
+    """
+    try:
+      with open(self.path, "rb") as session_file:
+        data = session_file.read()
+    except FileNotFoundError:
+      return None
+
+    salt, token = data[:SessionStore.SALT_SIZE], data[SessionStore.SALT_SIZE:]
+    try:
+      saved = json.loads(Fernet(self._key(salt)).decrypt(token))
+    except (InvalidToken, ValueError):
+      print("Could not decrypt saved session: {}".format(self.path))
+      return None
+
+    if time.time() - saved["saved"] > self.max_age:
+      return None
+
+    return saved["session"]
+
+  def clear(self):
+    """
+    Deletes the saved session
+    """
+    try:
+      os.remove(self.path)
+    except FileNotFoundError:
+      pass
+
+  def _key(self, salt):
+    """
+    Derives the Fernet key from the secret and salt
+    """
+    return base64.urlsafe_b64encode(hashlib.pbkdf2_hmac("sha256", self._secret, salt, SessionStore.KDF_ITERATIONS))
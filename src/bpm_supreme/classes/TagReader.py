@@ -0,0 +1,268 @@
+# Standard imports
+import os
+import re
+import struct
+
+class TagReader:
+  """
+  Reads the title, artist and version of audio files from their tags
+  without reading the audio. Only headers are read: ID3v2 frame
+  headers, skipping the bodies of frames such as artwork, the last 128
+  bytes for ID3v1, and the chunk or atom headers of WAV, AIFF and M4A
+  files, seeking past their audio.
+
+  Supported tags:
+    - .mp3: ID3v2.2 to ID3v2.4, then ID3v1
+    - .wav: "id3 " chunk, then LIST/INFO chunk
+    - .aiff/.aif: "ID3 " chunk, then NAME/AUTH chunks
+    - .m4a: moov/udta/meta/ilst atoms
+
+  Methods:
+    - read()
+    - read_id3v2()
+    - read_id3v1()
+  """
+
+  EXTENSIONS = (".mp3", ".wav", ".m4a", ".aiff", ".aif")
+
+  # Frames larger than this are skipped, they are not text
+  MAX_FRAME_SIZE = 4096
+
+  # Comments that look like a version label, e.g. "Intro Dirty"
+  VERSION_COMMENT = re.compile(r"^(?:[\w ]*\b)?(?:dirty|clean|intro|quick hit|edit|extended|instrumental|acapella|a cappella|remix|mix)\b[\w ]*$", re.IGNORECASE)
+
+  # ID3v2 frame ids of (title, artist, subtitle, comment) for v2.2 and v2.3+
+  _FRAMES = {
+    2: {b"TT2": "title", b"TP1": "artist", b"TT3": "version", b"COM": "comment"},
+    3: {b"TIT2": "title", b"TPE1": "artist", b"TIT3": "version", b"COMM": "comment"},
+  }
+  _ENCODINGS = ("latin-1", "utf-16", "utf-16-be", "utf-8")
+  _INFO_CHUNKS = {b"INAM": "title", b"IART": "artist", b"ICMT": "comment"}
+  _AIFF_CHUNKS = {b"NAME": "title", b"AUTH": "artist", b"ANNO": "comment"}
+  _MP4_ATOMS = {b"\xa9nam": "title", b"\xa9ART": "artist", b"\xa9cmt": "comment"}
+  _MP4_CONTAINERS = (b"moov", b"udta", b"meta", b"ilst")
+
+  @staticmethod
+  def read(path):
+    """
+    Reads the tags of an audio file
+
+    Args:
+      - path: Path of the file
+
+    Returns:
+      - dict with "title", "artist" and "version" strs, of only the
+        fields found, empty if the file has no tags or is not supported
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+      with open(path, "rb") as audio:
+        if extension == ".mp3":
+          fields = TagReader.read_id3v2(audio)
+          if not fields.get("title"):
+            fields = dict(TagReader.read_id3v1(audio), **fields)
+        elif extension == ".wav":
+          fields = TagReader._read_chunks(audio, b"RIFF", "<", b"id3 ", b"LIST", TagReader._INFO_CHUNKS)
+        elif extension in (".aiff", ".aif"):
+          fields = TagReader._read_chunks(audio, b"FORM", ">", b"ID3 ", None, TagReader._AIFF_CHUNKS)
+        elif extension == ".m4a":
+          fields = TagReader._read_atoms(audio, os.fstat(audio.fileno()).st_size)
+        else:
+          fields = dict()
+    except (OSError, struct.error, ValueError):
+      return dict()
+
+    return TagReader._clean(fields)
+
+  @staticmethod
+  def read_id3v2(audio):
+    """
+    Reads the text frames of an ID3v2 tag starting at the current
+    position of audio, seeking past every other frame
+
+    Args:
+      - audio: Binary file object
+
+    Returns:
+      - dict of field name to raw str, see read()
+    """
+    header = audio.read(10)
+    if len(header) < 10 or header[:3] != b"ID3" or any(byte >= 0x80 for byte in header[6:10]):
+      return dict()
+
+    major = header[3]
+    if major not in (2, 3, 4):
+      return dict()
+
+    end = audio.tell() + TagReader._syncsafe(header[6:10])
+    frames = TagReader._FRAMES[2 if major == 2 else 3]
+    id_size, header_size = (3, 6) if major == 2 else (4, 10)
+
+    # Skip the extended header
+    if major > 2 and header[5] & 0x40:
+      size = audio.read(4)
+      audio.seek(TagReader._syncsafe(size) - 4 if major == 4 else struct.unpack(">I", size)[0], os.SEEK_CUR)
+
+    fields = dict()
+    while audio.tell() + header_size <= end and len(fields) < len(frames):
+      frame = audio.read(header_size)
+      frame_id = frame[:id_size]
+      if len(frame) < header_size or not frame_id.strip(b"\x00") or not frame_id.isalnum():
+        break
+
+      if major == 2:
+        size = int.from_bytes(frame[3:6], "big")
+      elif major == 4:
+        size = TagReader._syncsafe(frame[4:8])
+      else:
+        size = struct.unpack(">I", frame[4:8])[0]
+
+      field = frames.get(frame_id)
+      if field is None or field in fields or size > TagReader.MAX_FRAME_SIZE:
+        audio.seek(size, os.SEEK_CUR)
+        continue
+
+      body = audio.read(size)
+      text = TagReader._comment(body) if field == "comment" else TagReader._text(body)
+      if text:
+        fields[field] = text
+
+    return fields
+
+  @staticmethod
+  def read_id3v1(audio):
+    """
+    Reads the ID3v1 tag in the last 128 bytes of audio
+
+    Args:
+      - audio: Binary file object
+
+    Returns:
+      - dict of field name to raw str, see read()
+    """
+    audio.seek(0, os.SEEK_END)
+    if audio.tell() < 128:
+      return dict()
+
+    audio.seek(-128, os.SEEK_END)
+    tag = audio.read(128)
+    if tag[:3] != b"TAG":
+      return dict()
+
+    fields = {"title": tag[3:33], "artist": tag[33:63], "comment": tag[97:125] if tag[125] == 0 else tag[97:127]}
+    return {field: value.split(b"\x00")[0].decode("latin-1").strip() for field, value in fields.items()}
+
+  @staticmethod
+  def _read_chunks(audio, magic, order, id3_chunk, list_chunk, info_chunks):
+    """
+    Reads the tags of an IFF file, WAV or AIFF, walking its chunk
+    headers. An ID3 chunk wins over the format's own text chunks.
+    """
+    header = audio.read(12)
+    if len(header) < 12 or header[:4] != magic:
+      return dict()
+
+    fields = dict()
+    while True:
+      chunk = audio.read(8)
+      if len(chunk) < 8:
+        break
+      chunk_id = chunk[:4]
+      size = struct.unpack(order + "I", chunk[4:8])[0]
+      start = audio.tell()
+
+      if chunk_id in (id3_chunk, id3_chunk.upper(), id3_chunk.lower()):
+        id3 = TagReader.read_id3v2(audio)
+        if id3.get("title"):
+          return id3
+      elif list_chunk and chunk_id == list_chunk and audio.read(4) == b"INFO":
+        while audio.tell() + 8 <= start + size:
+          item = audio.read(8)
+          item_size = struct.unpack(order + "I", item[4:8])[0]
+          field = info_chunks.get(item[:4])
+          if field and item_size <= TagReader.MAX_FRAME_SIZE:
+            fields.setdefault(field, audio.read(item_size).split(b"\x00")[0].decode("latin-1"))
+          else:
+            audio.seek(item_size, os.SEEK_CUR)
+          audio.seek(item_size & 1, os.SEEK_CUR)
+      elif chunk_id in info_chunks and size <= TagReader.MAX_FRAME_SIZE:
+        fields.setdefault(info_chunks[chunk_id], audio.read(size).split(b"\x00")[0].decode("latin-1"))
+
+      # Chunks are padded to an even size
+      audio.seek(start + size + (size & 1))
+
+    return fields
+
+  @staticmethod
+  def _read_atoms(audio, end, depth=0):
+    """
+    Reads the iTunes metadata of an M4A file, descending into the
+    moov/udta/meta/ilst atoms and seeking past every other atom
+    """
+    fields = dict()
+    while audio.tell() + 8 <= end:
+      start = audio.tell()
+      header = audio.read(8)
+      size, atom = struct.unpack(">I", header[:4])[0], header[4:8]
+      if size == 1:
+        size = struct.unpack(">Q", audio.read(8))[0]
+      elif size == 0:
+        size = end - start
+      if size < 8:
+        break
+
+      if atom in TagReader._MP4_CONTAINERS and depth < len(TagReader._MP4_CONTAINERS):
+        # meta is a full atom with 4 bytes of version and flags
+        if atom == b"meta":
+          audio.seek(4, os.SEEK_CUR)
+        fields.update(TagReader._read_atoms(audio, start + size, depth + 1))
+      elif atom in TagReader._MP4_ATOMS and size <= TagReader.MAX_FRAME_SIZE:
+        # The value is in a child "data" atom after 8 bytes of type and locale
+        data = audio.read(size - 8)
+        if data[4:8] == b"data":
+          fields[TagReader._MP4_ATOMS[atom]] = data[16:].decode("utf-8", "replace")
+
+      audio.seek(start + size)
+    return fields
+
+  @staticmethod
+  def _syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+  @staticmethod
+  def _decode(encoding, data):
+    if encoding >= len(TagReader._ENCODINGS):
+      return ""
+    return data.decode(TagReader._ENCODINGS[encoding], "replace")
+
+  @staticmethod
+  def _text(body):
+    """
+    Decodes a text frame, joining multiple values with ", "
+    """
+    if not body:
+      return ""
+    values = [value.strip().strip("\ufeff") for value in TagReader._decode(body[0], body[1:]).split("\x00")]
+    return ", ".join(value for value in values if value)
+
+  @staticmethod
+  def _comment(body):
+    """
+    Decodes a comment frame: encoding, language, description, then text
+    """
+    if len(body) < 5:
+      return ""
+    text = TagReader._decode(body[0], body[4:])
+    return text.split("\x00")[-1].strip().strip("\ufeff")
+
+  @staticmethod
+  def _clean(fields):
+    """
+    Keeps title, artist and version, taking the version from the
+    comment when it looks like one
+    """
+    tags = {field: fields[field].strip() for field in ("title", "artist", "version") if fields.get(field, "").strip()}
+    comment = fields.get("comment", "").strip()
+    if "version" not in tags and comment and TagReader.VERSION_COMMENT.match(comment):
+      tags["version"] = comment
+    return tags
@@ -0,0 +1,81 @@
+# Standard imports
+import re
+
+class VersionPolicy:
+  """
+  Table of version priority tiers deciding which versions of a song to
+  download. Tiers are tried in order and the versions found in every
+  tried tier are downloaded. A tier ending in ANY stops once any of its
+  versions was found, a tier ending in ALL only once all of them were.
+
+  Tiers are given as (versions, until) pairs, for example:
+    VersionPolicy([(("Intro Dirty", "Quick Hit Dirty"), VersionPolicy.ALL), (("Dirty",), VersionPolicy.ANY)])
+
+  Methods:
+    - select()
+    - normalize()
+  """
+
+  ANY = "any"
+  ALL = "all"
+
+  _WHITESPACE = re.compile(r"\s+")
+
+  def __init__(self, tiers):
+    """
+    Constructor for VersionPolicy object
+
+    Args:
+      - tiers: Iterable of (versions, until) pairs, where versions is a
+        tuple of version labels and until is ANY or ALL
+    """
+    self.tiers = []
+    self._positions = dict()
+
+    for tier, (versions, until) in enumerate(tiers):
+      if isinstance(versions, str):
+        raise TypeError("Wrong type: Expected tuple of version labels; Got {}".format(type(versions)))
+
+      if until not in (VersionPolicy.ANY, VersionPolicy.ALL):
+        raise ValueError("Error: Expected until to be {} or {}. Got {}".format(VersionPolicy.ANY, VersionPolicy.ALL, until))
+
+      versions = tuple(versions)
+      for position, version in enumerate(versions):
+        self._positions.setdefault(VersionPolicy.normalize(version), (tier, position))
+      self.tiers.append((versions, until))
+
+  def __repr__(self):
+    return "VersionPolicy({!r})".format(self.tiers)
+
+  @staticmethod
+  def normalize(version):
+    """
+    Folds case and whitespace of a version label
+    """
+    return VersionPolicy._WHITESPACE.sub(" ", version.casefold()).strip()
+
+  def select(self, versions):
+    """
+    Picks the versions to download in a single pass over the labels
+
+    Args:
+      - versions: Iterable of the version labels a song has, e.g. the
+        keys of a row["versions"] dict from BpmSupreme.extract_page()
+
+    Returns:
+      - List of the labels to download, as spelled in versions, in
+        order of priority
+    """
+    found = [[] for tier in self.tiers]
+    for version in versions:
+      position = self._positions.get(VersionPolicy.normalize(version))
+      if position is not None:
+        found[position[0]].append((position[1], version))
+
+    selected = []
+    for (tier_versions, until), tier_found in zip(self.tiers, found):
+      selected.extend(version for position, version in sorted(tier_found))
+      if tier_found and (until == VersionPolicy.ANY or len(tier_found) == len(tier_versions)):
+        break
+
+    return selected
@@ -0,0 +1,198 @@
+# Selenium imports
+from selenium.webdriver import Firefox
+
+# Standard imports
+import queue
+import threading
+
+# Local imports
+try:
+  from .BpmSupreme import BpmSupreme
+  from .BrowserProfile import BrowserProfile
+except ImportError:
+  from BpmSupreme import BpmSupreme
+  from BrowserProfile import BrowserProfile
+
+class WorkerPool:
+  """
+  Pool of headless browsers sharing the session of one logged in
+  BpmSupreme account. Every worker shares the account's LibraryIndex,
+  RateLimiter, downloaders, journal, failure listeners and confirmed
+  downloads, and takes tasks from a common queue so each page or genre
+  is crawled by exactly one worker. The crawl is finished once, by the
+  account, through finish_crawl() or when the pool closes.
+
+  Methods:
+    - start()
+    - run()
+    - download_genre()
+    - download_genres()
+    - finish_crawl()
+    - close()
+  """
+
+  SIZE = 4
+
+  def __init__(self, account, size=SIZE, driver_factory=None):
+    """
+    Constructor for WorkerPool object
+
+    Args:
+      - account: BpmSupreme account that has already called login()
+      - size: Number of worker browsers
+      - driver_factory: Callable returning a new Firefox WebDriver, by default a headless Firefox downloading to the account's download_path
+    """
+    if not isinstance(account, BpmSupreme):
+      raise TypeError("Wrong type: Expected BpmSupreme for account; Got {}".format(type(account)))
+
+    if not isinstance(size, int) or size < 1:
+      raise ValueError("Error: Expected size greater than 0. Got {}".format(size))
+
+    self.account = account
+    self.size = size
+    self.driver_factory = driver_factory if driver_factory is not None else lambda: WorkerPool.headless_firefox(account.download_path)
+    self.workers = []
+    self._finished = True
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  @staticmethod
+  def headless_firefox(download_path):
+    """
+    Returns a new headless Firefox WebDriver saving downloads to
+    download_path without asking
+
+    Args:
+      - download_path: Directory downloads are saved to
+    """
+    return Firefox(BrowserProfile.default(download_path), options=BrowserProfile.options(headless=True))
+
+  def start(self):
+    """
+    Exports the account's session and starts size workers that import it
+    """
+    session = self.account.export_session()
+    self._finished = False
+
+    for worker in range(self.size):
+      worker = BpmSupreme(self.driver_factory(), self.account._username, self.account._password, self.account.download_path,
+        library=self.account.local_library,
+        http_downloader=self.account.http_downloader,
+        rate_limiter=self.account.rate_limiter,
+        download_watcher=self.account.download_watcher,
+        organizer=self.account.organizer,
+        metrics=self.account.metrics)
+      worker.LOGIN_URL = self.account.LOGIN_URL
+      worker.APP_URL = self.account.APP_URL
+      worker.PAGE_PARAMETER = self.account.PAGE_PARAMETER
+      worker.policies = self.account.policies
+
+      # Failures, confirmations and re-queues are the account's, so they
+      # reach its listeners and the crawl it finishes
+      worker.failure_listeners = self.account.failure_listeners
+      worker._confirmed = self.account._confirmed
+      worker.requeues = self.account.requeues
+      worker.journal = self.account.journal
+      worker.import_session(session)
+      self.workers.append(worker)
+
+  def run(self, tasks):
+    """
+    Runs every task on the first free worker
+
+    Args:
+      - tasks: Iterable of callables taking a worker BpmSupreme
+
+    Returns:
+      - List of (task, exception) for every task that raised
+    """
+    if not self.workers:
+      raise ValueError("Error: WorkerPool has not been started")
+
+    self._finished = False
+    pending = queue.Queue()
+    for task in tasks:
+      pending.put(task)
+
+    failures = []
+    lock = threading.Lock()
+
+    def work(worker):
+      while True:
+        try:
+          task = pending.get_nowait()
+        except queue.Empty:
+          return
+
+        try:
+          task(worker)
+        except Exception as error:
+          print("Worker task failed: {}".format(error))
+          with lock:
+            failures.append((task, error))
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in self.workers]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    return failures
+
+  def download_genre(self, page_url, page_count):
+    """
+    Downloads pages 1 to page_count of a genre, one page per task
+
+    Args:
+      - page_url: Url of genre page
+      - page_count: Number of pages to download
+
+    Returns:
+      - List of (task, exception) for every page that failed
+    """
+    return self.run(WorkerPool._genre_page(page_url, page) for page in range(1, page_count + 1))
+
+  def download_genres(self, genres):
+    """
+    Downloads many genres, one page per task
+
+    Args:
+      - genres: Iterable of (page_url, page_count)
+
+    Returns:
+      - List of (task, exception) for every page that failed
+    """
+    return self.run(WorkerPool._genre_page(page_url, page) for page_url, page_count in genres for page in range(1, page_count + 1))
+
+  def finish_crawl(self):
+    """
+    Finishes the crawl of every worker once, through the account, which
+    owns the watcher, metrics and rate limiter shared with the workers.
+    Does nothing when nothing was crawled since the last call.
+    """
+    if self._finished:
+      return
+    self._finished = True
+    self.account.finish_crawl()
+
+  def close(self):
+    """
+    Quits every worker browser, then finishes the crawl unless it was
+    finished already
+    """
+    for worker in self.workers:
+      worker.driver.quit()
+    self.workers = []
+    self.finish_crawl()
+
+  @staticmethod
+  def _genre_page(page_url, page):
+    """
+    Returns a task downloading a single page of a genre
+    """
+    return lambda worker: worker.download_page(page_url, page)
@@ -1,6 +1,4 @@
 from selenium.webdriver import Firefox
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
@@ -9,7 +7,10 @@ from selenium.webdriver.support import expected_conditions
 from selenium.common.exceptions import NoSuchElementException
 
 import time
+import argparse
 import getpass
+import itertools
+import json
 import sys
 import os
 
@@ -18,6 +19,81 @@ if __name__ == "__main__":
   
   from BpmSupreme import BpmSupreme
   from BpmSupreme import Song
+  from HttpDownloader import HttpDownloader
+  from RateLimiter import RateLimiter
+  from WorkerPool import WorkerPool
+  from DownloadWatcher import DownloadWatcher
+  from BrowserProfile import BrowserProfile
+  from DriverMetrics import DriverMetrics
+  from DownloadPlan import DownloadPlan
+  from FuzzyMatcher import FuzzyMatcher
+  from ContentHasher import ContentHasher
+  from Organizer import Organizer
+  from CrawlScheduler import CrawlScheduler
+
+  def fuzzy_threshold(value):
+    """
+    Parses a --fuzzy title similarity, between 0 and 1
+    """
+    try:
+      threshold = float(value)
+    except ValueError:
+      raise argparse.ArgumentTypeError("Expected a number between 0 and 1. Got {}".format(value))
+    if not 0 < threshold <= 1:
+      raise argparse.ArgumentTypeError("Expected a number between 0 and 1. Got {}".format(value))
+    return threshold
+
+  def count(value):
+    """
+    Parses a --quota or --workers count of at least 0
+    """
+    try:
+      number = int(value)
+    except ValueError:
+      raise argparse.ArgumentTypeError("Expected a whole number. Got {}".format(value))
+    if number < 0:
+      raise argparse.ArgumentTypeError("Expected a number of at least 0. Got {}".format(value))
+    return number
+
+  # Quarter of every HTTP download last printed, by file name
+  shown_progress = dict()
+
+  def show_progress(filename, received, total):
+    """
+    Prints the progress of an HTTP download every quarter of the file
+    """
+    quarter = received * 4 // total if total else 0
+    if shown_progress.get(filename) != quarter:
+      shown_progress[filename] = quarter
+      print("Downloading {}: {}%".format(filename, quarter * 25))
+
+  parser = argparse.ArgumentParser(description="Download new releases from BPM Supreme, skipping songs already in the library")
+  parser.add_argument("libraries", nargs="*", help="Additional library roots checked for duplicates")
+  parser.add_argument("--dedupe", action="store_true", help="Find the same audio saved under different names")
+  parser.add_argument("--link", action="store_true", help="With --dedupe, replace byte-identical duplicates by hard links, which share later tag edits")
+  parser.add_argument("--lean", action="store_true", help="Run headless without images, fonts or trackers")
+  parser.add_argument("--metrics", action="store_true", help="Count and time every WebDriver command")
+  parser.add_argument("--fuzzy", type=fuzzy_threshold, metavar="THRESHOLD",
+    help="Also skip near duplicates of library songs, whose titles are at least this similar, e.g. {}".format(FuzzyMatcher.THRESHOLD))
+  mode = parser.add_mutually_exclusive_group()
+  mode.add_argument("--plan", metavar="PATH", help="Only plan the downloads and save the plan to this file")
+  mode.add_argument("--execute", metavar="PATH", help="Only perform the downloads of a saved plan")
+  mode.add_argument("--schedule", metavar="PATH", help="Crawl the listings of a JSON list of {\"page_url\", \"page_count\", \"priority\", \"policy\"} jobs")
+  parser.add_argument("--quota", type=count, default=CrawlScheduler.QUOTA, help="Downloads allowed per day across the --schedule jobs")
+  parser.add_argument("--workers", type=count, default=0, help="Crawl pages with a pool of this many headless browsers")
+  parser.add_argument("--http", action="store_true", help="Stream files over HTTP instead of clicking through Firefox")
+  parser.add_argument("--organize", action="store_true", help="Move completed downloads into the library under genre and version folders")
+  parser.add_argument("--tags", action="store_true", help="Read the artist, title and version of library files from their tags")
+  parser.add_argument("--rebuild-library", action="store_true", help="Ignore the cached library listings and rescan every directory")
+  parser.add_argument("--resume", action="store_true", help="Resume an interrupted crawl from the journal")
+  parser.add_argument("--incremental", action="store_true", help="Stop once the crawl reaches songs seen by the previous one")
+  args = parser.parse_args()
+
+  for path in args.libraries:
+    if not os.path.isdir(path):
+      parser.error("{} is not a directory".format(path))
+  if args.link and not args.dedupe:
+    parser.error("--link requires --dedupe")
 
   # Prompt for user credentials 
   USERNAME = input("Username: ")
@@ -45,24 +121,117 @@ if __name__ == "__main__":
     print("Exiting...")
     exit
 
-  # Set Firefox profile 
-  options = Options()
-  firefox_profile = FirefoxProfile()
-  firefox_profile.set_preference("browser.helperApps.neverAsk.openFile", "true")
-  firefox_profile.set_preference("browser.helperApps.neverAsk.saveFile", "true")
-  firefox_profile.set_preference("browser.helperApps.neverAsk.saveToDisk", "audio/mpeg,audio/mp3")
-  firefox_profile.set_preference("browser.download.dir", DOWNLOAD_PATH)
-  firefox_profile.set_preference("browser.download.folderList", 2)
-  firefox_profile.set_preference("browser.download.manager.showWhenStarting", "false")
-  firefox_profile.set_preference("browser.download.panel.shown", "false")
-  firefox_profile.set_preference("browser.safebrowsing.downloads.enabled", "false")
+  # Additional library roots may be passed as command line arguments
+  LIBRARY_PATHS = args.libraries
+
+  # Cache library directory listings between runs
+  CACHE_PATH = os.path.join(os.path.expanduser("~"), ".bpm_supreme", "library.sqlite")
+  os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+
+  # Optionally find the same audio saved under different names with --dedupe, hard-linking byte-identical copies with --link
+  if args.dedupe:
+    with ContentHasher(os.path.join(os.path.dirname(CACHE_PATH), "hashes.sqlite")) as hasher:
+      hasher.hash_files([DOWNLOAD_PATH, DUPLICATE_PATH] + LIBRARY_PATHS)
+      print(hasher.report())
+      for group in hasher.duplicates():
+        print("Duplicate audio: {}".format(" = ".join(group)))
+      if args.link:
+        print("Warning: hard-linked duplicates are a single file, so tagging one of them tags them all")
+        print("Hard-linked {} duplicates, {:.1f} MB saved".format(len(hasher.link_duplicates()), hasher.bytes_saved / 1e6))
+
+  # Set Firefox profile, --lean runs headless without images, fonts or trackers
+  LEAN = args.lean
+  firefox_profile = BrowserProfile.lean(DOWNLOAD_PATH) if LEAN else BrowserProfile.default(DOWNLOAD_PATH)
+
+  # Every pooled browser gets a profile of its own, lean ones with a cache directory of their own too
+  pool_workers = itertools.count(1)
+  def pool_driver():
+    worker = next(pool_workers)
+    profile = BrowserProfile.lean(DOWNLOAD_PATH, cache_path=os.path.join(BrowserProfile.CACHE_PATH, "worker-{}".format(worker))) if LEAN else BrowserProfile.default(DOWNLOAD_PATH)
+    return Firefox(profile, options=BrowserProfile.options())
+  options = BrowserProfile.options(headless=LEAN)
+
+  # Save the logged in session between runs when cryptography is installed
+  try:
+    import cryptography
+    SESSION_PATH = os.path.join(os.path.dirname(CACHE_PATH), "session.bin")
+  except ImportError:
+    SESSION_PATH = None
+
+  # Journal crawl progress so an interrupted crawl can be resumed with --resume,
+  # and remember the newest rows so --incremental stops once it reaches songs seen before
+  JOURNAL_PATH = os.path.join(os.path.dirname(CACHE_PATH), "journal.jsonl")
+
+  # Optionally count and time every WebDriver command with --metrics
+  metrics = DriverMetrics(os.path.join(os.path.dirname(CACHE_PATH), "metrics.json"), os.path.join(os.path.dirname(CACHE_PATH), "metrics.prom")) if args.metrics else None
+
+  # Optionally skip near duplicates of library songs too with --fuzzy THRESHOLD
+  FUZZY_THRESHOLD = args.fuzzy
+
+  # Optionally only plan the downloads with --plan PATH, or only perform a saved plan with --execute PATH
+  PLAN_PATH = args.plan
+  EXECUTE_PATH = args.execute
+
+  # Optionally crawl many listings with --schedule PATH, a JSON list of {"page_url", "page_count", "priority", "policy"} jobs sharing a daily quota set with --quota N
+  SCHEDULE_PATH = args.schedule
+  QUOTA = args.quota
+
+  # Optionally crawl pages with a pool of headless browsers
+  POOL_SIZE = args.workers
 
   # Begin main functionality
-  with Firefox(firefox_profile) as driver:        
+  with Firefox(firefox_profile, options=options) as driver:        
     # MAIN FUNCTION HERE
+    # Remember the learned download rate between runs
+    rate_limiter = RateLimiter(rate=1 / BpmSupreme.DOWNLOAD_RATE_LIMIT_TIMEOUT, state_path=os.path.join(os.path.dirname(CACHE_PATH), "rate.json"))
+
+    # Optionally stream files over HTTP instead of clicking through Firefox
+    http_downloader = HttpDownloader(DOWNLOAD_PATH, progress=show_progress) if args.http else None
+
+    # Optionally move completed downloads into the library as "Artist - Title (Version)" under genre and version folders with --organize
+    organizer = Organizer(DUPLICATE_PATH, cache_path=CACHE_PATH) if args.organize else None
+
+    # Confirm that clicked downloads land and add them to the library as they do
+    download_watcher = DownloadWatcher(DOWNLOAD_PATH) if not http_downloader else None
+
     # Log into account
-    account = BpmSupreme(driver, USERNAME, PASSWORD, DUPLICATE_PATH, DOWNLOAD_PATH)
+    account = BpmSupreme(driver, USERNAME, PASSWORD, DOWNLOAD_PATH, DUPLICATE_PATH, *LIBRARY_PATHS, cache_path=CACHE_PATH, rebuild_library=args.rebuild_library, http_downloader=http_downloader, download_workers=HttpDownloader.WORKERS if http_downloader else None, rate_limiter=rate_limiter, session_path=SESSION_PATH, journal_path=JOURNAL_PATH, download_watcher=download_watcher, metrics=metrics, fuzzy_threshold=FUZZY_THRESHOLD, read_tags=args.tags, organizer=organizer)
     assert account.login()
         
-    new_releases_page_count = input("How many pages of Hip-Hop new releases to download: ")
-    account.download_genre("https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b", int(new_releases_page_count))
\ No newline at end of file
+    if EXECUTE_PATH:
+      account.execute(DownloadPlan.load(EXECUTE_PATH))
+    elif PLAN_PATH:
+      new_releases_page_count = input("How many pages of Hip-Hop new releases to plan: ")
+      account.plan("https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b", int(new_releases_page_count)).save(PLAN_PATH)
+      print("Saved plan to {}".format(PLAN_PATH))
+    elif SCHEDULE_PATH:
+      with open(SCHEDULE_PATH) as schedule:
+        jobs = json.load(schedule)
+      if POOL_SIZE:
+        with WorkerPool(account, POOL_SIZE, driver_factory=pool_driver) as pool:
+          scheduler = CrawlScheduler(pool, QUOTA, state_path=os.path.join(os.path.dirname(CACHE_PATH), "quota.json"))
+          for job in jobs:
+            scheduler.add(**job)
+          scheduler.run()
+      else:
+        scheduler = CrawlScheduler(account, QUOTA, state_path=os.path.join(os.path.dirname(CACHE_PATH), "quota.json"))
+        for job in jobs:
+          scheduler.add(**job)
+        scheduler.run()
+    elif POOL_SIZE:
+      new_releases_page_count = input("How many pages of Hip-Hop new releases to download: ")
+      with WorkerPool(account, POOL_SIZE, driver_factory=pool_driver) as pool:
+        pool.download_genre("https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b", int(new_releases_page_count))
+    else:
+      new_releases_page_count = input("How many pages of Hip-Hop new releases to download: ")
+      account.download_genre("https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b", int(new_releases_page_count), resume=args.resume, incremental=args.incremental)
+
+    # Wait for any HTTP downloads still in flight
+    if http_downloader:
+      http_downloader.close()
+
+    if download_watcher:
+      download_watcher.close()
+
+    if organizer:
+      organizer.close()
\ No newline at end of file
@@ -0,0 +1,382 @@
+/*
+ * Minimal DOM the page scripts of the crawler run against under node,
+ * driven over stdin and stdout by NodeDriver in tests/node_driver.py.
+ * It covers what the scripts use: selectors of tags, classes and
+ * attributes with the descendant combinator, innerText, visibility,
+ * clicks, scrolling and MutationObserver.
+ *
+ * Every request is a JSON line with an "op":
+ *   - load: replaces the page by "tree", [tag, attributes, children], at "url"
+ *   - execute: runs "script" with "args", waiting for its callback when "async"
+ *   - run: runs "source" with the el(tag, attributes, children) helper, e.g.
+ *     to change the page the way the site would
+ *   - click: clicks the element with id "element"
+ * and is answered by a JSON line with its "value" or an "error".
+ * Elements are passed both ways as {"element": id}.
+ */
+'use strict';
+
+const readline = require('readline');
+
+let observers = [];
+let scrollListeners = [];
+let registry = [];
+
+function notify(record) {
+  for (const observer of observers) {
+    const options = observer.options;
+    if (record.type === 'childList' && !options.childList) continue;
+    if (record.type === 'characterData' && !options.characterData) continue;
+    if (record.type === 'attributes') {
+      if (!options.attributes && !options.attributeFilter) continue;
+      if (options.attributeFilter && options.attributeFilter.indexOf(record.attributeName) < 0) continue;
+    }
+    if (!observer.target.contains(record.target)) continue;
+    observer.records.push(record);
+    if (!observer.scheduled) {
+      observer.scheduled = true;
+      queueMicrotask(() => observer.deliver());
+    }
+  }
+}
+
+class MutationObserver {
+  constructor(callback) {
+    this.callback = callback;
+    this.records = [];
+    this.scheduled = false;
+  }
+
+  observe(target, options) {
+    this.target = target;
+    this.options = options;
+    if (observers.indexOf(this) < 0) observers.push(this);
+  }
+
+  disconnect() {
+    observers = observers.filter((observer) => observer !== this);
+    this.records = [];
+  }
+
+  deliver() {
+    this.scheduled = false;
+    const records = this.records.splice(0);
+    if (records.length && observers.indexOf(this) >= 0) this.callback(records, this);
+  }
+}
+
+class Text {
+  constructor(data) {
+    this.nodeType = 3;
+    this.parentNode = null;
+    this._data = data;
+  }
+
+  get data() {
+    return this._data;
+  }
+
+  set data(value) {
+    this._data = String(value);
+    notify({type: 'characterData', target: this});
+  }
+
+  contains(node) {
+    return node === this;
+  }
+}
+
+function parseStyle(text) {
+  const style = {};
+  for (const declaration of (text || '').split(';')) {
+    const colon = declaration.indexOf(':');
+    if (colon > 0) style[declaration.slice(0, colon).trim()] = declaration.slice(colon + 1).trim();
+  }
+  return style;
+}
+
+// Parses a selector list into lists of compounds, e.g. '.a div.b, h1'
+// into [[{classes: ['a']}, {tag: 'DIV', classes: ['b']}], [{tag: 'H1'}]]
+function parseSelector(selector) {
+  return selector.split(',').map((complex) => complex.trim().split(/\s+/).map((compound) => {
+    const parsed = {tag: null, classes: [], attributes: []};
+    const pattern = /^[\w-]+|\.[\w-]+|\[([\w-]+)(?:="([^"]*)")?\]/g;
+    let match;
+    while ((match = pattern.exec(compound))) {
+      if (match[0][0] === '.') parsed.classes.push(match[0].slice(1));
+      else if (match[0][0] === '[') parsed.attributes.push([match[1], match[2]]);
+      else parsed.tag = match[0].toUpperCase();
+    }
+    return parsed;
+  }));
+}
+
+function matchesCompound(element, compound) {
+  if (compound.tag && element.tagName !== compound.tag) return false;
+  const classes = element.className.split(/\s+/);
+  if (!compound.classes.every((name) => classes.indexOf(name) >= 0)) return false;
+  return compound.attributes.every(([name, value]) => value === undefined ? element.getAttribute(name) !== null : element.getAttribute(name) === value);
+}
+
+function matchesComplex(element, compounds) {
+  if (!matchesCompound(element, compounds[compounds.length - 1])) return false;
+  let index = compounds.length - 2;
+  for (let ancestor = element.parentNode; ancestor && ancestor.nodeType === 1 && index >= 0; ancestor = ancestor.parentNode) {
+    if (matchesCompound(ancestor, compounds[index])) index--;
+  }
+  return index < 0;
+}
+
+class Element {
+  constructor(tag, attributes) {
+    this.nodeType = 1;
+    this.tagName = tag.toUpperCase();
+    this.attributes = {};
+    this.childNodes = [];
+    this.parentNode = null;
+    this.onclick = null;
+    const element = this;
+    this.style = new Proxy({}, {
+      set(style, name, value) {
+        style[name] = value;
+        notify({type: 'attributes', target: element, attributeName: 'style'});
+        return true;
+      },
+    });
+    for (const name in attributes || {}) {
+      if (name === 'style') Object.assign(this.style, parseStyle(attributes[name]));
+      this.attributes[name] = String(attributes[name]);
+    }
+  }
+
+  get className() {
+    return this.attributes['class'] || '';
+  }
+
+  set className(value) {
+    this.setAttribute('class', value);
+  }
+
+  getAttribute(name) {
+    return name in this.attributes ? this.attributes[name] : null;
+  }
+
+  setAttribute(name, value) {
+    this.attributes[name] = String(value);
+    notify({type: 'attributes', target: this, attributeName: name});
+  }
+
+  get children() {
+    return this.childNodes.filter((node) => node.nodeType === 1);
+  }
+
+  get firstChild() {
+    return this.childNodes[0] || null;
+  }
+
+  get href() {
+    const href = this.getAttribute('href');
+    return href === null ? '' : new URL(href, location.href).href;
+  }
+
+  appendChild(node) {
+    if (node.parentNode) node.parentNode.removeChild(node);
+    node.parentNode = this;
+    this.childNodes.push(node);
+    notify({type: 'childList', target: this, addedNodes: [node], removedNodes: []});
+    return node;
+  }
+
+  removeChild(node) {
+    this.childNodes = this.childNodes.filter((child) => child !== node);
+    node.parentNode = null;
+    notify({type: 'childList', target: this, addedNodes: [], removedNodes: [node]});
+    return node;
+  }
+
+  remove() {
+    if (this.parentNode) this.parentNode.removeChild(this);
+  }
+
+  contains(node) {
+    for (let current = node; current; current = current.parentNode) {
+      if (current === this) return true;
+    }
+    return false;
+  }
+
+  get innerText() {
+    return this.childNodes.map((node) => node.nodeType === 3 ? node.data : node.innerText).join('');
+  }
+
+  set innerText(value) {
+    const removed = this.childNodes.splice(0);
+    for (const node of removed) node.parentNode = null;
+    const text = new Text(String(value));
+    text.parentNode = this;
+    this.childNodes.push(text);
+    notify({type: 'childList', target: this, addedNodes: [text], removedNodes: removed});
+  }
+
+  getClientRects() {
+    if (!document.documentElement.contains(this)) return [];
+    for (let node = this; node && node.nodeType === 1; node = node.parentNode) {
+      if (node.style.display === 'none' || node.getAttribute('hidden') !== null) return [];
+    }
+    return [{}];
+  }
+
+  matches(selector) {
+    return parseSelector(selector).some((compounds) => matchesComplex(this, compounds));
+  }
+
+  querySelectorAll(selector) {
+    const complexes = parseSelector(selector);
+    const found = [];
+    const walk = (node) => {
+      for (const child of node.children) {
+        if (complexes.some((compounds) => matchesComplex(child, compounds))) found.push(child);
+        walk(child);
+      }
+    };
+    walk(this);
+    return found;
+  }
+
+  querySelector(selector) {
+    return this.querySelectorAll(selector)[0] || null;
+  }
+
+  getElementsByClassName(name) {
+    return this.querySelectorAll('.' + name);
+  }
+
+  closest(selector) {
+    for (let node = this; node && node.nodeType === 1; node = node.parentNode) {
+      if (node.matches(selector)) return node;
+    }
+    return null;
+  }
+
+  click() {
+    if (this.onclick) this.onclick.call(this, {type: 'click'});
+  }
+}
+
+function el(tag, attributes, children) {
+  const element = new Element(tag, attributes);
+  for (const child of children || []) {
+    const node = typeof child === 'string' ? new Text(child) : child;
+    node.parentNode = element;
+    element.childNodes.push(node);
+  }
+  return element;
+}
+
+function build(tree) {
+  return typeof tree === 'string' ? tree : el(tree[0], tree[1], tree[2].map(build));
+}
+
+const document = {
+  documentElement: null,
+  body: null,
+  querySelector: (selector) => document.documentElement.querySelector(selector),
+  querySelectorAll: (selector) => document.documentElement.querySelectorAll(selector),
+  getElementsByClassName: (name) => document.documentElement.getElementsByClassName(name),
+};
+
+function load(tree, url) {
+  observers = [];
+  scrollListeners = [];
+  registry = [];
+  delete global.__bpmEvents;
+  delete global.__bpmPage;
+  global.location = {href: url};
+  document.body = build(tree);
+  document.documentElement = el('html', {}, [document.body]);
+  global.scrollY = 0;
+}
+
+Object.defineProperty(Element.prototype, 'scrollHeight', {
+  get() {
+    return 100 + 50 * this.querySelectorAll('*').length;
+  },
+});
+
+global.window = global;
+global.document = document;
+global.MutationObserver = MutationObserver;
+global.innerHeight = 800;
+Object.defineProperty(global, 'navigator', {value: {userAgent: 'NodeDriver'}, configurable: true});
+global.getComputedStyle = (element) => ({visibility: element.style.visibility || 'visible'});
+global.addEventListener = (type, listener) => {
+  if (type === 'scroll') scrollListeners.push(listener);
+};
+global.scrollTo = (x, y) => {
+  global.scrollY = Math.max(0, y - global.innerHeight);
+  setTimeout(() => scrollListeners.forEach((listener) => listener({type: 'scroll'})), 0);
+};
+global.el = el;
+load(['body', {}, []], 'about:blank');
+
+function serialize(value) {
+  if (value instanceof Element) {
+    let id = registry.indexOf(value);
+    if (id < 0) id = registry.push(value) - 1;
+    return {element: id};
+  }
+  if (Array.isArray(value)) return value.map(serialize);
+  if (value && typeof value === 'object') {
+    const result = {};
+    for (const key in value) result[key] = serialize(value[key]);
+    return result;
+  }
+  return value === undefined ? null : value;
+}
+
+function deserialize(value) {
+  if (Array.isArray(value)) return value.map(deserialize);
+  if (value && typeof value === 'object') {
+    if (Object.keys(value).length === 1 && 'element' in value) return registry[value.element];
+    const result = {};
+    for (const key in value) result[key] = deserialize(value[key]);
+    return result;
+  }
+  return value;
+}
+
+function reply(response) {
+  process.stdout.write(JSON.stringify(response) + '\n');
+}
+
+readline.createInterface({input: process.stdin}).on('line', (line) => {
+  const request = JSON.parse(line);
+  try {
+    if (request.op === 'load') {
+      load(request.tree, request.url);
+      reply({value: null});
+    } else if (request.op === 'run') {
+      reply({value: serialize(new Function('el', request.source)(el))});
+    } else if (request.op === 'click') {
+      registry[request.element].click();
+      reply({value: null});
+    } else if (request.op === 'execute') {
+      const script = new Function(request.script);
+      const args = deserialize(request.args);
+      if (!request.async) {
+        reply({value: serialize(script.apply(global, args))});
+        return;
+      }
+      let replied = false;
+      script.apply(global, args.concat([(value) => {
+        if (replied) return;
+        replied = true;
+        reply({value: serialize(value)});
+      }]));
+    } else {
+      reply({error: 'Unknown op ' + request.op});
+    }
+  } catch (error) {
+    reply({error: String(error && error.stack || error)});
+  }
+});
@@ -0,0 +1,534 @@
+"""
+Local stand-in for the BPM Supreme site used by tests and benchmarks.
+Pages carry the same markup the crawler relies on: the login form,
+.table-media listings with pagination, download buttons guarded by
+the "Download Limit" popup and the infinite scrolling download history,
+along with the artwork, web fonts and tracker tags that make real page
+loads heavy. Row counts and latencies are configurable.
+"""
+
+import collections
+import html
+import json
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import quote
+from urllib.parse import unquote
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver import Firefox
+
+from src.bpm_supreme.classes.BpmSupreme import BpmSupreme
+from src.bpm_supreme.classes.PageEvents import PageEvents
+
+# Smallest valid GIF, served as artwork
+PIXEL = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+
+# MPEG 1 Layer III frame header: 128 kbps, 44100 Hz, stereo
+FRAME_HEADER = b"\xff\xfb\x90\x00"
+
+# Tracker tag found on the real site, refused by the lean profile
+TRACKER_SCRIPT = "https://www.googletagmanager.com/gtag/js?id=UA-000000-1"
+
+# Client side of the site: download buttons, the limit popup and the
+# infinite scrolling history
+SITE_SCRIPT = """
+  function bpmPopup(title) {
+    var popup = document.createElement('div');
+    popup.className = 'popup';
+    popup.innerHTML = '<div class="popup_inner"><div class="title"></div><div class="close">&times;</div></div>';
+    popup.querySelector('.title').innerText = title;
+    popup.querySelector('.close').onclick = function() { popup.remove(); };
+    document.body.appendChild(popup);
+  }
+
+  function bpmDownload(button) {
+    fetch('/api/download/' + button.getAttribute('data-id'), {credentials: 'same-origin'})
+      .then(function(response) { return response.json(); })
+      .then(function(result) {
+        if (result.limited) return bpmPopup('Download Limit');
+        var link = document.createElement('a');
+        link.href = result.url;
+        link.download = '';
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+      });
+    return false;
+  }
+
+  function bpmHistory() {
+    var table = document.querySelector('.table-media[data-history]');
+    if (!table) return;
+    var loading = false, offset = table.querySelectorAll('.row-item').length;
+    var loader = document.querySelector('.loader');
+    window.addEventListener('scroll', function() {
+      if (loading || window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+      if (offset >= +table.getAttribute('data-history')) return;
+      loading = true;
+      loader.style.display = 'block';
+      fetch('/api/history?offset=' + offset, {credentials: 'same-origin'})
+        .then(function(response) { return response.text(); })
+        .then(function(rows) {
+          table.insertAdjacentHTML('beforeend', rows);
+          offset = table.querySelectorAll('.row-item').length;
+          loader.style.display = 'none';
+          loading = false;
+        });
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', bpmHistory);
+"""
+
+class FakeSite:
+  """
+  Threaded HTTP server standing in for the site and the app
+
+  Methods:
+    - start()
+    - close()
+    - configure()
+    - genre_url()
+    - rows()
+    - history()
+    - song()
+    - title()
+  """
+
+  GENRE = "hip-hop-r%26b"
+  EXCLUSIVES = "exclusives"
+
+  # Versions offered by listing rows, each row gets a rotating window of them
+  VERSIONS = ("Intro Dirty", "Quick Hit Dirty", "Intro Clean", "Quick Hit Clean", "Dirty", "Clean", "Clean Short Edit")
+  EXCLUSIVE_VERSIONS = ("Dirty Short Edit", "Dirty Extended", "Dirty", "Clean", "Clean Extended", "Clean Short Edit")
+
+  SESSION = "fake-session"
+
+  def __init__(self, rows_per_page=25, pages=10, history_rows=200, history_batch=25, latency=0.0, asset_latency=0.05, asset_size=64 * 1024,
+    download_latency=0.0, download_size=64 * 1024, download_limit=0, limit_window=60.0, overlap=0, new_releases=0):
+    """
+    Constructor for FakeSite object
+
+    Args:
+      - rows_per_page: Number of rows on every listing page
+      - pages: Number of listing pages
+      - history_rows: Number of rows in the download history
+      - history_batch: Number of history rows loaded per scroll
+      - latency: Seconds added to every page and API response
+      - asset_latency: Seconds added to every artwork and font response
+      - asset_size: Bytes of every artwork and font response
+      - download_latency: Seconds added before every song download
+      - download_size: Bytes of every song download
+      - download_limit: Downloads allowed per limit_window before the "Download Limit" popup, 0 for no limit
+      - limit_window: Seconds of the download limit window
+      - overlap: Rows of the previous page shown again at the top of
+        every page, as when new releases push a listing down between loads
+      - new_releases: Rows released since the listing was first crawled,
+        listed before its first row and pushing every row down
+    """
+    self.rows_per_page = rows_per_page
+    self.pages = pages
+    self.history_rows = history_rows
+    self.history_batch = history_batch
+    self.latency = latency
+    self.asset_latency = asset_latency
+    self.asset_size = asset_size
+    self.download_latency = download_latency
+    self.download_size = download_size
+    self.download_limit = download_limit
+    self.limit_window = limit_window
+    self.overlap = overlap
+    self.new_releases = new_releases
+    self.requests = []
+    self.downloads = []
+    self.limited = 0
+    self._granted = collections.deque()
+    self._lock = threading.Lock()
+    self._server = None
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  @property
+  def url(self):
+    return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+  def genre_url(self, genre=GENRE):
+    return "{}/new-releases/audio/{}".format(self.url, genre)
+
+  def configure(self, account):
+    """
+    Points a BpmSupreme account at this site
+    """
+    account.LOGIN_URL = self.url + "/login"
+    account.APP_URL = self.url
+    return account
+
+  def start(self):
+    """
+    Starts serving on a free local port
+    """
+    class Handler(FakeSiteHandler):
+      site = self
+
+    self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    self._server.daemon_threads = True
+    threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+  def close(self):
+    """
+    Stops serving
+    """
+    if self._server:
+      self._server.shutdown()
+      self._server.server_close()
+      self._server = None
+
+  def record(self, path):
+    with self._lock:
+      self.requests.append(path)
+
+  def rows(self, page, genre=GENRE):
+    """
+    Returns the (id, artist, title, versions) of every row on a listing page
+    """
+    choices = FakeSite.EXCLUSIVE_VERSIONS if genre == FakeSite.EXCLUSIVES else FakeSite.VERSIONS
+    first = max((page - 1) * self.rows_per_page - self.overlap, 0) - self.new_releases
+    return [("{}-{}".format(genre, index), "Artist {}".format(index % 97), FakeSite.title(genre, index), choices[index % 3:index % 3 + 4])
+      for index in range(first, first + self.rows_per_page)]
+
+  def history(self, offset, count):
+    """
+    Returns the (id, artist, title, versions) of download history rows
+    """
+    return [("history-{}".format(index), "Artist {}".format(index % 97), FakeSite.title("history", index), (FakeSite.VERSIONS[index % len(FakeSite.VERSIONS)],))
+      for index in range(offset, min(offset + count, self.history_rows))]
+
+  def song(self, song_id):
+    """
+    Returns the file name a download button of song_id saves to
+    """
+    row_id, version = song_id.rsplit(":", 1)
+    genre, index = re.match(r"(.*?)-(-?\d+)$", row_id).groups()
+    index = int(index)
+    return "Artist {} - {} ({}).mp3".format(index % 97, FakeSite.title(genre, index), version)
+
+  @staticmethod
+  def title(genre, index):
+    """
+    Returns the title of a row, unique across genres so that crawls of
+    different genres never see each other's files as duplicates
+    """
+    return "{} Track {}".format(genre.split("-")[0].title(), index)
+
+  def grant(self, song_id):
+    """
+    Counts a download against the limit
+
+    Returns:
+      - True if the download may start, False if the limit was reached
+    """
+    with self._lock:
+      now = time.monotonic()
+      while self._granted and now - self._granted[0] > self.limit_window:
+        self._granted.popleft()
+
+      if self.download_limit and len(self._granted) >= self.download_limit:
+        self.limited += 1
+        return False
+
+      self._granted.append(now)
+      self.downloads.append(song_id)
+      return True
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+  """
+  Routes requests of a FakeSite
+  """
+  site = None
+
+  def do_GET(self):
+    parts = urlsplit(self.path)
+    query = parse_qs(parts.query)
+    self.site.record(parts.path)
+
+    if parts.path.startswith("/artwork/") or parts.path.startswith("/fonts/"):
+      time.sleep(self.site.asset_latency)
+      self.respond(200, "image/gif" if parts.path.startswith("/artwork/") else "font/woff2", PIXEL + bytes(max(self.site.asset_size - len(PIXEL), 0)))
+      return
+
+    if parts.path == "/fonts.css":
+      self.respond(200, "text/css", b"@font-face { font-family: Site; src: url(/fonts/site.woff2); } body { font-family: Site; } .popup_inner { position: fixed; top: 40%; }")
+      return
+
+    if parts.path == "/site.js":
+      self.respond(200, "application/javascript", SITE_SCRIPT.encode())
+      return
+
+    if parts.path.startswith("/download/"):
+      time.sleep(self.site.download_latency)
+      name = self.site.song(unquote(parts.path[len("/download/"):]))
+      self.respond(200, "audio/mpeg", FRAME_HEADER + bytes(max(self.site.download_size - len(FRAME_HEADER), 0)),
+        {"Content-Disposition": "attachment; filename=\"{}\"".format(name)})
+      return
+
+    time.sleep(self.site.latency)
+
+    if parts.path == "/login":
+      self.page("Log in", self.login_form())
+      return
+
+    if parts.path == "/":
+      self.page("Home", '<div class="account-menu-toggle">Account</div>' if self.logged_in() else self.login_form())
+      return
+
+    if parts.path.startswith("/new-releases/audio/"):
+      genre = unquote(parts.path[len("/new-releases/audio/"):])
+      page = int(query.get("page", ["1"])[0])
+      pagination = '<li><a href="?page={}">&lsaquo;</a></li>'.format(max(page - 1, 1))
+      if page < self.site.pages:
+        pagination += '<li><a href="?page={}">&rsaquo;</a></li>'.format(page + 1)
+      self.page("New releases", '<div class="table-media">{}</div><ul class="pagination">{}</ul>'.format(
+        self.rows(self.site.rows(page, genre)), pagination))
+      return
+
+    if parts.path == "/account/download-history":
+      if not self.logged_in():
+        self.redirect("/login")
+        return
+      self.page("Download history", '<div class="table-media" data-history="{}">{}</div><div class="loader" style="display: none">Loading</div>'.format(
+        self.site.history_rows, self.rows(self.site.history(0, self.site.history_batch))))
+      return
+
+    if parts.path == "/api/history":
+      offset = int(query.get("offset", ["0"])[0])
+      self.respond(200, "text/html", self.rows(self.site.history(offset, self.site.history_batch)).encode())
+      return
+
+    if parts.path.startswith("/api/download/"):
+      if not self.logged_in():
+        self.respond(403, "application/json", b'{"error": "login"}')
+        return
+      song_id = unquote(parts.path[len("/api/download/"):])
+      result = {"url": "/download/" + quote(song_id)} if self.site.grant(song_id) else {"limited": True}
+      self.respond(200, "application/json", json.dumps(result).encode())
+      return
+
+    self.respond(404, "text/plain", b"Not found")
+
+  def do_POST(self):
+    parts = urlsplit(self.path)
+    self.site.record(parts.path)
+    form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+
+    if parts.path == "/login" and form.get("email") and form.get("password"):
+      self.redirect("/", {"Set-Cookie": "session={}; Path=/".format(FakeSite.SESSION)})
+      return
+
+    self.redirect("/login")
+
+  def logged_in(self):
+    return "session={}".format(FakeSite.SESSION) in self.headers.get("Cookie", "")
+
+  def login_form(self):
+    return """
+      <form method="post" action="/login">
+        <input id="login-form-email" name="email" type="email">
+        <input id="login-form-password" name="password" type="password">
+        <button type="submit">Log in</button>
+      </form>"""
+
+  def rows(self, rows):
+    """
+    Renders rows in the markup BpmSupreme.extract_page() reads
+    """
+    rendered = []
+    for row_id, artist, title, versions in rows:
+      buttons = "".join('<a class="tag-link" href="/download/{0}" data-id="{0}" onclick="return bpmDownload(this)">{1}</a>'.format(
+        html.escape(quote("{}:{}".format(row_id, version))), html.escape(version)) for version in versions)
+      rendered.append("""
+        <div class="row-container"><div class="row-item">
+          <img src="/artwork/{row_id}.gif" width="48" height="48">
+          <div class="row-track-name"><span>{title}</span></div>
+          <div class="row-artist"><a class="link">{artist}</a></div>
+          <div class="row-versions">{buttons}</div>
+        </div></div>""".format(row_id=row_id, title=html.escape(title), artist=html.escape(artist), buttons=buttons))
+    return "".join(rendered)
+
+  def page(self, title, body):
+    self.respond(200, "text/html", """<!DOCTYPE html>
+      <html><head>
+        <title>{title}</title>
+        <link rel="stylesheet" href="/fonts.css">
+        <script src="/site.js"></script>
+        <script async src="{tracker}"></script>
+      </head><body>{body}</body></html>""".format(title=title, tracker=TRACKER_SCRIPT, body=body).encode())
+
+  def redirect(self, location, headers=None):
+    self.send_response(303)
+    self.send_header("Location", location)
+    self.send_header("Content-Length", "0")
+    for key, value in (headers or {}).items():
+      self.send_header(key, value)
+    self.end_headers()
+
+  def respond(self, status, content_type, body, headers=None):
+    self.send_response(status)
+    self.send_header("Content-Type", content_type)
+    self.send_header("Content-Length", str(len(body)))
+    self.send_header("Cache-Control", "max-age=3600" if content_type.startswith(("image/", "font/", "text/css")) else "no-store")
+    for key, value in (headers or {}).items():
+      self.send_header(key, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args):
+    pass
+
+class FakeDriver(Firefox):
+  """
+  Firefox stand-in that loads FakeSite pages over HTTP without starting
+  a browser and answers the scripts the crawler runs on them with
+  canned values of the shapes the callers expect. No JS runs: rows are
+  parsed in Python, waits succeed at once, no popup ever appears and
+  scrolling loads nothing. Pagination links are followed, but buttons
+  cannot be clicked, so crawls download through an HttpDownloader. The scripts themselves are
+  tested under NodeDriver, see tests/node_driver.py.
+  """
+
+  _ROW = re.compile(r'<div class="row-item">(.*?)<div class="row-versions">(.*?)</div>', re.DOTALL)
+  _TITLE = re.compile(r'<div class="row-track-name"><span>(.*?)</span>')
+  _ARTIST = re.compile(r'<a class="link">(.*?)</a>')
+  _BUTTON = re.compile(r'<a class="tag-link" href="([^"]*)"[^>]*>(.*?)</a>')
+  _PAGINATION = re.compile(r'<ul class="pagination">(.*?)</ul>', re.DOTALL)
+  _LINK = re.compile(r'<li><a href="([^"]*)">(.*?)</a></li>')
+
+  def __init__(self):
+    self.cookies = []
+    self.pages = []
+    self.extracted = 0
+    self.clicks = 0
+    self._url = None
+    self._source = ""
+
+  @property
+  def current_url(self):
+    return self._url
+
+  @property
+  def page_source(self):
+    return self._source
+
+  def get(self, url):
+    self._url = url
+    self.pages.append(url)
+    with urllib.request.urlopen(url) as response:
+      self._source = response.read().decode()
+
+  def get_cookies(self):
+    return list(self.cookies)
+
+  def add_cookie(self, cookie):
+    self.cookies.append(cookie)
+
+  def set_script_timeout(self, seconds):
+    pass
+
+  def find_element_by_class_name(self, name):
+    pagination = FakeDriver._PAGINATION.search(self._source)
+    if name != "pagination" or pagination is None:
+      raise NoSuchElementException("Unable to locate element: .{}".format(name))
+    return FakePagination([FakeLink(self, html.unescape(href), html.unescape(text)) for href, text in FakeDriver._LINK.findall(pagination.group(1))])
+
+  def execute_script(self, script, *args):
+    if script == BpmSupreme.EXTRACT_PAGE_SCRIPT:
+      return self._extract()
+    if "innerText === '›'" in script:
+      # The next page link of get_next_page()
+      return next((link for link in args[0] if link.text == "›"), None)
+    if script == PageEvents.START_CLICK_SCRIPT:
+      # No button is ever found, so the click fails
+      self.clicks += 1
+      return {"button": None, "click": self.clicks}
+    if script == PageEvents.CLOSE_POPUPS_SCRIPT:
+      return 0
+    if "querySelectorAll(arguments[0]).length" in script:
+      return self._count(args[0])
+    if "navigator.userAgent" in script:
+      return "FakeDriver"
+    if "localStorage.length" in script:
+      return dict()
+    return None
+
+  def execute_async_script(self, script, *args):
+    if script == PageEvents.TAKE_POPUPS_SCRIPT:
+      return []
+    if script == PageEvents.SCROLL_TO_END_SCRIPT:
+      return {"count": self._count(args[0]), "rounds": 0}
+    # Every wait succeeds at once
+    return True
+
+  def quit(self):
+    pass
+
+  def _count(self, selector):
+    """
+    Returns the number of elements of the current page with the class
+    of the last part of a CSS selector, e.g. ".row-item"
+    """
+    name = selector.split()[-1].split(".")[-1]
+    return len(re.findall(r'class="(?:[^"]* )?{}(?: [^"]*)?"'.format(re.escape(name)), self._source))
+
+  def _extract(self):
+    """
+    Parses the rows of the current page like BpmSupreme.EXTRACT_PAGE_SCRIPT
+    """
+    self.extracted += 1
+    rows = []
+    for index, (details, buttons) in enumerate(FakeDriver._ROW.findall(self._source)):
+      versions = dict()
+      urls = dict()
+      for button, (href, label) in enumerate(FakeDriver._BUTTON.findall(buttons)):
+        label = html.unescape(label).strip()
+        versions.setdefault(label, "{}-{}-{}".format(self.extracted, index, button))
+        urls.setdefault(label, urljoin(self._url, html.unescape(href)))
+      title = FakeDriver._TITLE.search(details)
+      rows.append({"index": index, "name": html.unescape(title.group(1)) if title else "Unknown",
+        "artists": [html.unescape(artist) for artist in FakeDriver._ARTIST.findall(details)], "versions": versions, "urls": urls})
+    return rows
+
+class FakePagination:
+  """
+  Pagination list of a FakeDriver page
+  """
+
+  def __init__(self, links):
+    self._links = links
+
+  def find_elements_by_tag_name(self, name):
+    return list(self._links) if name == "li" else []
+
+class FakeLink:
+  """
+  Pagination link of a FakeDriver page, loading its page when clicked
+  """
+
+  def __init__(self, driver, href, text):
+    self._driver = driver
+    self.href = href
+    self.text = text
+
+  def click(self):
+    self._driver.get(urljoin(self._driver.current_url, self.href))
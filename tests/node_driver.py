@@ -0,0 +1,149 @@
+"""
+Firefox stand-in that runs the scripts the crawler sends in node,
+against the minimal DOM of dom.js, so the page scripts of BpmSupreme
+and PageEvents are tested without a browser. Pages are loaded from
+HTML, e.g. served by FakeSite, or changed by running JS on them.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import urllib.request
+from html.parser import HTMLParser
+
+from selenium.common.exceptions import JavascriptException
+from selenium.webdriver import Firefox
+
+DOM_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dom.js")
+
+# Whether NodeDriver can run here
+NODE = shutil.which("node")
+
+class TreeParser(HTMLParser):
+  """
+  Parses HTML into the [tag, attributes, children] tree dom.js loads
+  """
+
+  VOID = ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr")
+
+  def __init__(self):
+    super().__init__()
+    self.root = ["body", {}, []]
+    self._open = [self.root]
+
+  def handle_starttag(self, tag, attrs):
+    if tag in ("html", "head", "body"):
+      return
+    node = [tag, {name: value if value is not None else "" for name, value in attrs}, []]
+    self._open[-1][2].append(node)
+    if tag not in TreeParser.VOID:
+      self._open.append(node)
+
+  def handle_endtag(self, tag):
+    for index in range(len(self._open) - 1, 0, -1):
+      if self._open[index][0] == tag:
+        del self._open[index:]
+        return
+
+  def handle_data(self, data):
+    if data.strip() and self._open[-1][0] not in ("script", "style", "title"):
+      self._open[-1][2].append(data)
+
+class NodeElement:
+  """
+  Handle of an element of the page in node
+  """
+
+  def __init__(self, driver, element_id):
+    self._driver = driver
+    self.id = element_id
+
+  def click(self):
+    self._driver.send({"op": "click", "element": self.id})
+
+class NodeDriver(Firefox):
+  """
+  Firefox stand-in running scripts in node, see the module docstring
+  """
+
+  def __init__(self):
+    self.pages = []
+    self._url = "about:blank"
+    self._process = subprocess.Popen([NODE, DOM_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True, bufsize=1)
+
+  @property
+  def current_url(self):
+    return self._url
+
+  def load(self, body, url="http://127.0.0.1/"):
+    """
+    Replaces the page by the HTML body at url
+    """
+    parser = TreeParser()
+    parser.feed(body)
+    parser.close()
+    self._url = url
+    self.send({"op": "load", "tree": parser.root, "url": url})
+
+  def run(self, source):
+    """
+    Runs JS source on the page, with an el(tag, attributes, children)
+    helper creating elements, and returns its result
+    """
+    return self.send({"op": "run", "source": source})
+
+  def get(self, url):
+    self.pages.append(url)
+    with urllib.request.urlopen(url) as response:
+      self.load(response.read().decode(), url)
+
+  def get_cookies(self):
+    return []
+
+  def set_script_timeout(self, seconds):
+    pass
+
+  def execute_script(self, script, *args):
+    return self.send({"op": "execute", "script": script, "args": self._wrap(list(args)), "async": False})
+
+  def execute_async_script(self, script, *args):
+    return self.send({"op": "execute", "script": script, "args": self._wrap(list(args)), "async": True})
+
+  def quit(self):
+    if self._process.poll() is None:
+      self._process.stdin.close()
+      self._process.wait()
+      self._process.stdout.close()
+
+  def send(self, request):
+    """
+    Sends a request to dom.js and returns the value it answers with
+
+    Raises:
+      - JavascriptException if the request failed
+    """
+    self._process.stdin.write(json.dumps(request) + "\n")
+    self._process.stdin.flush()
+    response = json.loads(self._process.stdout.readline())
+    if "error" in response:
+      raise JavascriptException(response["error"])
+    return self._unwrap(response["value"])
+
+  def _wrap(self, value):
+    if isinstance(value, NodeElement):
+      return {"element": value.id}
+    if isinstance(value, list):
+      return [self._wrap(item) for item in value]
+    if isinstance(value, dict):
+      return {key: self._wrap(item) for key, item in value.items()}
+    return value
+
+  def _unwrap(self, value):
+    if isinstance(value, dict) and list(value) == ["element"]:
+      return NodeElement(self, value["element"])
+    if isinstance(value, list):
+      return [self._unwrap(item) for item in value]
+    if isinstance(value, dict):
+      return {key: self._unwrap(item) for key, item in value.items()}
+    return value
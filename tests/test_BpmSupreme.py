@@ -2,6 +2,12 @@
 This test file determines if BpmSupreme class methods are working correctly
 """
 
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
 import pytest
 from selenium.common import exceptions as selenium_exceptions
 from selenium.webdriver.support.ui import WebDriverWait
@@ -11,6 +17,15 @@ from selenium.webdriver import Firefox
 
 from src.bpm_supreme.classes.BpmSupreme import BpmSupreme
 from src.bpm_supreme.classes.BpmSupreme import Song
+from src.bpm_supreme.classes.DownloadWatcher import DownloadWatcher
+from src.bpm_supreme.classes.HttpDownloader import HttpDownloader
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+from src.bpm_supreme.classes.RateLimiter import RateLimiter
+from src.bpm_supreme.classes.VersionPolicy import VersionPolicy
+from tests.fake_site import FakeDriver
+from tests.fake_site import FakeSite
+from tests.node_driver import NODE
+from tests.node_driver import NodeDriver
 
 @pytest.fixture
 def account(username, password, download_dir):
@@ -23,6 +38,342 @@ def account(username, password, download_dir):
   print("Tearing down Selenium Firefox WebDriver")
   driver.quit()
 
+class StubDriver(FakeDriver):
+  """
+  Stand-in WebDriver for crawls of in-memory listings that never load a page
+  """
+  def find_elements_by_class_name(self, name):
+    return [name]
+
+class FakeListing(BpmSupreme):
+  """
+  Stand-in account crawling an in-memory listing, newest rows first,
+  where every row has a single "Dirty" version. Downloads complete at
+  once, except for the songs named in unconfirmed which never land.
+  """
+  def __init__(self, names, path, rows_per_page=4, library=None, unconfirmed=()):
+    downloads = path / "downloads"
+    downloads.mkdir(exist_ok=True)
+    super().__init__(StubDriver(), "user@example.com", "password", str(downloads), library=library, journal_path=str(path / "journal.jsonl"),
+      rate_limiter=RateLimiter(rate=1000, burst=1000), version_tiers={"genre": ((("Dirty",), VersionPolicy.ANY),)})
+    self.names = names
+    self.rows_per_page = rows_per_page
+    self.unconfirmed = set(unconfirmed)
+    self.page = 1
+    self.loads = 0
+    self.downloaded = []
+
+  def load_page(self, url=None, selector=".row-container"):
+    if url is not None:
+      self.page = int(parse_qs(urlsplit(url).query).get(self.PAGE_PARAMETER, ["1"])[0])
+    else:
+      self.loads += 1
+
+  def extract_page(self):
+    start = (self.page - 1) * self.rows_per_page
+    return [{"name": name, "artists": ["Artist"], "versions": {"Dirty": "id"}, "urls": {}} for name in self.names[start:start + self.rows_per_page]]
+
+  def get_next_page(self):
+    self.page += 1
+    return (self.page - 1) * self.rows_per_page < len(self.names)
+
+  def fetch(self, song, block=False):
+    self.downloaded.append(song.name)
+    if song.name not in self.unconfirmed:
+      self._confirmed.add((song.row_key, song.name))
+    return True
+
+class TestIncrementalSync():
+  """
+  Class for testing incremental download_genre() crawls
+  """
+  URL = "https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b"
+
+  def test_stops_at_known_page(self, tmp_path):
+    names = ["Song {}".format(index) for index in range(40)]
+    account = FakeListing(names, tmp_path)
+    account.download_genre(self.URL, 10, incremental=True)
+    assert account.loads == 10
+    assert len(account.downloaded) == 40
+
+    # Two new releases push the listing down: page 1 has them, page 2 is all known
+    account.names = ["New 1", "New 0"] + names
+    account.downloaded = []
+    account.loads = 0
+    account.download_genre(self.URL, 10, incremental=True)
+    assert account.downloaded == ["New 1 (Dirty)", "New 0 (Dirty)"]
+    assert account.loads == 2
+    assert account.journal.high_water_mark(self.URL)[:3] == ["Artist - New 1", "Artist - New 0", "Artist - Song 0"]
+
+  def test_stops_after_known_run(self, tmp_path):
+    library = LibraryIndex(["Artist - Song {} (Dirty).mp3".format(index) for index in range(1, 40)])
+    account = FakeListing(["Song {}".format(index) for index in range(40)], tmp_path, rows_per_page=20, library=library)
+    account.download_genre(self.URL, 2, incremental=True, stop_rows=3)
+    assert account.downloaded == ["Song 0 (Dirty)"]
+    assert account.loads == 1
+
+  def test_full_crawl_without_incremental(self, tmp_path):
+    library = LibraryIndex(["Artist - Song {} (Dirty).mp3".format(index) for index in range(8)])
+    account = FakeListing(["Song {}".format(index) for index in range(8)], tmp_path, library=library)
+    account.download_genre(self.URL, 2)
+    assert account.loads == 2
+
+  def test_marks_confirmed_and_owned_rows(self, tmp_path):
+    library = LibraryIndex(["Artist - Song 2 (Dirty).mp3"])
+    account = FakeListing(["Song {}".format(index) for index in range(8)], tmp_path, library=library, unconfirmed=["Song 1 (Dirty)"])
+    account.download_genre(self.URL, 2, incremental=True)
+
+    # The row clicked but never confirmed is crawled again next time
+    assert account.journal.high_water_mark(self.URL) == ["Artist - Song {}".format(index) for index in (0, 2, 3, 4, 5, 6, 7)]
+
+  def test_resumes_unfinished_crawl(self, tmp_path):
+    account = FakeListing(["Song {}".format(index) for index in range(12)], tmp_path)
+
+    # The last crawl was interrupted after two rows of page 2
+    account.journal.page(self.URL, 2)
+    account.journal.row(self.URL, "Artist - Song 4")
+    account.journal.row(self.URL, "Artist - Song 5")
+    account.download_genre(self.URL, 3, resume=True)
+    assert account.downloaded == ["Song {} (Dirty)".format(index) for index in range(6, 12)]
+    assert account.loads == 2
+    assert account.journal.checkpoint(self.URL) is None
+
+  def test_resumed_page_counts_as_known(self, tmp_path):
+    account = FakeListing(["Song {}".format(index) for index in range(12)], tmp_path)
+    account.journal.mark(self.URL, ["Artist - Song {}".format(index) for index in range(6, 12)])
+
+    # The rows of page 2 left are all known, so the crawl stops there
+    account.journal.page(self.URL, 2)
+    account.journal.row(self.URL, "Artist - Song 4")
+    account.journal.row(self.URL, "Artist - Song 5")
+    account.download_genre(self.URL, 3, resume=True, incremental=True)
+    assert account.downloaded == []
+    assert account.loads == 1
+
+class TestDownloadQueue():
+  """
+  Class for testing which downloads are queued to the download pipeline
+  """
+
+  def test_clicks_inline(self, tmp_path, monkeypatch):
+    http_downloader = HttpDownloader(str(tmp_path))
+    account = BpmSupreme(FakeDriver(), "user@example.com", "password", str(tmp_path), library=LibraryIndex(),
+      http_downloader=http_downloader, download_workers=2, rate_limiter=RateLimiter(rate=1000, burst=1000))
+
+    fetched = []
+    monkeypatch.setattr(account, "fetch", lambda song, block=False: fetched.append((song.name, threading.current_thread(), block)) or True)
+    row = {"name": "Song", "artists": ["Artist"], "versions": {"Dirty": "1-0-0", "Clean": "1-0-1"}, "urls": {"Dirty": "http://127.0.0.1/a.mp3", "Clean": None}}
+    for version in ("Dirty", "Clean"):
+      assert account.download(Song.from_row(account.driver, row, version))
+
+    # Songs without a download URL are clicked on the crawler's thread
+    pipeline = account.pipeline
+    assert ("Song (Clean)", threading.current_thread(), False) in fetched
+
+    # The pipeline streams the others and is stopped once the crawl is finished
+    account.finish_crawl()
+    http_downloader.close()
+    assert sorted(name for name, thread, block in fetched if thread is not threading.current_thread() and block) == ["Song (Dirty)"]
+    assert account.pipeline is None
+    assert not any(thread.is_alive() for thread in pipeline._threads)
+
+class TestPlan():
+  """
+  Class for testing that plan() only plans and execute() downloads what
+  was planned
+  """
+
+  @pytest.fixture
+  def site(self):
+    """
+    Provides a running FakeSite of three pages of four rows
+    """
+    with FakeSite(rows_per_page=4, pages=3, asset_latency=0) as site:
+      yield site
+
+  @pytest.fixture
+  def account(self, site, tmp_path):
+    """
+    Provides an account crawling site with FakeDriver
+    """
+    return site.configure(BpmSupreme(FakeDriver(), "user@example.com", "password", str(tmp_path), library=LibraryIndex(),
+      rate_limiter=RateLimiter(rate=1000, burst=1000)))
+
+  @staticmethod
+  def planned(plan):
+    """
+    Returns the sorted "Artists - Track name (version)" of every planned download
+    """
+    return sorted("{} ({})".format(entry["key"], version) for entry in plan.entries for version in entry["versions"])
+
+  def test_plan_never_downloads(self, account, site, monkeypatch):
+    def refuse(*args, **kwargs):
+      raise AssertionError("plan() started a download")
+    monkeypatch.setattr(Song, "download_song", refuse)
+    monkeypatch.setattr(account, "fetch", refuse)
+
+    plan = account.plan(site.genre_url(), 3)
+    assert account.driver.pages == [site.genre_url()] + [site.genre_url() + "?page={}".format(page) for page in (2, 3)]
+    assert [page for page_url, page in plan.pages()] == [1, 2, 3]
+    assert sorted(entry["key"] for entry in plan.entries) == sorted("{} - {}".format(artist, title)
+      for page in (1, 2, 3) for row_id, artist, title, versions in site.rows(page))
+    assert plan.downloads > len(plan)
+
+  def test_execute_downloads_planned_versions(self, account, site, monkeypatch):
+    plan = account.plan(site.genre_url(), 2)
+    fetched = []
+    monkeypatch.setattr(account, "fetch", lambda song, block=False: fetched.append("{} - {}".format(song.artist, song.name)) or True)
+
+    # New releases push the last two rows of every page to the next one
+    site.new_releases = 2
+    del account.driver.pages[:]
+    downloads = account.execute(plan)
+
+    assert sorted(fetched) == self.planned(plan)
+    assert all(result for song, result in downloads)
+
+    # The rows pushed off page 2 are looked for on page 3
+    assert account.driver.pages == [account.page_url(site.genre_url(), page) for page in (1, 2, 3)]
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+class TestPageScripts():
+  """
+  Class for testing crawls of FakeSite pages that run the real page
+  scripts under NodeDriver
+  """
+
+  def test_download_page(self, tmp_path):
+    http_downloader = HttpDownloader(str(tmp_path))
+    driver = NodeDriver()
+    with FakeSite(rows_per_page=4, pages=2, asset_latency=0) as site:
+      account = site.configure(BpmSupreme(driver, "user@example.com", "password", str(tmp_path), library=LibraryIndex(),
+        http_downloader=http_downloader, rate_limiter=RateLimiter(rate=1000, burst=1000)))
+      downloads = account.download_page(site.genre_url(), 2)
+      http_downloader.close()
+    driver.quit()
+
+    # The rows of page 2 are extracted by the page script and every picked version is streamed
+    assert {song.row_key for song, result in downloads} == {"{} - {}".format(artist, title) for row_id, artist, title, versions in site.rows(2)}
+    assert all(result for song, result in downloads)
+    assert sorted(os.listdir(str(tmp_path))) == sorted(song.filename() for song, result in downloads)
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+class TestDownloadLimit():
+  """
+  Class for testing that "Download Limit" popups fail their click and
+  slow the rate limiter down
+  """
+  ROW = """
+    <div class="row-container"><div class="row-item">
+      <div class="row-track-name"><span>{0}</span></div>
+      <div class="row-artist"><a class="link">Artist</a></div>
+      <a class="tag-link">Dirty</a>
+    </div></div>"""
+
+  @staticmethod
+  def limit(driver, index, delay=None):
+    """
+    Makes the download button of row index raise the limit popup of the
+    site when clicked, after delay seconds if given
+    """
+    driver.run("""
+      var raise = function() {
+        var popup = el('div', {'class': 'popup'}, [el('div', {'class': 'popup_inner'}, [el('div', {'class': 'title'}, ['Download Limit']), el('div', {'class': 'close'})])]);
+        popup.querySelector('.close').onclick = function() { popup.remove(); };
+        document.body.appendChild(popup);
+      };
+      document.querySelectorAll('.tag-link')[%d].onclick = %s;
+    """ % (index, "raise" if delay is None else "function() { setTimeout(raise, %d); }" % (delay * 1000)))
+
+  @pytest.fixture
+  def account(self, tmp_path, monkeypatch):
+    """
+    Provides an account on a page of two rows, whose rate limiter
+    records every limit
+    """
+    driver = NodeDriver()
+    driver.load('<div class="table-media">{}{}</div>'.format(self.ROW.format("First"), self.ROW.format("Second")))
+    account = BpmSupreme(driver, "user@example.com", "password", str(tmp_path), library=LibraryIndex(), rate_limiter=RateLimiter(rate=1000, burst=1000))
+    account.limits = []
+    monkeypatch.setattr(account.rate_limiter, "on_limit", lambda: account.limits.append(True))
+    account.load_page()
+    yield account
+    driver.quit()
+
+  def test_limit_popup_fails_click(self, account):
+    rows = account.extract_page()
+    self.limit(account.driver, 0)
+    song = Song.from_row(account.driver, rows[0], "Dirty")
+
+    assert not account.download(song)
+    assert song.rate_limited
+    assert account.limits == [True]
+    assert account.events.count(".popup") == 0
+
+    # The claim on the song is released so it can be downloaded again
+    assert account.local_library.claim_song(song)
+
+  def test_late_popup_only_limits(self, account):
+    rows = account.extract_page()
+    self.limit(account.driver, 0, delay=0.05)
+
+    # The popup of the first click arrives after it returned
+    first = Song.from_row(account.driver, rows[0], "Dirty")
+    assert account.download(first)
+    assert not first.rate_limited
+    time.sleep(0.2)
+
+    # It is picked up by the next click, which still succeeds
+    second = Song.from_row(account.driver, rows[1], "Dirty")
+    assert account.download(second)
+    assert second.rate_limited
+    assert account.limits == [True]
+
+class TestRequeueExpired():
+  """
+  Class for testing that clicked downloads which never land are re-queued
+  """
+
+  def test_requeues_by_row_key(self, tmp_path, monkeypatch):
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    with FakeSite(rows_per_page=2, pages=2, asset_latency=0) as site, DownloadWatcher(str(downloads), deadline=0.2, poll_interval=0.05) as watcher:
+      account = site.configure(BpmSupreme(FakeDriver(), "user@example.com", "password", str(downloads),
+        download_watcher=watcher, rate_limiter=RateLimiter(rate=1000, burst=1000)))
+
+      # Clicks are recorded and never land
+      clicked = []
+      songs = []
+      def fetch(song, block=False):
+        clicked.append((song.page_url, song.name, song.button_id))
+        songs.append(song)
+        watcher.expect(song)
+        return True
+      monkeypatch.setattr(account, "fetch", fetch)
+
+      first_page, second_page = account.page_url(site.genre_url(), 1), account.page_url(site.genre_url(), 2)
+      account.download_page(site.genre_url(), 1)
+      account.download_page(site.genre_url(), 2)
+      first_clicks = list(clicked)
+      time.sleep(0.5)
+
+      # Mid-crawl only the songs of the current page are re-extracted
+      del clicked[:]
+      assert account.requeue_expired() == len([click for click in first_clicks if click[0] == second_page])
+      assert {click[0] for click in clicked} == {second_page}
+
+      # The rest once the crawl is finished, each with a fresh button id
+      del clicked[:]
+      account.requeue_expired(wait=True)
+      assert sorted(click[1] for click in clicked) == sorted(click[1] for click in first_clicks if click[0] == first_page)
+      assert not {click[2] for click in clicked} & {click[2] for click in first_clicks}
+
+      # Songs that expire again are given up on and released
+      del clicked[:]
+      assert account.requeue_expired(wait=True) == 0
+      assert clicked == []
+      assert all(account.local_library.claim_song(song) for song in songs[:len(first_clicks)])
+
 class TestBpmSupreme():
   """
   Class for testing BpmSupreme() methods
@@ -0,0 +1,57 @@
+"""
+This test file determines if BrowserProfile class methods are working correctly
+"""
+
+from urllib.parse import unquote
+
+import pytest
+
+from src.bpm_supreme.classes.BrowserProfile import BrowserProfile
+
+class TestBrowserProfile():
+  """
+  Class for testing BrowserProfile() methods
+  """
+
+  def test_default(self, tmp_path):
+    profile = BrowserProfile.default(str(tmp_path))
+    assert profile.default_preferences["browser.download.dir"] == str(tmp_path)
+    assert "permissions.default.image" not in profile.default_preferences
+
+    with pytest.raises(TypeError):
+      BrowserProfile.default(None)
+
+  def test_lean(self, tmp_path):
+    cache_path = str(tmp_path / "cache")
+    profile = BrowserProfile.lean(str(tmp_path), cache_path)
+
+    # Download preferences are kept
+    assert profile.default_preferences["browser.download.dir"] == str(tmp_path)
+    assert profile.default_preferences["browser.download.folderList"] == 2
+
+    assert profile.default_preferences["permissions.default.image"] == 2
+    assert profile.default_preferences["gfx.downloadable_fonts.enabled"] is False
+    assert profile.default_preferences["browser.cache.disk.parent_directory"] == cache_path
+    assert BrowserProfile.options().headless
+
+  def test_lean_chains_upstream_proxy(self, tmp_path, monkeypatch):
+    monkeypatch.setenv("https_proxy", "http://proxy.example.com:3128")
+    monkeypatch.setenv("no_proxy", "localhost,.internal")
+    monkeypatch.delenv("HTTPS_PROXY", raising=False)
+    monkeypatch.delenv("NO_PROXY", raising=False)
+    pac = unquote(BrowserProfile.lean(str(tmp_path), None).default_preferences["network.proxy.autoconfig_url"])
+    assert "return 'PROXY 127.0.0.1:9'" in pac
+    assert "dnsDomainIs(host, '.internal')) return 'DIRECT'" in pac
+    assert pac.endswith("return 'PROXY proxy.example.com:3128'; }")
+
+    # Without tracker domains the proxy settings are left alone
+    profile = BrowserProfile.lean(str(tmp_path), None, tracker_domains=())
+    assert "network.proxy.type" not in profile.default_preferences
+    assert profile.default_preferences["privacy.trackingprotection.enabled"] is True
+
+  def test_blocking_pac(self):
+    pac = unquote(BrowserProfile.blocking_pac(["google-analytics.com", "hotjar.com"]))
+    assert pac.startswith("data:application/x-ns-proxy-autoconfig,function FindProxyForURL")
+    assert "dnsDomainIs(host, '.google-analytics.com')" in pac
+    assert "host == 'hotjar.com'" in pac
+    assert pac.endswith("return 'DIRECT'; }")
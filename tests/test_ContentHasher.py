@@ -0,0 +1,135 @@
+"""
+This test file determines if ContentHasher class methods are working correctly
+"""
+
+import os
+
+import pytest
+
+from src.bpm_supreme.classes.ContentHasher import ContentHasher
+
+AUDIO = bytes(range(256)) * 64
+
+def id3v2(text, footer=False):
+  """
+  Returns an ID3v2 tag whose body is text
+  """
+  body = text.encode()
+  size = len(body)
+  header = b"ID3\x04\x00" + bytes([0x10 if footer else 0]) + bytes([(size >> 21) & 0x7f, (size >> 14) & 0x7f, (size >> 7) & 0x7f, size & 0x7f])
+  return header + body + (b"3DI" + header[3:] if footer else b"")
+
+def id3v1(title):
+  """
+  Returns an ID3v1 tag with title
+  """
+  return b"TAG" + title.encode().ljust(125, b"\x00")
+
+@pytest.fixture
+def library(tmp_path):
+  """
+  Provides two library roots holding the same audio under different
+  names and tags
+  """
+  downloads = tmp_path / "downloads"
+  music = tmp_path / "music" / "hip-hop"
+  downloads.mkdir()
+  music.mkdir(parents=True)
+  (downloads / "Drake - Nice For What (Dirty).mp3").write_bytes(id3v2("Nice For What") + AUDIO + id3v1("Nice For What"))
+  (music / "nice_for_what.mp3").write_bytes(id3v2("Nice For What (Dirty)", footer=True) + AUDIO)
+  (music / "Nice For What copy.mp3").write_bytes(id3v2("Nice For What") + AUDIO + id3v1("Nice For What"))
+  (music / "Drake - God's Plan (Clean).mp3").write_bytes(AUDIO[::-1])
+  (music / "cover.jpg").write_bytes(AUDIO)
+  (music / "Nice For What.flac").write_bytes(id3v2("Nice For What") + AUDIO)
+  return [str(downloads), str(tmp_path / "music")]
+
+@pytest.fixture
+def hasher(tmp_path):
+  """
+  Provides a ContentHasher with an empty cache
+  """
+  with ContentHasher(str(tmp_path / "hashes.sqlite"), workers=2) as hasher:
+    yield hasher
+
+class TestContentHasher():
+  """
+  Class for testing ContentHasher() methods
+  """
+
+  def test_payload(self):
+    tagged = id3v2("title") + AUDIO + id3v1("title")
+    assert ContentHasher.payload(tagged) == (len(id3v2("title")), len(tagged) - 128)
+    assert ContentHasher.payload(id3v2("title", footer=True) + AUDIO) == (len(id3v2("title", footer=True)), len(id3v2("title", footer=True)) + len(AUDIO))
+    assert ContentHasher.payload(AUDIO) == (0, len(AUDIO))
+    assert ContentHasher.payload(b"") == (0, 0)
+
+  def test_hash_file(self, library):
+    path = os.path.join(library[0], "Drake - Nice For What (Dirty).mp3")
+    result = ContentHasher.hash_file(path)
+    assert result[0] == path
+    assert result[1] == os.path.getsize(path)
+    assert result[4] == len(AUDIO)
+
+    # Only MP3 files leave their ID3 tags out
+    path = os.path.join(library[1], "hip-hop", "Nice For What.flac")
+    assert ContentHasher.hash_file(path)[4] == os.path.getsize(path)
+
+  def test_duplicates(self, library, hasher):
+    hashes = hasher.hash_files(library)
+    assert len(hashes) == 5
+    assert hasher.hashed == 5
+    assert [[os.path.basename(path) for path in group] for group in hasher.duplicates()] == [
+      ["Drake - Nice For What (Dirty).mp3", "Nice For What copy.mp3", "nice_for_what.mp3"],
+    ]
+
+  def test_cache(self, library, tmp_path):
+    cache = str(tmp_path / "hashes.sqlite")
+    path = os.path.join(library[0], "Drake - Nice For What (Dirty).mp3")
+    for root, directories, files in os.walk(str(tmp_path)):
+      for name in files:
+        os.utime(os.path.join(root, name), ns=(10**18, 10**18))
+
+    with ContentHasher(cache) as hasher:
+      first = hasher.hash_files(library)
+
+    # Unchanged files are not hashed again, modified ones are
+    with open(path, "ab") as audio:
+      audio.write(b"\x00")
+    os.utime(path, ns=(10**18, 10**18 + 1))
+    with ContentHasher(cache) as hasher:
+      second = hasher.hash_files(library)
+      assert (hasher.reused, hasher.hashed) == (4, 1)
+      assert second[path] != first[path]
+
+  def test_link_duplicates(self, library, hasher):
+    hasher.hash_files(library)
+    assert len(hasher.link_duplicates(dry_run=True)) == 1
+    assert hasher.linked == 1
+
+    linked = hasher.link_duplicates()
+    kept, path = linked[0]
+    assert os.path.samefile(kept, path)
+    # Copies with different tags are kept
+    assert not os.path.samefile(kept, os.path.join(library[1], "hip-hop", "nice_for_what.mp3"))
+    assert hasher.link_duplicates() == []
+
+  def test_link_replaces_stale_link(self, library, hasher):
+    hasher.hash_files(library)
+    kept, path = hasher.link_duplicates(dry_run=True)[0]
+    with open(path + ".link", "wb") as stale:
+      stale.write(b"interrupted")
+
+    hasher.link_duplicates()
+    assert os.path.samefile(kept, path)
+    assert not os.path.exists(path + ".link")
+
+  def test_report(self, library, hasher):
+    hasher.hash_files(library)
+    assert "5 hashed" in hasher.report()
+    assert "per core" in hasher.report()
+
+  def test_bad_arguments(self, tmp_path):
+    with pytest.raises(TypeError):
+      ContentHasher(None)
+    with pytest.raises(ValueError):
+      ContentHasher(str(tmp_path / "hashes.sqlite"), workers=0)
@@ -0,0 +1,127 @@
+"""
+This test file determines if CrawlJournal class methods are working correctly
+"""
+
+import pytest
+
+from src.bpm_supreme.classes.CrawlJournal import CrawlJournal
+
+URL = "https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b"
+
+@pytest.fixture
+def journal_path(tmp_path):
+  """
+  Provides the path of a journal file that does not exist yet
+  """
+  return str(tmp_path / "journal.jsonl")
+
+class TestCrawlJournal():
+  """
+  Class for testing CrawlJournal() methods
+  """
+
+  def test_checkpoint(self, journal_path):
+    with CrawlJournal(journal_path) as journal:
+      assert journal.checkpoint(URL) is None
+
+      journal.page(URL, 1)
+      journal.row(URL, "Drake - Nice For What")
+      journal.page(URL, 2)
+      journal.row(URL, "Drake - God's Plan")
+      journal.download("Drake - God's Plan", "God's Plan (Dirty)", True)
+
+      assert journal.checkpoint(URL) == {"page": 2, "rows": {"Drake - God's Plan"}}
+
+  def test_replay(self, journal_path):
+    with CrawlJournal(journal_path) as journal:
+      journal.page(URL, 3)
+      journal.row(URL, "Drake - Nice For What")
+      journal.download("Drake - Nice For What", "Nice For What (Intro Dirty)", False)
+
+    with CrawlJournal(journal_path) as journal:
+      assert journal.checkpoint(URL) == {"page": 3, "rows": {"Drake - Nice For What"}}
+      assert journal.downloads == {("Drake - Nice For What", "Nice For What (Intro Dirty)"): False}
+
+      # Revisiting the same page keeps its finished rows
+      journal.page(URL, 3)
+      assert journal.checkpoint(URL)["rows"] == {"Drake - Nice For What"}
+
+  def test_done(self, journal_path):
+    with CrawlJournal(journal_path) as journal:
+      journal.page(URL, 1)
+      journal.done(URL)
+      assert journal.checkpoint(URL) is None
+
+    with CrawlJournal(journal_path) as journal:
+      assert journal.checkpoint(URL) is None
+
+  def test_high_water_mark(self, journal_path):
+    with CrawlJournal(journal_path) as journal:
+      assert journal.high_water_mark(URL) == []
+      journal.mark(URL, ["Artist - Song {}".format(i) for i in range(CrawlJournal.MARK_SIZE + 5)])
+      journal.done(URL)
+
+    with CrawlJournal(journal_path) as journal:
+      mark = journal.high_water_mark(URL)
+      assert len(mark) == CrawlJournal.MARK_SIZE
+      assert mark[0] == "Artist - Song 0"
+
+  def test_compaction(self, journal_path):
+    with CrawlJournal(journal_path) as journal:
+      for crawl in range(3):
+        journal.page(URL, 1)
+        for i in range(10):
+          journal.row(URL, "Artist - Song {}".format(i))
+        journal.download("Artist - Song 0", "Song 0 (Dirty)", True)
+        journal.mark(URL, ["Artist - Song {}".format(crawl)])
+        journal.done(URL)
+      assert journal.compactions == 3
+
+      journal.page(URL, 2)
+      journal.row(URL, "Artist - Song 10")
+
+    # Finished crawls and superseded marks are dropped
+    with open(journal_path) as journal_file:
+      assert len(journal_file.readlines()) == 4
+
+    with CrawlJournal(journal_path) as journal:
+      assert journal.compactions == 0
+      assert journal.checkpoint(URL) == {"page": 2, "rows": {"Artist - Song 10"}}
+      assert journal.high_water_mark(URL) == ["Artist - Song 2"]
+      assert journal.downloads == {("Artist - Song 0", "Song 0 (Dirty)"): True}
+
+      # Records superseded since the last compaction are dropped on open
+      journal.page(URL, 3)
+
+    with CrawlJournal(journal_path) as journal:
+      assert journal.compactions == 1
+      assert journal.checkpoint(URL) == {"page": 3, "rows": set()}
+
+  def test_truncated_record(self, journal_path):
+    with CrawlJournal(journal_path) as journal:
+      journal.page(URL, 2)
+      journal.row(URL, "Drake - Nice For What")
+
+    # Simulate a crash in the middle of writing a record
+    with open(journal_path, "a") as journal_file:
+      journal_file.write('{"type":"row","url":')
+
+    with CrawlJournal(journal_path) as journal:
+      assert journal.checkpoint(URL) == {"page": 2, "rows": {"Drake - Nice For What"}}
+      journal.row(URL, "Drake - God's Plan")
+
+    with CrawlJournal(journal_path) as journal:
+      assert journal.checkpoint(URL)["rows"] == {"Drake - Nice For What", "Drake - God's Plan"}
+
+  def test_batched_syncs(self, journal_path):
+    with CrawlJournal(journal_path, sync_every=10) as journal:
+      for i in range(25):
+        journal.row(URL, "Artist - Song {}".format(i))
+      assert journal.syncs == 2
+
+      journal.page(URL, 1)
+      assert journal.syncs == 3
+
+  def test_type(self):
+    with pytest.raises(TypeError):
+      CrawlJournal(None)
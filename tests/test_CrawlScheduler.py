@@ -0,0 +1,202 @@
+"""
+This test file determines if CrawlScheduler class methods are working correctly
+"""
+
+import json
+from urllib.parse import parse_qsl
+from urllib.parse import urlsplit
+
+import pytest
+
+from src.bpm_supreme.classes.BpmSupreme import BpmSupreme
+from src.bpm_supreme.classes.CrawlScheduler import CrawlScheduler
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+from src.bpm_supreme.classes.VersionPolicy import VersionPolicy
+
+APP_URL = "https://app.bpmsupreme.com/new-releases/audio/"
+
+class FakeAccount(BpmSupreme):
+  """
+  Stand-in for a logged in account crawling in-memory listings, where
+  every page holds rows_per_page songs with a single "Dirty" version.
+  Songs named in fail are queued and fail when the crawl is finished,
+  those in steal are claimed by another account just before download.
+  """
+
+  def __init__(self, pages, rows_per_page=2, library=None, fail=(), steal=()):
+    self.driver = None
+    self.genre = None
+    self.pages = pages
+    self.rows_per_page = rows_per_page
+    self.local_library = library if library is not None else LibraryIndex()
+    self.policies = {"genre": VersionPolicy([(("Dirty",), VersionPolicy.ANY)])}
+    self.loaded = []
+    self.downloaded = []
+    self.finished = 0
+    self.fail = set(fail)
+    self.steal = set(steal)
+    self.failing = []
+    self.failure_listeners = []
+    self._url = None
+
+  def load_page(self, url=None, selector=".row-container"):
+    self._url = url
+    self.loaded.append(url)
+
+  def extract_page(self):
+    parts = urlsplit(self._url)
+    genre = parts.path.rsplit("/", 1)[-1]
+    page = int(dict(parse_qsl(parts.query)).get(self.PAGE_PARAMETER, 1))
+    if page > self.pages.get(genre, 0):
+      return []
+    return [{"name": "{} {}.{}".format(genre, page, row), "artists": ["Artist"], "versions": {"Dirty": "id"}, "urls": {}}
+      for row in range(self.rows_per_page)]
+
+  def download(self, song):
+    if song.name in self.steal:
+      self.local_library.claim_song(song)
+    if not self.local_library.claim_song(song):
+      return False
+    if song.name in self.fail:
+      self.failing.append(song)
+      return True
+    self.downloaded.append(song.name)
+    return True
+
+  def finish_crawl(self):
+    self.finished += 1
+    for song in self.failing:
+      self.local_library.discard_song(song)
+      for listener in self.failure_listeners:
+        listener(song)
+    self.failing = []
+
+def genre_of(name):
+  """
+  Returns the genre of a downloaded song name, e.g. "pop" of "pop 1.0 (Dirty)"
+  """
+  return name.split(" ")[0]
+
+class TestCrawlScheduler():
+  """
+  Class for testing CrawlScheduler() methods
+  """
+
+  def test_type(self):
+    with pytest.raises(TypeError):
+      CrawlScheduler("account")
+
+    with pytest.raises(ValueError):
+      CrawlScheduler([])
+
+    scheduler = CrawlScheduler(FakeAccount({}))
+    with pytest.raises(ValueError):
+      scheduler.add(APP_URL + "pop", 0)
+
+    with pytest.raises(ValueError):
+      scheduler.add(APP_URL + "pop", 1, priority=0)
+
+    with pytest.raises(ValueError):
+      scheduler.add(APP_URL + "pop", 1, policy="missing")
+
+  def test_interleaves_by_priority(self):
+    account = FakeAccount({"pop": 4, "rock": 4})
+    scheduler = CrawlScheduler(account, quota=100)
+    scheduler.add(APP_URL + "pop", 4, priority=2)
+    scheduler.add(APP_URL + "rock", 4, priority=1)
+    scheduler.run()
+
+    genres = [urlsplit(url).path.rsplit("/", 1)[-1] for url in account.loaded]
+    assert genres[:6] == ["pop", "rock", "pop", "pop", "rock", "pop"]
+    assert len(account.downloaded) == 16
+    assert account.finished == 1
+
+  def test_shares_quota_by_priority(self):
+    account = FakeAccount({"pop": 10, "rock": 10})
+    scheduler = CrawlScheduler(account, quota=9)
+    pop = scheduler.add(APP_URL + "pop", 10, priority=2)
+    rock = scheduler.add(APP_URL + "rock", 10, priority=1)
+    scheduler.run()
+
+    downloaded = [genre_of(name) for name in account.downloaded]
+    assert downloaded.count("pop") == 6
+    assert downloaded.count("rock") == 3
+    assert pop["used"] == 6 and rock["used"] == 3
+    assert scheduler.remaining() == 0
+    assert "pop: priority 2" in scheduler.report()
+
+  def test_gives_unused_quota_to_running_jobs(self):
+    account = FakeAccount({"pop": 10, "rock": 1})
+    scheduler = CrawlScheduler(account, quota=12)
+    scheduler.add(APP_URL + "pop", 10, priority=1)
+    rock = scheduler.add(APP_URL + "rock", 10, priority=1)
+    scheduler.run()
+
+    downloaded = [genre_of(name) for name in account.downloaded]
+    assert rock["finished"] and rock["used"] == 2
+    assert downloaded.count("pop") == 10
+
+  def test_rounds_quota_by_largest_remainder(self):
+    scheduler = CrawlScheduler(FakeAccount({}), quota=1)
+    jobs = [scheduler.add(APP_URL + genre, 1, priority=priority) for genre, priority in (("pop", 1), ("rock", 1), ("jazz", 2))]
+    assert [scheduler.entitlement(job) for job in jobs] == [0, 0, 1]
+
+    # A quota smaller than the number of jobs is still used up
+    account = FakeAccount({"pop": 2, "rock": 2, "jazz": 2})
+    scheduler = CrawlScheduler(account, quota=2)
+    for genre in ("pop", "rock", "jazz"):
+      scheduler.add(APP_URL + genre, 2)
+    scheduler.run()
+
+    assert len(account.downloaded) == 2
+    assert scheduler.remaining() == 0
+
+  def test_releases_late_failures(self):
+    account = FakeAccount({"pop": 1}, fail=["pop 1.0 (Dirty)"])
+    scheduler = CrawlScheduler(account, quota=10)
+    job = scheduler.add(APP_URL + "pop", 1)
+    scheduler.run()
+
+    assert job["used"] == 1 and job["failed"] == 1
+    assert scheduler.remaining() == 9
+    assert account.failure_listeners == []
+
+  def test_counts_claim_races(self):
+    account = FakeAccount({"pop": 1}, steal=["pop 1.1 (Dirty)"])
+    scheduler = CrawlScheduler(account, quota=10)
+    job = scheduler.add(APP_URL + "pop", 1)
+    scheduler.run()
+
+    assert job["used"] == 1 and job["races"] == 1 and job["failed"] == 0
+    assert "1 claimed by another worker" in scheduler.report()
+
+  def test_duplicates_cost_no_quota(self):
+    library = LibraryIndex(["Artist - pop 1.0 (Dirty).mp3", "Artist - pop 1.1 (Dirty).mp3"])
+    account = FakeAccount({"pop": 2}, library=library)
+    scheduler = CrawlScheduler(account, quota=2)
+    job = scheduler.add(APP_URL + "pop", 2)
+    scheduler.run()
+
+    assert job["duplicates"] == 2
+    assert account.downloaded == ["pop 2.0 (Dirty)", "pop 2.1 (Dirty)"]
+
+  def test_persists_daily_usage(self, tmp_path):
+    state_path = str(tmp_path / "quota.json")
+    scheduler = CrawlScheduler(FakeAccount({"pop": 1}), quota=10, state_path=state_path)
+    scheduler.add(APP_URL + "pop", 1)
+    scheduler.run()
+
+    with open(state_path) as state:
+      assert json.load(state) == {"date": CrawlScheduler.today(), "used": 2}
+    assert CrawlScheduler(FakeAccount({}), quota=10, state_path=state_path).remaining() == 8
+
+  def test_parallel_accounts(self):
+    library = LibraryIndex()
+    accounts = [FakeAccount({"pop": 6, "rock": 6}, library=library) for index in range(3)]
+    scheduler = CrawlScheduler(accounts, quota=100)
+    scheduler.add(APP_URL + "pop", 6)
+    scheduler.add(APP_URL + "rock", 6)
+    scheduler.run()
+
+    assert sum(len(account.downloaded) for account in accounts) == 24
+    assert all(job["finished"] and job["crawled"] == 6 for job in scheduler.jobs)
@@ -0,0 +1,72 @@
+"""
+This test file determines if DownloadPipeline class methods are working correctly
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.bpm_supreme.classes.DownloadPipeline import DownloadPipeline
+
+class TestDownloadPipeline():
+  """
+  Class for testing DownloadPipeline() methods
+  """
+
+  def test_constructor(self):
+    with pytest.raises(TypeError):
+      DownloadPipeline("stage")
+
+    with pytest.raises(ValueError):
+      DownloadPipeline(lambda job: True, workers=0)
+
+  def test_processes_every_job(self):
+    done = []
+    lock = threading.Lock()
+
+    def stage(job):
+      with lock:
+        done.append(job)
+      return job % 5 != 0
+
+    pipeline = DownloadPipeline(stage, workers=3)
+    for job in range(20):
+      pipeline.put(job)
+    pipeline.join()
+
+    stats = pipeline.stats()
+    assert sorted(done) == list(range(20))
+    assert stats["crawler"]["jobs"] == 20
+    assert stats["downloader"]["jobs"] == 20
+    assert stats["downloader"]["failed"] == 4
+    assert "jobs/sec" in pipeline.report()
+    pipeline.close()
+
+  def test_backpressure(self):
+    release = threading.Event()
+    pipeline = DownloadPipeline(lambda job: release.wait(), workers=1, queue_size=2)
+
+    # One job in flight and two queued; the fourth put() must block
+    for job in range(3):
+      pipeline.put(job)
+    blocked = threading.Thread(target=pipeline.put, args=(3,))
+    blocked.start()
+    time.sleep(0.1)
+    assert blocked.is_alive()
+    assert pipeline.produced == 3
+
+    release.set()
+    blocked.join()
+    pipeline.close()
+    assert pipeline.stats()["max_queue_depth"] <= 2
+    assert pipeline.stats()["crawler"]["blocked_time"] > 0
+
+  def test_stage_exceptions_count_as_failures(self):
+    def stage(job):
+      raise RuntimeError("boom")
+
+    pipeline = DownloadPipeline(stage)
+    pipeline.put(1)
+    pipeline.close()
+    assert pipeline.failed == 1
@@ -0,0 +1,65 @@
+"""
+This test file determines if DownloadPlan class methods are working correctly
+"""
+
+import pytest
+
+from src.bpm_supreme.classes.DownloadPlan import DownloadPlan
+
+URL = "https://app.bpmsupreme.com/new-releases/audio/hip-hop-r%26b"
+
+@pytest.fixture
+def plan():
+  """
+  Provides a plan of rows across two pages
+  """
+  plan = DownloadPlan()
+  plan.add(URL, 1, "Drake - Nice For What", ["Intro Dirty", "Quick Hit Dirty"], {"Intro Dirty": "https://example.com/1.mp3"})
+  plan.add(URL, 1, "Drake - God's Plan", ["Dirty"])
+  plan.add(URL, 2, "Cardi B - Money", ["Clean"])
+  return plan
+
+class TestDownloadPlan():
+  """
+  Class for testing DownloadPlan() methods
+  """
+
+  def test_add(self, plan):
+    assert len(plan) == 3
+    assert plan.downloads == 4
+    assert plan.contains("Drake - God's Plan")
+    assert plan.entries[0]["urls"] == {"Intro Dirty": "https://example.com/1.mp3"}
+    assert "urls" not in plan.entries[1]
+
+  def test_add_skips(self, plan):
+    # Rows already planned, e.g. listed on two pages, and rows without versions
+    assert not plan.add(URL, 2, "Drake - Nice For What", ["Dirty"])
+    assert not plan.add(URL, 2, "Future - Mask Off", [])
+    assert len(plan) == 3
+
+  def test_add_page(self, plan):
+    with pytest.raises(ValueError):
+      plan.add(URL, 0, "Future - Mask Off", ["Dirty"])
+
+  def test_pages(self, plan):
+    pages = plan.pages()
+    assert list(pages) == [(URL, 1), (URL, 2)]
+    assert [entry["key"] for entry in pages[(URL, 1)]] == ["Drake - Nice For What", "Drake - God's Plan"]
+
+  def test_split(self, plan):
+    first, second, third = plan.split(3)
+    assert [len(first), len(second), len(third)] == [2, 1, 0]
+    assert sum(part.downloads for part in (first, second, third)) == plan.downloads
+    assert list(first.pages()) == [(URL, 1)]
+
+  def test_save_load(self, plan, tmp_path):
+    path = str(tmp_path / "plan.jsonl")
+    plan.save(path)
+    loaded = DownloadPlan.load(path)
+    assert loaded.entries == plan.entries
+    assert loaded.contains("Cardi B - Money")
+    assert not (tmp_path / "plan.jsonl.tmp").exists()
+
+  def test_load_type(self):
+    with pytest.raises(TypeError):
+      DownloadPlan.load(None)
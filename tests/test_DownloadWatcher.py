@@ -0,0 +1,141 @@
+"""
+This test file determines if DownloadWatcher class methods are working correctly
+"""
+
+import os
+import struct
+import time
+import types
+
+import pytest
+
+from src.bpm_supreme.classes.DownloadWatcher import DownloadWatcher
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+
+# MPEG 1 Layer III frame header: 128 kbps, 44100 Hz, stereo
+FRAME_HEADER = b"\xff\xfb\x90\x00"
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def watcher(request, tmp_path):
+  """
+  Provides a DownloadWatcher on an empty directory, once with inotify and once polling
+  """
+  with open(tmp_path / "Existing - Song (Dirty).mp3", "wb") as existing:
+    existing.write(b"audio")
+
+  watcher = DownloadWatcher(str(tmp_path), LibraryIndex(), deadline=0.5, poll_interval=0.05, use_inotify=request.param)
+  yield watcher
+  watcher.close()
+
+def song(artist, name):
+  """
+  Returns a stand-in for a clicked Song
+  """
+  return types.SimpleNamespace(artist=artist, name=name)
+
+def browser_download(directory, name, data):
+  """
+  Saves a file the way Firefox does: an empty placeholder, a .part file
+  that is written, then renamed over the placeholder
+  """
+  path = os.path.join(directory, name)
+  open(path, "wb").close()
+  with open(path + ".part", "wb") as partial:
+    partial.write(data)
+  time.sleep(0.15)
+  os.replace(path + ".part", path)
+
+class TestDownloadWatcher():
+  """
+  Class for testing DownloadWatcher() methods
+  """
+
+  def test_confirms_download(self, watcher):
+    clicked = song("Drake", "Nice For What (Intro Dirty)")
+    watcher.expect(clicked)
+    browser_download(watcher.download_path, "Drake - Nice For What (Intro Dirty).mp3", FRAME_HEADER + bytes(15996))
+
+    assert watcher.wait(timeout=5) == []
+    assert len(watcher.completed) == 1
+
+    download = watcher.completed[0]
+    assert download["song"] is clicked
+    assert download["size"] == 16000
+    assert download["duration"] == pytest.approx(1.0)
+    assert watcher.library.contains("Drake", "Nice For What", "Intro Dirty")
+    assert not watcher.partials
+
+  def test_unexpected_download(self, watcher):
+    browser_download(watcher.download_path, "Cardi B - I Like It (Clean).mp3", b"audio")
+    deadline = time.monotonic() + 5
+    while not watcher.completed and time.monotonic() < deadline:
+      time.sleep(0.05)
+
+    assert watcher.completed[0]["song"] is None
+    assert "Cardi B - I Like It (Clean).mp3" in watcher.library
+
+    # Files present before the watcher started are not reported
+    assert len(watcher.completed) == 1
+
+  def test_expired(self, watcher):
+    missing = song("Drake", "God's Plan (Dirty)")
+    watcher.expect(missing)
+    assert watcher.wait(timeout=5) == [missing]
+    assert watcher.expired() == []
+    assert "pending" in watcher.report()
+
+  def test_assumes_unmatched_download(self, watcher):
+    clicked = song("Drake", "Nice For What (Intro Dirty)")
+    watcher.expect(clicked)
+    browser_download(watcher.download_path, "nice_for_what_intro_dirty_320.mp3", b"audio")
+
+    # The file is logged as unmatched, then given to the song at its deadline
+    assert watcher.wait(timeout=5) == []
+    assert watcher.completed[0]["song"] is clicked
+    assert watcher.unmatched == []
+
+  def test_idle(self, watcher):
+    missing = song("Drake", "God's Plan (Dirty)")
+    watcher.deadline = 60
+    watcher.expect(missing)
+
+    start = time.monotonic()
+    assert watcher.wait(idle=0.2) == [missing]
+    assert time.monotonic() - start < 5
+
+  def test_hands_download_to_organizer(self, watcher):
+    submitted = []
+    watcher.organizer = types.SimpleNamespace(submit=lambda path, song: submitted.append((path, song)))
+    clicked = song("Drake", "Nice For What (Intro Dirty)")
+    watcher.expect(clicked)
+    browser_download(watcher.download_path, "Drake - Nice For What (Intro Dirty).mp3", b"audio")
+
+    assert watcher.wait(timeout=5) == []
+    deadline = time.monotonic() + 1
+    while not submitted and time.monotonic() < deadline:
+      time.sleep(0.01)
+    assert submitted == [(os.path.join(watcher.download_path, "Drake - Nice For What (Intro Dirty).mp3"), clicked)]
+
+  def test_mp3_duration(self, tmp_path):
+    path = str(tmp_path / "song.mp3")
+
+    # ID3v2 tag followed by a constant bitrate stream
+    with open(path, "wb") as audio:
+      audio.write(b"ID3\x04\x00\x00\x00\x00\x00\x0a" + bytes(10) + FRAME_HEADER + bytes(159996))
+    assert DownloadWatcher.mp3_duration(path) == pytest.approx(10.0)
+
+    # Xing frame holding the frame count of a variable bitrate stream
+    with open(path, "wb") as audio:
+      audio.write(FRAME_HEADER + bytes(32) + b"Xing" + struct.pack(">II", 1, 100) + bytes(1000))
+    assert DownloadWatcher.mp3_duration(path) == pytest.approx(100 * 1152 / 44100)
+
+    with open(path, "wb") as audio:
+      audio.write(b"not audio")
+    assert DownloadWatcher.mp3_duration(path) is None
+
+  def test_type(self, tmp_path):
+    with pytest.raises(TypeError):
+      DownloadWatcher(None)
+
+    with pytest.raises(ValueError):
+      DownloadWatcher(str(tmp_path / "missing"))
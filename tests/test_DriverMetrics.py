@@ -0,0 +1,114 @@
+"""
+This test file determines if DriverMetrics class methods are working correctly
+"""
+
+import json
+import os
+
+import pytest
+
+from src.bpm_supreme.classes.DriverMetrics import DriverMetrics
+
+class FakeDriver:
+  """
+  Stands in for a WebDriver, recording the commands it is sent
+  """
+
+  def __init__(self):
+    self.sent = []
+
+  def execute(self, command, params=None):
+    self.sent.append(command)
+    if command == "fail":
+      raise RuntimeError(command)
+    return {"value": None}
+
+@pytest.fixture
+def driver():
+  """
+  Provides a fake driver instrumented by a fresh DriverMetrics
+  """
+  driver = FakeDriver()
+  DriverMetrics().instrument(driver)
+  return driver
+
+class TestDriverMetrics():
+  """
+  Class for testing DriverMetrics() methods
+  """
+
+  def test_commands_tagged_by_phase(self, driver):
+    driver.execute("get")
+    with DriverMetrics.phase_of(driver, "extract"):
+      driver.execute("executeScript")
+      driver.execute("executeScript")
+      with DriverMetrics.phase_of(driver, "click"):
+        driver.execute("clickElement")
+      driver.execute("getCookies")
+
+    metrics = DriverMetrics._drivers[driver]
+    assert driver.sent == ["get", "executeScript", "executeScript", "clickElement", "getCookies"]
+    assert {key: stats["count"] for key, stats in metrics.commands.items()} == {
+      ("other", "get"): 1,
+      ("extract", "executeScript"): 2,
+      ("click", "clickElement"): 1,
+      ("extract", "getCookies"): 1,
+    }
+    assert {phase: stats["count"] for phase, stats in metrics.phases.items()} == {"extract": 1, "click": 1}
+
+  def test_failed_commands_counted(self, driver):
+    with pytest.raises(RuntimeError):
+      driver.execute("fail")
+    assert DriverMetrics._drivers[driver].to_json()["total_commands"] == 1
+
+  def test_instrument_once(self, driver):
+    metrics = DriverMetrics._drivers[driver]
+    metrics.instrument(driver)
+    driver.execute("get")
+    assert metrics.commands[("other", "get")]["count"] == 1
+
+  def test_uninstrumented_driver(self):
+    driver = FakeDriver()
+    with DriverMetrics.phase_of(driver, "click"):
+      driver.execute("clickElement")
+    assert driver.sent == ["clickElement"]
+    assert driver not in DriverMetrics._drivers
+
+  def test_histogram_buckets(self):
+    metrics = DriverMetrics()
+    metrics.record(metrics.phases, "rate_limit", 0.0005)
+    metrics.record(metrics.phases, "rate_limit", 0.3)
+    metrics.record(metrics.phases, "rate_limit", 60.0)
+
+    histogram = metrics.to_json()["phases"][0]
+    assert histogram["count"] == 3
+    assert histogram["buckets"]["0.001"] == 1
+    assert histogram["buckets"]["0.25"] == 1
+    assert histogram["buckets"]["0.5"] == 2
+    assert histogram["buckets"]["10.0"] == 2
+    assert histogram["buckets"]["+Inf"] == 3
+
+  def test_prometheus(self, driver):
+    with DriverMetrics.phase_of(driver, "login"):
+      driver.execute("get")
+
+    text = DriverMetrics._drivers[driver].to_prometheus()
+    assert "# TYPE bpm_webdriver_command_seconds histogram" in text
+    assert 'bpm_webdriver_command_seconds_bucket{phase="login",command="get",le="+Inf"} 1' in text
+    assert 'bpm_webdriver_command_seconds_count{phase="login",command="get"} 1' in text
+    assert 'bpm_phase_seconds_count{phase="login"} 1' in text
+    assert 'bpm_phase_seconds_sum{phase="login"}' in text
+
+  def test_export(self, tmp_path):
+    metrics = DriverMetrics(str(tmp_path / "metrics.json"), str(tmp_path / "metrics.prom"))
+    driver = metrics.instrument(FakeDriver())
+    with metrics.phase("pagination"):
+      driver.execute("clickElement")
+    metrics.export()
+
+    with open(metrics.json_path) as exported:
+      assert json.load(exported)["commands"][0]["phase"] == "pagination"
+    with open(metrics.prometheus_path) as exported:
+      assert "bpm_phase_seconds_count" in exported.read()
+    assert sorted(os.listdir(tmp_path)) == ["metrics.json", "metrics.prom"]
+    assert "pagination" in metrics.report()
@@ -0,0 +1,108 @@
+"""
+This test file determines if the FakeSite stand-in serves the pages,
+APIs and downloads the crawler relies on
+"""
+
+import json
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+
+import pytest
+
+from src.bpm_supreme.classes.BpmSupreme import BpmSupreme
+from src.bpm_supreme.classes.PageEvents import PageEvents
+from tests.fake_site import FakeDriver
+from tests.fake_site import FakeSite
+from tests.node_driver import NODE
+from tests.node_driver import NodeDriver
+
+@pytest.fixture
+def site():
+  """
+  Provides a running FakeSite with a download limit of two
+  """
+  with FakeSite(rows_per_page=5, pages=2, history_rows=12, history_batch=5, asset_latency=0, download_limit=2) as site:
+    yield site
+
+@pytest.fixture
+def browser(site):
+  """
+  Provides a cookie aware opener logged into site
+  """
+  opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+  opener.open(site.url + "/login", urlencode({"email": "user@example.com", "password": "password"}).encode())
+  return opener
+
+class TestFakeSite():
+  """
+  Class for testing FakeSite() pages
+  """
+
+  def test_login(self, site, browser):
+    assert 'id="login-form-email"' in urllib.request.urlopen(site.url + "/").read().decode()
+    assert "account-menu-toggle" in browser.open(site.url + "/").read().decode()
+
+  def test_listing(self, site):
+    page = urllib.request.urlopen(site.genre_url() + "?page=1").read().decode()
+    assert page.count('class="row-item"') == 5
+    assert '<span>Hip Track 0</span>' in page
+    assert "&rsaquo;" in page
+
+    # The last page has no next page button
+    assert "&rsaquo;" not in urllib.request.urlopen(site.genre_url() + "?page=2").read().decode()
+
+    exclusives = urllib.request.urlopen(site.genre_url(FakeSite.EXCLUSIVES)).read().decode()
+    assert ">Dirty Short Edit</a>" in exclusives
+
+  def test_download_limit(self, site, browser):
+    song_id = "{}:Intro Dirty".format(site.rows(1)[0][0])
+    results = [json.loads(browser.open(site.url + "/api/download/" + urllib.parse.quote(song_id)).read()) for i in range(3)]
+    assert [result.get("limited", False) for result in results] == [False, False, True]
+    assert site.limited == 1
+
+    response = browser.open(site.url + results[0]["url"])
+    assert response.headers["Content-Disposition"] == 'attachment; filename="Artist 0 - Hip Track 0 (Intro Dirty).mp3"'
+    assert len(response.read()) == site.download_size
+
+    with pytest.raises(urllib.error.HTTPError):
+      urllib.request.urlopen(site.url + "/api/download/" + urllib.parse.quote(song_id))
+
+  def test_history(self, site, browser):
+    page = browser.open(site.url + "/account/download-history").read().decode()
+    assert page.count('class="row-item"') == 5
+    assert 'data-history="12"' in page
+
+    rows = browser.open(site.url + "/api/history?offset=10").read().decode()
+    assert rows.count('class="row-item"') == 2
+
+class TestFakeDriver():
+  """
+  Class for testing FakeDriver() answers
+  """
+
+  def test_answers_with_expected_shapes(self, site):
+    driver = FakeDriver()
+    driver.get(site.genre_url())
+    events = PageEvents(driver)
+
+    assert events.count(".row-item") == 5
+    assert events.scroll_to_end(".table-media .row-item") == {"count": 5, "rounds": 0}
+    assert events.click("[data-bpm-button=\"1-0-0\"]") == {"clicked": False, "click": 1, "popups": []}
+    assert events.close_popups() == 0
+
+  @pytest.mark.skipif(NODE is None, reason="node is not installed")
+  def test_extracts_like_page_script(self, site):
+    url = site.genre_url(FakeSite.EXCLUSIVES) + "?page=2"
+    fake = FakeDriver()
+    fake.get(url)
+    node = NodeDriver()
+    try:
+      node.get(url)
+      rows = node.execute_script(BpmSupreme.EXTRACT_PAGE_SCRIPT)
+    finally:
+      node.quit()
+
+    assert len(rows) == 5
+    assert fake.execute_script(BpmSupreme.EXTRACT_PAGE_SCRIPT) == rows
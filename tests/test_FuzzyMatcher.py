@@ -0,0 +1,93 @@
+"""
+This test file determines if FuzzyMatcher class methods are working correctly
+"""
+
+import random
+
+import pytest
+
+from src.bpm_supreme.classes.FuzzyMatcher import FuzzyMatcher
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+
+@pytest.fixture
+def library():
+  """
+  Provides a LibraryIndex with fuzzy matching enabled
+  """
+  return LibraryIndex([
+    "Drake - Nice For What (Intro Dirty).mp3",
+    "Drake - God's Plan (Clean).mp3",
+    "Cardi B, Bad Bunny - I Like It (feat. J Balvin) (Quick Hit Clean).mp3",
+    "Unnamed Song (Dirty).mp3",
+  ], fuzzy_threshold=FuzzyMatcher.THRESHOLD)
+
+class TestFuzzyMatcher():
+  """
+  Class for testing FuzzyMatcher() methods
+  """
+
+  def test_fold(self):
+    assert FuzzyMatcher.fold("god's plan!") == "gods plan"
+    assert FuzzyMatcher.fold("hot & wet (remix)") == "hot and wet remix"
+
+  def test_similarity(self):
+    assert FuzzyMatcher.similarity(FuzzyMatcher.trigrams("gods plan"), FuzzyMatcher.trigrams("god's plan")) == 1.0
+    assert FuzzyMatcher.similarity(FuzzyMatcher.trigrams("money"), FuzzyMatcher.trigrams("honey")) < FuzzyMatcher.THRESHOLD
+
+  def test_contains(self, library):
+    assert ("Drake", "Nice For Wht", "Intro Dirty") in library
+    assert ("Drake", "Gods Plan", "Clean") in library
+    assert ("Cardi B", "I Like It ft. J. Balvin", "Quick Hit Clean") in library
+    assert ("", "Unamed Song", "Dirty") in library
+
+  def test_contains_version(self, library):
+    # Versions must still be equal
+    assert ("Drake", "Nice For Wht", "Intro Clean") not in library
+    assert ("Drake", "Gods Plan", "Dirty") not in library
+
+  def test_contains_artists(self, library):
+    assert ("Drake.", "Nice For Wht", "Intro Dirty") in library
+    assert ("Future", "Nice For Wht", "Intro Dirty") not in library
+
+  def test_claim_and_discard(self, library):
+    assert not library.claim("Drake", "Gods Plan", "Clean")
+    assert library.claim("Future", "Mask Off", "Dirty")
+    assert ("Future", "Mask Of", "Dirty") in library
+    library.discard("Future", "Mask Off", "Dirty")
+    assert ("Future", "Mask Of", "Dirty") not in library
+
+  def test_enable_fuzzy(self):
+    library = LibraryIndex(["Drake - Nice For What (Intro Dirty).mp3"])
+    assert ("Drake", "Nice For Wht", "Intro Dirty") not in library
+    library.enable_fuzzy()
+    assert ("Drake", "Nice For Wht", "Intro Dirty") in library
+
+    with pytest.raises(ValueError):
+      LibraryIndex(fuzzy_threshold=0)
+
+  def test_match(self):
+    matcher = FuzzyMatcher(0.5)
+    matcher.add("money", "", frozenset(), "Money")
+    matcher.add("honey", "", frozenset(), "Honey")
+    assert matcher.match("money", "", frozenset(), limit=2) == [(1.0, "Money"), (0.5, "Honey")]
+    assert len(matcher) == 2
+
+  def test_near_duplicates(self, library):
+    library.add_file("Drake - Gods Plan (Clean).mp3")
+    library.add_file("Drake - Gods Plan (Dirty).mp3")
+    assert library.near_duplicates() == [(1.0, "Drake - God's Plan (Clean)", "Drake - Gods Plan (Clean)")]
+
+  def test_search_matches_scan(self):
+    # Looking up only the rarest trigrams finds the same matches as comparing against every entry
+    generator = random.Random(7)
+    words = ["love", "night", "money", "dance", "fire", "baby", "heart", "gold", "city", "dream"]
+    titles = {" ".join(generator.choice(words) for word in range(generator.randint(1, 4))) for title in range(300)}
+    matcher = FuzzyMatcher(0.7)
+    for title in titles:
+      matcher.add(title, "dirty", frozenset())
+
+    for query in list(titles)[:50]:
+      query = query[:-1]
+      grams = FuzzyMatcher.trigrams(query)
+      expected = {title for title in titles if FuzzyMatcher.similarity(grams, FuzzyMatcher.trigrams(title)) >= 0.7}
+      assert {name for score, name in matcher.match(query, "dirty", frozenset(), limit=len(titles))} == expected
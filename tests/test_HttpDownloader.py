@@ -0,0 +1,213 @@
+"""
+This test file determines if HttpDownloader class methods are working correctly
+against a local stand-in HTTP server serving fake mp3 payloads
+"""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src.bpm_supreme.classes.HttpDownloader import HttpDownloader
+
+# Fake mp3 payload: an ID3 header followed by filler frames
+PAYLOAD = b"ID3\x04\x00\x00\x00\x00\x00\x00" + bytes(range(256)) * 1024
+
+class FakeMp3Handler(BaseHTTPRequestHandler):
+  """
+  Serves PAYLOAD at /song.mp3 with Range and If-Range support, behind a
+  session cookie, an HTML page at /login and at /misaligned.mp3 ranges
+  that always start at the first byte
+  """
+  protocol_version = "HTTP/1.1"
+  requests = []
+  etag = '"v1"'
+
+  def do_GET(self):
+    FakeMp3Handler.requests.append((self.path, dict(self.headers)))
+
+    if self.path == "/login":
+      self.send_response(200)
+      self.send_header("Content-Type", "text/html; charset=utf-8")
+      self.send_header("Content-Length", "13")
+      self.end_headers()
+      self.wfile.write(b"<html></html>")
+      return
+
+    if self.path == "/redirect":
+      self.send_response(302)
+      self.send_header("Location", "/song.mp3")
+      self.send_header("Content-Length", "0")
+      self.end_headers()
+      return
+
+    if "session=secret" not in self.headers.get("Cookie", ""):
+      self.send_response(403)
+      self.send_header("Content-Length", "0")
+      self.end_headers()
+      return
+
+    start = 0
+    if self.headers.get("Range") and self.headers.get("If-Range", FakeMp3Handler.etag) == FakeMp3Handler.etag:
+      start = int(self.headers["Range"].split("=")[1].split("-")[0]) if self.path != "/misaligned.mp3" else 0
+      if start >= len(PAYLOAD):
+        self.send_response(416)
+        self.send_header("Content-Range", "bytes */{}".format(len(PAYLOAD)))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return
+      self.send_response(206)
+      self.send_header("Content-Range", "bytes {}-{}/{}".format(start, len(PAYLOAD) - 1, len(PAYLOAD)))
+    else:
+      self.send_response(200)
+
+    self.send_header("Content-Type", "audio/mpeg")
+    self.send_header("ETag", FakeMp3Handler.etag)
+    self.send_header("Content-Length", str(len(PAYLOAD) - start))
+    self.end_headers()
+    self.wfile.write(PAYLOAD[start:])
+
+  def log_message(self, *args):
+    pass
+
+@pytest.fixture
+def server():
+  """
+  Provides the base URL of a running FakeMp3Handler server
+  """
+  FakeMp3Handler.requests = []
+  httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeMp3Handler)
+  thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+  thread.start()
+  yield "http://127.0.0.1:{}".format(httpd.server_address[1])
+  httpd.shutdown()
+  httpd.server_close()
+
+@pytest.fixture
+def downloader(tmp_path):
+  """
+  Provides an HttpDownloader holding the fake session cookie
+  """
+  downloader = HttpDownloader(str(tmp_path), chunk_size=4096)
+  downloader.set_session([{"name": "session", "value": "secret", "domain": "127.0.0.1", "path": "/"}])
+  yield downloader
+  downloader.close()
+
+class TestHttpDownloader():
+  """
+  Class for testing HttpDownloader() methods
+  """
+
+  def test_constructor(self, tmp_path):
+    with pytest.raises(TypeError):
+      HttpDownloader(123)
+
+    with pytest.raises(ValueError):
+      HttpDownloader(str(tmp_path / "missing"))
+
+  def test_download(self, server, downloader, tmp_path):
+    progress = []
+    downloader.progress = lambda filename, received, total: progress.append((received, total))
+
+    path = downloader.download(server + "/song.mp3", "Artist - Song (Dirty).mp3")
+
+    assert path == str(tmp_path / "Artist - Song (Dirty).mp3")
+    assert open(path, "rb").read() == PAYLOAD
+    assert not os.path.exists(path + ".part")
+    assert not os.path.exists(path + HttpDownloader.VALIDATOR_SUFFIX)
+    assert progress[-1] == (len(PAYLOAD), len(PAYLOAD))
+
+  def test_download_requires_session(self, server, tmp_path):
+    with HttpDownloader(str(tmp_path)) as downloader:
+      with pytest.raises(Exception):
+        downloader.download(server + "/song.mp3", "song.mp3")
+    assert not os.path.exists(str(tmp_path / "song.mp3"))
+
+  def test_resume(self, server, downloader, tmp_path):
+    part = tmp_path / "song.mp3.part"
+    part.write_bytes(PAYLOAD[:1000])
+
+    downloader.download(server + "/song.mp3", "song.mp3")
+
+    assert (tmp_path / "song.mp3").read_bytes() == PAYLOAD
+    assert FakeMp3Handler.requests[-1][1]["Range"] == "bytes=1000-"
+
+    # A complete .part file is renamed without downloading it again
+    part.write_bytes(PAYLOAD)
+    downloader.download(server + "/song.mp3", "song.mp3")
+    assert (tmp_path / "song.mp3").read_bytes() == PAYLOAD
+
+  def test_discards_mismatched_part(self, server, downloader, tmp_path):
+    part = tmp_path / "song.mp3.part"
+    part.write_bytes(PAYLOAD + b"stale")
+
+    downloader.download(server + "/song.mp3", "song.mp3")
+
+    assert (tmp_path / "song.mp3").read_bytes() == PAYLOAD
+    assert "Range" not in FakeMp3Handler.requests[-1][1]
+
+  def test_discards_misaligned_range(self, server, downloader, tmp_path):
+    part = tmp_path / "song.mp3.part"
+    part.write_bytes(PAYLOAD[:1000])
+
+    # The range answered starts at 0 instead of 1000, so it is not appended
+    downloader.download(server + "/misaligned.mp3", "song.mp3")
+
+    assert (tmp_path / "song.mp3").read_bytes() == PAYLOAD
+    assert "Range" not in FakeMp3Handler.requests[-1][1]
+
+  def test_resume_if_unchanged(self, server, downloader, tmp_path):
+    part = tmp_path / "song.mp3.part"
+    validator = tmp_path / ("song.mp3" + HttpDownloader.VALIDATOR_SUFFIX)
+    part.write_bytes(PAYLOAD[:1000])
+    validator.write_text(FakeMp3Handler.etag)
+
+    downloader.download(server + "/song.mp3", "song.mp3")
+
+    assert (tmp_path / "song.mp3").read_bytes() == PAYLOAD
+    assert FakeMp3Handler.requests[-1][1]["If-Range"] == FakeMp3Handler.etag
+    assert sorted(os.listdir(str(tmp_path))) == ["song.mp3"]
+
+    # The .part file of a file changed since is downloaded from scratch
+    part.write_bytes(b"stale" * 200)
+    validator.write_text('"v0"')
+    downloader.download(server + "/song.mp3", "song.mp3")
+
+    assert (tmp_path / "song.mp3").read_bytes() == PAYLOAD
+    assert len(FakeMp3Handler.requests) == 2
+    assert sorted(os.listdir(str(tmp_path))) == ["song.mp3"]
+
+  def test_keeps_validator_of_interrupted_download(self, server, downloader, tmp_path, monkeypatch):
+    def interrupt(response, part_path, filename, offset, mode):
+      with open(part_path, mode) as part:
+        part.write(response.read(1000))
+      raise ConnectionResetError()
+    monkeypatch.setattr(downloader, "_write", interrupt)
+
+    with pytest.raises(ConnectionResetError):
+      downloader.download(server + "/song.mp3", "song.mp3")
+    assert (tmp_path / ("song.mp3" + HttpDownloader.VALIDATOR_SUFFIX)).read_text() == FakeMp3Handler.etag
+
+  def test_rejects_non_audio(self, server, downloader, tmp_path):
+    with pytest.raises(Exception):
+      downloader.download(server + "/login", "song.mp3")
+
+    assert not os.path.exists(str(tmp_path / "song.mp3"))
+    assert not os.path.exists(str(tmp_path / "song.mp3.part"))
+
+  def test_redirect_and_pooling(self, server, downloader, tmp_path):
+    downloader.download(server + "/redirect", "first.mp3")
+    downloader.download(server + "/song.mp3", "second.mp3")
+
+    assert (tmp_path / "first.mp3").read_bytes() == PAYLOAD
+    assert downloader.connections_opened == 1
+
+  def test_submit(self, server, downloader, tmp_path):
+    futures = [downloader.submit(server + "/song.mp3", "{}.mp3".format(i)) for i in range(8)]
+    downloader.close()
+
+    for i, future in enumerate(futures):
+      assert future.result() == str(tmp_path / "{}.mp3".format(i))
+      assert (tmp_path / "{}.mp3".format(i)).read_bytes() == PAYLOAD
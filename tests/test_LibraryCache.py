@@ -0,0 +1,71 @@
+"""
+This test file determines if LibraryCache class methods are working correctly
+"""
+
+import os
+
+import pytest
+
+from src.bpm_supreme.classes.LibraryCache import LibraryCache
+
+@pytest.fixture
+def library_dir(tmp_path):
+  """
+  Provides a library directory with a couple of songs and an old mtime
+  """
+  for name in ("Drake - Nice For What (Intro Dirty).mp3", "Drake - God's Plan (Clean).mp3"):
+    (tmp_path / name).write_bytes(b"")
+  os.utime(tmp_path, ns=(10**18, 10**18))
+  return str(tmp_path)
+
+@pytest.fixture
+def cache(tmp_path_factory):
+  """
+  Provides a LibraryCache stored in its own temporary directory
+  """
+  cache = LibraryCache(str(tmp_path_factory.mktemp("cache") / "library.sqlite"))
+  yield cache
+  cache.close()
+
+class TestLibraryCache():
+  """
+  Class for testing LibraryCache() methods
+  """
+
+  def test_constructor(self):
+    with pytest.raises(TypeError):
+      LibraryCache(123)
+
+  def test_scan_reuses_unchanged_directories(self, cache, library_dir):
+    assert sorted(cache.scan(library_dir)) == sorted(os.listdir(library_dir))
+    assert (cache.reused, cache.rescanned) == (0, 2)
+
+    assert len(cache.scan(library_dir)) == 2
+    assert (cache.reused, cache.rescanned) == (2, 2)
+
+    # A forced rebuild reads the directory again
+    cache.scan(library_dir, rebuild=True)
+    assert (cache.reused, cache.rescanned) == (2, 4)
+
+  def test_scan_rescans_changed_directories(self, cache, library_dir):
+    cache.scan(library_dir)
+
+    open(os.path.join(library_dir, "Drake - In My Feelings (Dirty).mp3"), "w").close()
+    os.utime(library_dir, ns=(2 * 10**18, 2 * 10**18))
+
+    library = cache.build([library_dir])
+    assert library.contains("Drake", "In My Feelings", "Dirty")
+    assert (cache.reused, cache.rescanned) == (0, 5)
+
+  def test_persists_between_connections(self, cache, library_dir):
+    cache.scan(library_dir)
+    cache.close()
+
+    with LibraryCache(cache.path) as reopened:
+      assert len(reopened.build([library_dir])) == 2
+      assert (reopened.reused, reopened.rescanned) == (2, 0)
+
+  def test_recently_modified_directories_are_rescanned(self, cache, tmp_path):
+    cache.scan(str(tmp_path))
+    cache.scan(str(tmp_path))
+    assert cache.reused == 0
@@ -0,0 +1,91 @@
+"""
+This test file determines if LibraryIndex class methods are working correctly
+"""
+
+import threading
+
+import pytest
+
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+
+@pytest.fixture
+def library():
+  """
+  Provides a LibraryIndex with a few songs
+  """
+  return LibraryIndex([
+    "Drake - Nice For What (Intro Dirty).mp3",
+    "Cardi B, Bad Bunny - I Like It (feat. J Balvin) (Quick Hit Clean).mp3",
+    "Unnamed Song (Dirty).mp3",
+  ])
+
+class TestLibraryIndex():
+  """
+  Class for testing LibraryIndex() methods
+  """
+
+  def test_parse_name(self):
+    assert LibraryIndex.parse_name("Drake - Nice For What (Intro Dirty).mp3") == ("Drake", "Nice For What", "Intro Dirty")
+    assert LibraryIndex.parse_name("Nice For What.mp3") == ("", "Nice For What", "")
+    assert LibraryIndex.parse_name("Song (feat. X)") == ("", "Song (feat. X)", "")
+
+  def test_normalize(self):
+    assert LibraryIndex.normalize("  Song   (Feat. X) ") == LibraryIndex.normalize("song ft. x")
+    assert LibraryIndex.normalize_artists("Cardi B, Bad Bunny & J Balvin") == frozenset(["cardi b", "bad bunny", "j balvin"])
+    assert LibraryIndex.normalize_artists("Unknown") == frozenset()
+
+  def test_contains(self, library):
+    assert library.contains("drake", "nice  for what", "intro dirty")
+    assert not library.contains("Drake", "Nice For What", "Quick Hit Dirty")
+    assert not library.contains("Someone Else", "Nice For What", "Intro Dirty")
+
+    # Shared artists match, as do unknown artists on either side
+    assert library.contains("Bad Bunny", "I Like It (ft. J Balvin)", "Quick Hit Clean")
+    assert library.contains("Anyone", "Unnamed Song", "Dirty")
+    assert library.contains("Unknown", "Nice For What", "Intro Dirty")
+
+    # Legacy "Title (Version)" string lookups
+    assert "Nice For What (Intro Dirty)" in library
+    assert "Nice For What (Intro Dirty)" in set(library)
+
+  def test_contains_many(self, library):
+    candidates = [("Drake", "Nice For What", "Intro Dirty"), ("Drake", "Nice For What", "Dirty")]
+    assert library.contains_many(candidates) == [True, False]
+
+  def test_update(self, library):
+    other = LibraryIndex(["Drake - God's Plan (Clean).mp3"])
+    library.update(other)
+    assert library.contains("Drake", "God's Plan", "Clean")
+    assert len(library) == 4
+
+    # Songs sharing a title and version count once per artist
+    library.update(LibraryIndex(["Future - God's Plan (Clean).mp3"]))
+    assert len(library) == 5
+    assert len(set(library)) == 4
+
+    with pytest.raises(TypeError):
+      library.update(set())
+
+  def test_claim(self, library):
+    assert not library.claim("Drake", "Nice For What", "Intro Dirty")
+    assert library.claim("Drake", "Nice For What", "Dirty")
+    assert not library.claim("Drake", "Nice For What", "Dirty")
+
+    library.discard("Drake", "Nice For What", "Dirty")
+    assert not library.contains("Drake", "Nice For What", "Dirty")
+    assert library.contains("Drake", "Nice For What", "Intro Dirty")
+
+  def test_claim_is_atomic(self, library):
+    claimed = []
+    def worker():
+      for i in range(200):
+        if library.claim("Artist", "Song {}".format(i), "Dirty"):
+          claimed.append(i)
+
+    threads = [threading.Thread(target=worker) for i in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    assert sorted(claimed) == list(range(200))
@@ -0,0 +1,92 @@
+"""
+This test file determines if LibraryScanner class methods are working correctly
+"""
+
+import os
+
+import pytest
+
+from src.bpm_supreme.classes.LibraryScanner import LibraryScanner
+from src.bpm_supreme.classes.LibraryCache import LibraryCache
+
+@pytest.fixture
+def roots(tmp_path):
+  """
+  Provides two library roots sharded into nested genre/year folders
+  """
+  roots = []
+  for disk in ("disk1", "disk2"):
+    for genre in ("hip-hop", "house"):
+      for year in ("2019", "2020"):
+        directory = tmp_path / disk / genre / year
+        directory.mkdir(parents=True)
+        (directory / "{} - {} {} (Dirty).mp3".format(disk, genre, year)).write_bytes(b"")
+    roots.append(str(tmp_path / disk))
+
+  # Age every directory so the cache trusts their mtimes
+  for directory, subdirs, files in os.walk(str(tmp_path)):
+    os.utime(directory, ns=(10**18, 10**18))
+  return roots
+
+class TestLibraryScanner():
+  """
+  Class for testing LibraryScanner() methods
+  """
+
+  def test_constructor(self, tmp_path):
+    with pytest.raises(ValueError):
+      LibraryScanner([str(tmp_path / "missing")])
+
+    with pytest.raises(ValueError):
+      LibraryScanner([str(tmp_path)], workers=0)
+
+  def test_scan_recurses_every_root(self, roots):
+    scanner = LibraryScanner(roots, workers=4)
+    library = scanner.scan()
+
+    assert scanner.entries == 8
+    assert library.contains("disk2", "house 2019", "Dirty")
+    assert scanner.directories == 14
+    assert "entries/sec" in scanner.report()
+
+  def test_scan_reuses_cached_directories(self, roots, tmp_path_factory):
+    with LibraryCache(str(tmp_path_factory.mktemp("cache") / "library.sqlite")) as cache:
+      first = LibraryScanner(roots, cache=cache)
+      first.scan()
+      assert (first.reused, first.rescanned) == (0, 8)
+
+      # Only the changed directory is read again
+      changed = os.path.join(roots[0], "house", "2020")
+      open(os.path.join(changed, "New - Song (Clean).mp3"), "w").close()
+      os.utime(changed, ns=(2 * 10**18, 2 * 10**18))
+
+      second = LibraryScanner(roots, cache=cache)
+      library = second.scan()
+      assert library.contains("New", "Song", "Clean")
+      assert (second.reused, second.rescanned) == (7, 2)
+
+      rebuilt = LibraryScanner(roots, cache=cache, rebuild=True)
+      rebuilt.scan()
+      assert (rebuilt.reused, rebuilt.rescanned) == (0, 9)
+
+  def test_scan_reads_tags(self, roots, tmp_path_factory):
+    tagged = os.path.join(roots[1], "hip-hop", "2020", "track01.mp3")
+    title = b"\x00Nice For What"
+    frame = b"TIT2" + len(title).to_bytes(4, "big") + b"\x00\x00" + title
+    with open(tagged, "wb") as audio:
+      audio.write(b"ID3\x03\x00\x00" + len(frame).to_bytes(4, "big") + frame + bytes(128))
+    os.utime(os.path.dirname(tagged), ns=(10**18, 10**18))
+
+    with LibraryCache(str(tmp_path_factory.mktemp("cache") / "library.sqlite")) as cache:
+      # Cached listings without tags are read again when tags are wanted
+      LibraryScanner(roots, cache=cache).scan()
+      first = LibraryScanner(roots, cache=cache, tags=True)
+      assert first.scan().contains("", "Nice For What", "")
+      assert (first.rescanned, first.tagged) == (9, 1)
+      assert "1 tagged files read" in first.report()
+
+      second = LibraryScanner(roots, cache=cache, tags=True)
+      library = second.scan()
+      assert library.contains("", "Nice For What", "")
+      assert library.contains("disk2", "house 2019", "Dirty")
+      assert (second.reused, second.tagged) == (9, 0)
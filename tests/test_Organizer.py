@@ -0,0 +1,137 @@
+"""
+This test file determines if Organizer class methods are working correctly
+"""
+
+import os
+import types
+
+import pytest
+
+from src.bpm_supreme.classes.Organizer import Organizer
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+from src.bpm_supreme.classes.LibraryCache import LibraryCache
+
+def song(artist, name, genre=None):
+  """
+  Returns a stand-in for a downloaded Song
+  """
+  return types.SimpleNamespace(artist=artist, name=name, genre=genre)
+
+def download(directory, name, data=b"audio"):
+  """
+  Writes a completed download and returns its path
+  """
+  path = os.path.join(str(directory), name)
+  with open(path, "wb") as audio:
+    audio.write(data)
+  return path
+
+@pytest.fixture
+def paths(tmp_path):
+  """
+  Provides a download directory and a library root
+  """
+  downloads = tmp_path / "downloads"
+  library = tmp_path / "library"
+  downloads.mkdir()
+  library.mkdir()
+  return str(downloads), str(library)
+
+class TestOrganizer():
+  """
+  Class for testing Organizer() methods
+  """
+
+  def test_rejects_bad_arguments(self, paths):
+    with pytest.raises(TypeError):
+      Organizer(123)
+
+    with pytest.raises(ValueError):
+      Organizer(os.path.join(paths[1], "missing"))
+
+    with pytest.raises(ValueError):
+      Organizer(paths[1], batch_size=0)
+
+  def test_canonical_name(self):
+    assert Organizer.canonical_name("/tmp/nice for what.MP3", song("Drake", "Nice For What (Intro Dirty)")) == "Drake - Nice For What (Intro Dirty).mp3"
+    assert Organizer.canonical_name("/tmp/Drake - Nice For What (Intro Dirty).mp3") == "Drake - Nice For What (Intro Dirty).mp3"
+    assert Organizer.canonical_name("/tmp/x.mp3", song("AC/DC", "Thunderstruck (Clean)")) == "AC-DC - Thunderstruck (Clean).mp3"
+
+  def test_destination_layout(self, paths):
+    with Organizer(paths[1]) as organizer:
+      assert organizer.destination("x.mp3", song("Drake", "Nice For What (Intro Dirty)", "hip-hop-r&b")) == \
+        os.path.join(paths[1], "hip-hop-r&b", "Intro Dirty", "Drake - Nice For What (Intro Dirty).mp3")
+      assert organizer.destination("Drake - Nice For What.mp3") == \
+        os.path.join(paths[1], Organizer.UNKNOWN, Organizer.UNKNOWN, "Drake - Nice For What.mp3")
+
+    with Organizer(paths[1], layout=os.path.join("{initial}", "{artist}")) as organizer:
+      assert organizer.destination("x.mp3", song("drake", "Nice For What (Dirty)")) == \
+        os.path.join(paths[1], "D", "drake", "drake - Nice For What (Dirty).mp3")
+
+  def test_moves_in_batches(self, paths):
+    downloads, root = paths
+    library = LibraryIndex()
+    with Organizer(root, library=library, batch_size=2, flush_interval=5) as organizer:
+      for index in range(3):
+        path = download(downloads, "download {}.mp3".format(index))
+        organizer.submit(path, song("Artist {}".format(index), "Title {} (Dirty)".format(index), "pop"))
+      organizer.flush()
+
+    assert organizer.batches == 2
+    assert organizer.renamed == 3
+    assert os.listdir(downloads) == []
+    assert sorted(os.listdir(os.path.join(root, "pop", "Dirty"))) == ["Artist {} - Title {} (Dirty).mp3".format(index, index) for index in range(3)]
+    assert library.contains("Artist 1", "Title 1", "Dirty")
+
+  def test_copies_across_devices(self, paths, monkeypatch):
+    downloads, root = paths
+    real_stat = os.stat
+
+    # Report the library on another device so files are copied
+    def stat(path, *args, **kwargs):
+      result = real_stat(path, *args, **kwargs)
+      if os.path.abspath(str(path)).startswith(root):
+        return os.stat_result((result.st_mode, result.st_ino, result.st_dev + 1) + tuple(result)[3:])
+      return result
+
+    monkeypatch.setattr(os, "stat", stat)
+    with Organizer(root) as organizer:
+      organizer.submit(download(downloads, "a.mp3", b"audio data"), song("Drake", "Nice For What (Dirty)"))
+      organizer.flush()
+
+    target = os.path.join(root, Organizer.UNKNOWN, "Dirty", "Drake - Nice For What (Dirty).mp3")
+    assert organizer.copied == 1
+    assert not os.path.exists(os.path.join(downloads, "a.mp3"))
+    with open(target, "rb") as audio:
+      assert audio.read() == b"audio data"
+    assert not os.path.exists(target + ".part")
+
+  def test_keeps_conflicts(self, paths):
+    downloads, root = paths
+    with Organizer(root, layout="") as organizer:
+      download(root, "Drake - Nice For What (Dirty).mp3", b"existing")
+      path = download(downloads, "a.mp3")
+      organizer.submit(path, song("Drake", "Nice For What (Dirty)"))
+      organizer.flush()
+
+    assert organizer.conflicts == [(path, os.path.join(root, "Drake - Nice For What (Dirty).mp3"))]
+    assert os.path.exists(path)
+
+  def test_updates_cached_listings(self, paths, tmp_path, monkeypatch):
+    downloads, root = paths
+    monkeypatch.setattr(LibraryCache, "RACY_WINDOW_NS", 10**8)
+    cache_path = str(tmp_path / "library.sqlite")
+    with LibraryCache(cache_path) as cache:
+      cache.build([root])
+
+    with Organizer(root, cache_path=cache_path) as organizer:
+      organizer.submit(download(downloads, "a.mp3"), song("Drake", "Nice For What (Dirty)", "pop"))
+      organizer.flush()
+
+    with LibraryCache(cache_path) as cache:
+      snapshot = cache.load()
+
+    assert snapshot[root][2] == ["pop"]
+    assert snapshot[os.path.join(root, "pop")][2] == ["Dirty"]
+    assert snapshot[os.path.join(root, "pop", "Dirty")][1] == ["Drake - Nice For What (Dirty).mp3"]
+    assert downloads not in snapshot
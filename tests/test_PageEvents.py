@@ -0,0 +1,193 @@
+"""
+This test file determines if PageEvents class methods are working correctly
+"""
+
+import time
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from src.bpm_supreme.classes.PageEvents import PageEvents
+from tests.node_driver import NODE
+from tests.node_driver import NodeDriver
+
+needs_node = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+class RecordingDriver:
+  """
+  Stand-in WebDriver recording the arguments of every async script
+  """
+  def __init__(self):
+    self.calls = []
+
+  def set_script_timeout(self, seconds):
+    pass
+
+  def execute_async_script(self, script, *args):
+    self.calls.append(args)
+    return True
+
+@pytest.fixture
+def driver():
+  """
+  Provides a NodeDriver on an empty page
+  """
+  driver = NodeDriver()
+  driver.load("<div class='table-media'></div>")
+  yield driver
+  driver.quit()
+
+class TestPageEvents():
+  """
+  Class for testing PageEvents() methods
+  """
+
+  def test_timeouts(self):
+    driver = RecordingDriver()
+    events = PageEvents(driver, 30)
+    events.wait_for(".row", 0)
+    events.wait_for(".row")
+    events.scroll_to_end(".row", timeout=0)
+    assert [call[3] for call in driver.calls] == [0, 30, 0]
+
+    # Without a timeout of its own the default applies
+    driver.calls = []
+    PageEvents(driver, None).wait_for_count(".row", 1)
+    assert driver.calls[0][3] == PageEvents.TIMEOUT
+
+  @needs_node
+  def test_wait_for(self, driver):
+    events = PageEvents(driver)
+    driver.run("setTimeout(function() { document.body.appendChild(el('div', {'class': 'row-container'})); }, 100);")
+    start = time.perf_counter()
+    events.wait_for(".row-container", 5)
+    assert time.perf_counter() - start < 2
+
+    # Hidden elements are waited for until shown
+    driver.run("""
+      document.body.appendChild(el('div', {'class': 'pagination', style: 'display: none'}));
+      setTimeout(function() { document.querySelector('.pagination').style.display = 'block'; }, 100);
+    """)
+    events.wait_for(".pagination", 5)
+
+    with pytest.raises(TimeoutException):
+      events.wait_for(".missing", 0.2)
+
+    # An explicit timeout of 0 only checks the page once
+    start = time.perf_counter()
+    with pytest.raises(TimeoutException):
+      events.wait_for(".missing", 0)
+    assert time.perf_counter() - start < 1
+
+  @needs_node
+  def test_wait_until_gone(self, driver):
+    events = PageEvents(driver)
+    driver.run("""
+      document.body.appendChild(el('div', {'class': 'loader'}, ['Loading']));
+      setTimeout(function() { document.querySelector('.loader').style.display = 'none'; }, 100);
+    """)
+    events.wait_until_gone(".loader", 5)
+
+    driver.run("document.body.appendChild(el('div', {'class': 'spinner'}));")
+    with pytest.raises(TimeoutException):
+      events.wait_until_gone(".spinner", 0.2)
+
+  @needs_node
+  def test_wait_for_count(self, driver):
+    events = PageEvents(driver)
+    driver.run("""
+      var table = document.querySelector('.table-media');
+      for (var i = 0; i < 3; ++i) table.appendChild(el('div', {'class': 'row-item'}));
+      setTimeout(function() { table.appendChild(el('div', {'class': 'row-item'})); }, 100);
+    """)
+    assert events.count(".row-item") == 3
+    assert events.wait_for_count(".row-item", 3, 5)
+    assert not events.wait_for_count(".row-item", 4, 0.2)
+
+  @needs_node
+  def test_scroll_to_end(self, driver):
+    events = PageEvents(driver)
+
+    # Every scroll to the bottom loads 5 more rows, up to 23
+    driver.run("""
+      var table = document.querySelector('.table-media');
+      for (var i = 0; i < 5; ++i) table.appendChild(el('div', {'class': 'row-item'}));
+      addEventListener('scroll', function() {
+        setTimeout(function() {
+          for (var i = 0; i < 5 && table.children.length < 23; ++i) table.appendChild(el('div', {'class': 'row-item'}));
+        }, 20);
+      });
+    """)
+    loaded = events.scroll_to_end(".row-item", quiet=0.3)
+    assert loaded["count"] == 23
+    assert loaded["rounds"] >= 5
+
+  @needs_node
+  def test_scroll_to_limit(self, driver):
+    events = PageEvents(driver)
+    driver.run("""
+      var table = document.querySelector('.table-media');
+      addEventListener('scroll', function() {
+        setTimeout(function() { table.appendChild(el('div', {'class': 'row-item'})); }, 10);
+      });
+    """)
+    start = time.perf_counter()
+    assert events.scroll_to_end(".row-item", limit=4, quiet=5)["count"] == 4
+    assert time.perf_counter() - start < 2
+
+  @needs_node
+  def test_popups(self, driver):
+    events = PageEvents(driver)
+    events.monitor_popups()
+
+    # The popup is rendered empty and titled afterwards
+    driver.run("""
+      var button = el('a', {'class': 'tag-link'}, ['Dirty']);
+      button.onclick = function() {
+        var popup = el('div', {'class': 'popup'}, [el('div', {'class': 'popup_inner'}, [el('div', {'class': 'title'}), el('div', {'class': 'close'})])]);
+        popup.querySelector('.close').onclick = function() { popup.remove(); };
+        document.body.appendChild(popup);
+        setTimeout(function() { popup.querySelector('.title').innerText = 'Download Limit'; }, 100);
+      };
+      document.body.appendChild(button);
+    """)
+    outcome = events.click(".tag-link", 2)
+    assert outcome["clicked"]
+    assert [(popup["title"], popup["click"]) for popup in outcome["popups"]] == [("Download Limit", outcome["click"])]
+
+    # Popups are only handed back once
+    assert events.take_popups() == []
+    assert events.close_popups() == 1
+    assert events.count(".popup") == 0
+
+  @needs_node
+  def test_late_popup_keeps_its_click(self, driver):
+    events = PageEvents(driver)
+    events.monitor_popups()
+    driver.run("""
+      var clicks = 0;
+      var button = el('a', {'class': 'tag-link'}, ['Dirty']);
+      button.onclick = function() {
+        if (++clicks > 1) return;
+        setTimeout(function() {
+          document.body.appendChild(el('div', {'class': 'popup'}, [el('div', {'class': 'popup_inner'}, [el('div', {'class': 'title'}, ['Download Limit'])])]));
+        }, 50);
+      };
+      document.body.appendChild(button);
+    """)
+
+    # Without a grace period the first click does not wait for its popup
+    first = events.click(".tag-link")
+    assert first["popups"] == []
+    time.sleep(0.2)
+
+    second = events.click(".tag-link")
+    assert second["click"] == first["click"] + 1
+    assert [popup["click"] for popup in second["popups"]] == [first["click"]]
+
+  @needs_node
+  def test_click_missing_element(self, driver):
+    events = PageEvents(driver)
+    outcome = events.click("[data-bpm-button=\"missing\"]")
+    assert not outcome["clicked"]
+    assert outcome["popups"] == []
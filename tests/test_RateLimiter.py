@@ -0,0 +1,64 @@
+"""
+This test file determines if RateLimiter class methods are working correctly
+"""
+
+import json
+import time
+
+import pytest
+
+from src.bpm_supreme.classes.RateLimiter import RateLimiter
+
+class TestRateLimiter():
+  """
+  Class for testing RateLimiter() methods
+  """
+
+  def test_constructor(self):
+    with pytest.raises(ValueError):
+      RateLimiter(min_rate=2, max_rate=1)
+
+    with pytest.raises(ValueError):
+      RateLimiter(decrease=1.5)
+
+    assert RateLimiter(rate=100, max_rate=5).rate == 5
+
+  def test_acquire(self):
+    limiter = RateLimiter(rate=20)
+
+    # The first token is free, the next ones arrive at the current rate
+    assert limiter.acquire() == 0
+    start = time.monotonic()
+    limiter.acquire()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+  def test_aimd(self):
+    limiter = RateLimiter(rate=1, increase=0.5, decrease=0.25, min_rate=0.1)
+
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.rate == 2
+
+    limiter.on_limit()
+    assert limiter.rate == 0.5
+    assert limiter.limits == 1
+
+    for limit in range(10):
+      limiter.on_limit()
+    assert limiter.rate == 0.1
+
+  def test_persists_learned_rate(self, tmp_path):
+    state_path = str(tmp_path / "rate.json")
+    limiter = RateLimiter(rate=1, state_path=state_path)
+
+    # Limits are persisted immediately
+    limiter.on_limit()
+    assert json.load(open(state_path))["rate"] == 0.5
+
+    limiter.on_success()
+    limiter.save()
+    assert RateLimiter(rate=1, state_path=state_path).rate == limiter.rate
+
+    with pytest.raises(ValueError):
+      RateLimiter().save()
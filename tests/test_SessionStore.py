@@ -0,0 +1,55 @@
+"""
+This test file determines if SessionStore class methods are working correctly
+"""
+
+import os
+import time
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from src.bpm_supreme.classes.SessionStore import SessionStore
+
+SESSION = {
+  "cookies": {"https://app.bpmsupreme.com": [{"name": "session", "value": "secret", "domain": ".bpmsupreme.com"}]},
+  "local_storage": {"https://app.bpmsupreme.com": {"token": "abc"}},
+}
+
+class TestSessionStore():
+  """
+  Class for testing SessionStore() methods
+  """
+
+  def test_constructor(self, tmp_path):
+    with pytest.raises(TypeError):
+      SessionStore(123, "password")
+
+    with pytest.raises(TypeError):
+      SessionStore(str(tmp_path / "session.bin"), 123)
+
+  def test_save_and_load(self, tmp_path):
+    path = str(tmp_path / "session.bin")
+    store = SessionStore(path, "password")
+    assert store.load() is None
+
+    store.save(SESSION)
+    assert store.load() == SESSION
+
+    # The file is private and does not hold the session in plain text
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert b"secret" not in open(path, "rb").read()
+
+    store.clear()
+    assert store.load() is None
+
+  def test_wrong_secret(self, tmp_path):
+    path = str(tmp_path / "session.bin")
+    SessionStore(path, "password").save(SESSION)
+    assert SessionStore(path, "other password").load() is None
+
+  def test_expired(self, tmp_path):
+    path = str(tmp_path / "session.bin")
+    SessionStore(path, "password").save(SESSION)
+    time.sleep(0.01)
+    assert SessionStore(path, "password", max_age=0).load() is None
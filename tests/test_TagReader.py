@@ -0,0 +1,125 @@
+"""
+This test file determines if TagReader class methods are working correctly
+"""
+
+import io
+import struct
+
+from src.bpm_supreme.classes.TagReader import TagReader
+from src.bpm_supreme.classes.LibraryIndex import LibraryIndex
+
+AUDIO = b"\xff\xfb" + bytes(4096)
+
+def syncsafe(size):
+  return bytes([(size >> 21) & 0x7f, (size >> 14) & 0x7f, (size >> 7) & 0x7f, size & 0x7f])
+
+def id3v2(frames, major=3):
+  """
+  Returns an ID3v2 tag of (frame id, body) pairs
+  """
+  body = b""
+  for frame_id, frame in frames:
+    if major == 2:
+      body += frame_id + len(frame).to_bytes(3, "big") + frame
+    else:
+      body += frame_id + (syncsafe(len(frame)) if major == 4 else struct.pack(">I", len(frame))) + b"\x00\x00" + frame
+  body += bytes(64)
+  return b"ID3" + bytes([major, 0, 0]) + syncsafe(len(body)) + body
+
+def chunk(chunk_id, body, order="<"):
+  return chunk_id + struct.pack(order + "I", len(body)) + body + (b"\x00" if len(body) & 1 else b"")
+
+def atom(atom_id, body):
+  return struct.pack(">I", len(body) + 8) + atom_id + body
+
+def mp4_text(atom_id, text):
+  return atom(atom_id, atom(b"data", b"\x00\x00\x00\x01" + bytes(4) + text.encode()))
+
+class CountingBytesIO(io.BytesIO):
+  """
+  BytesIO counting the bytes read from it
+  """
+
+  def __init__(self, data):
+    super().__init__(data)
+    self.bytes_read = 0
+
+  def read(self, *args):
+    data = super().read(*args)
+    self.bytes_read += len(data)
+    return data
+
+class TestTagReader():
+  """
+  Class for testing TagReader() methods
+  """
+
+  def test_id3v23(self, tmp_path):
+    path = tmp_path / "track01.mp3"
+    path.write_bytes(id3v2([
+      (b"APIC", bytes(100000)),
+      (b"TIT2", b"\x01" + "Nice For What".encode("utf-16")),
+      (b"TPE1", b"\x00Drake"),
+      (b"COMM", b"\x00eng\x00Intro Dirty"),
+    ]) + AUDIO)
+    assert TagReader.read(str(path)) == {"title": "Nice For What", "artist": "Drake", "version": "Intro Dirty"}
+
+  def test_id3v24_and_v22(self, tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(id3v2([(b"TIT2", b"\x03I Like It (Quick Hit Clean)"), (b"TPE1", b"\x03Cardi B\x00Bad Bunny")], major=4) + AUDIO)
+    assert TagReader.read(str(path)) == {"title": "I Like It (Quick Hit Clean)", "artist": "Cardi B, Bad Bunny"}
+
+    path = tmp_path / "b.mp3"
+    path.write_bytes(id3v2([(b"TT2", b"\x00Money"), (b"TP1", b"\x00Cardi B"), (b"TT3", b"\x00Dirty")], major=2) + AUDIO)
+    assert TagReader.read(str(path)) == {"title": "Money", "artist": "Cardi B", "version": "Dirty"}
+
+  def test_comment_not_version(self, tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(id3v2([(b"TIT2", b"\x00Money"), (b"COMM", b"\x00eng\x00Downloaded from a record pool")]) + AUDIO)
+    assert TagReader.read(str(path)) == {"title": "Money"}
+
+  def test_id3v1(self, tmp_path):
+    path = tmp_path / "a.mp3"
+    tag = b"TAG" + b"God's Plan".ljust(30, b"\x00") + b"Drake".ljust(30, b"\x00") + bytes(34) + b"Clean".ljust(28, b"\x00") + b"\x00\x01\x00"
+    path.write_bytes(AUDIO + tag)
+    assert TagReader.read(str(path)) == {"title": "God's Plan", "artist": "Drake", "version": "Clean"}
+
+  def test_untagged(self, tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(AUDIO)
+    assert TagReader.read(str(path)) == {}
+    assert TagReader.read(str(tmp_path / "missing.mp3")) == {}
+
+  def test_wav(self, tmp_path):
+    path = tmp_path / "a.wav"
+    info = chunk(b"LIST", b"INFO" + chunk(b"INAM", b"Mask Off\x00") + chunk(b"IART", b"Future\x00"))
+    body = b"WAVE" + chunk(b"fmt ", bytes(16)) + chunk(b"data", bytes(100001)) + info
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+    assert TagReader.read(str(path)) == {"title": "Mask Off", "artist": "Future"}
+
+  def test_aiff(self, tmp_path):
+    path = tmp_path / "a.aiff"
+    body = b"AIFF" + chunk(b"SSND", bytes(5000), ">") + chunk(b"ID3 ", id3v2([(b"TIT2", b"\x00Mask Off"), (b"TPE1", b"\x00Future")]), ">")
+    path.write_bytes(b"FORM" + struct.pack(">I", len(body)) + body)
+    assert TagReader.read(str(path)) == {"title": "Mask Off", "artist": "Future"}
+
+  def test_m4a(self, tmp_path):
+    path = tmp_path / "a.m4a"
+    ilst = atom(b"ilst", mp4_text(b"\xa9nam", "Mask Off") + mp4_text(b"\xa9ART", "Future") + mp4_text(b"\xa9cmt", "Clean"))
+    moov = atom(b"moov", atom(b"mvhd", bytes(100)) + atom(b"udta", atom(b"meta", bytes(4) + atom(b"hdlr", bytes(25)) + ilst)))
+    path.write_bytes(atom(b"ftyp", b"M4A \x00\x00\x00\x00") + atom(b"mdat", bytes(100000)) + moov)
+    assert TagReader.read(str(path)) == {"title": "Mask Off", "artist": "Future", "version": "Clean"}
+
+  def test_header_only(self):
+    audio = CountingBytesIO(id3v2([(b"APIC", bytes(500000)), (b"TIT2", b"\x00Money")]) + AUDIO)
+    assert TagReader.read_id3v2(audio) == {"title": "Money"}
+    assert audio.bytes_read < 1024
+
+  def test_add_file(self):
+    library = LibraryIndex()
+    library.add_file("track01.mp3", {"title": "Nice For What (Intro Dirty)", "artist": "Drake"})
+    library.add_file("Future - Mask Off.wav", {"title": "Mask Off", "version": "Clean"})
+    library.add_file("Cardi B - Money (Dirty).m4a", {})
+    assert ("Drake", "Nice For What", "Intro Dirty") in library
+    assert ("Future", "Mask Off", "Clean") in library
+    assert ("Cardi B", "Money", "Dirty") in library
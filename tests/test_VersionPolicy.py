@@ -0,0 +1,47 @@
+"""
+This test file determines if VersionPolicy class methods are working correctly
+"""
+
+import pytest
+
+from src.bpm_supreme.classes.VersionPolicy import VersionPolicy
+
+@pytest.fixture
+def policy():
+  """
+  Provides the genre page order of priority
+  """
+  return VersionPolicy([
+    (("Intro Dirty", "Quick Hit Dirty"), VersionPolicy.ALL),
+    (("Intro Clean", "Quick Hit Clean"), VersionPolicy.ANY),
+    (("Dirty", "Clean"), VersionPolicy.ANY),
+    (("Clean Short Edit",), VersionPolicy.ANY),
+  ])
+
+class TestVersionPolicy():
+  """
+  Class for testing VersionPolicy() methods
+  """
+
+  def test_select_all(self, policy):
+    assert policy.select(["Quick Hit Dirty", "Dirty", "Intro Dirty"]) == ["Intro Dirty", "Quick Hit Dirty"]
+
+  def test_select_falls_through(self, policy):
+    # An incomplete ALL tier is downloaded and the next tiers are tried
+    assert policy.select(["Intro Dirty", "Clean", "Quick Hit Clean"]) == ["Intro Dirty", "Quick Hit Clean"]
+    assert policy.select(["Clean Short Edit", "Clean"]) == ["Clean"]
+    assert policy.select(["Clean Short Edit"]) == ["Clean Short Edit"]
+
+  def test_select_none(self, policy):
+    assert policy.select([]) == []
+    assert policy.select(["Instrumental", "Acapella"]) == []
+
+  def test_select_keeps_page_labels(self, policy):
+    assert policy.select({" intro  DIRTY": "1-0-0", "Quick Hit Dirty": "1-0-1"}) == [" intro  DIRTY", "Quick Hit Dirty"]
+
+  def test_invalid_tiers(self):
+    with pytest.raises(ValueError):
+      VersionPolicy([(("Dirty",), "first")])
+
+    with pytest.raises(TypeError):
+      VersionPolicy([("Dirty", VersionPolicy.ANY)])
@@ -0,0 +1,116 @@
+"""
+This test file determines if WorkerPool class methods are working correctly
+"""
+
+import collections
+from urllib.parse import parse_qsl
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+import pytest
+
+from src.bpm_supreme.classes import WorkerPool as worker_pool_module
+from src.bpm_supreme.classes.BpmSupreme import BpmSupreme
+from src.bpm_supreme.classes.BpmSupreme import Song
+from src.bpm_supreme.classes.CrawlScheduler import CrawlScheduler
+from src.bpm_supreme.classes.HttpDownloader import HttpDownloader
+from src.bpm_supreme.classes.RateLimiter import RateLimiter
+from src.bpm_supreme.classes.WorkerPool import WorkerPool
+from tests.fake_site import FakeDriver
+from tests.fake_site import FakeSite
+
+@pytest.fixture
+def site():
+  """
+  Provides a running FakeSite whose pages repeat the last row of the page before
+  """
+  with FakeSite(rows_per_page=5, pages=6, asset_latency=0, overlap=1) as site:
+    yield site
+
+@pytest.fixture
+def account(site, tmp_path):
+  """
+  Provides an account on site downloading over HTTP without a rate limit
+  """
+  downloads = tmp_path / "downloads"
+  downloads.mkdir()
+  http_downloader = HttpDownloader(str(downloads))
+  account = site.configure(BpmSupreme(FakeDriver(), "user@example.com", "password", str(downloads),
+    http_downloader=http_downloader, rate_limiter=RateLimiter(rate=1000, burst=1000)))
+  yield account
+  http_downloader.close()
+
+class TestWorkerPool():
+  """
+  Class for testing WorkerPool() methods
+  """
+
+  def test_type(self, account):
+    with pytest.raises(TypeError):
+      WorkerPool("account")
+
+    with pytest.raises(ValueError):
+      WorkerPool(account, 0)
+
+  def test_download_genre(self, site, account, monkeypatch):
+    finished = []
+    monkeypatch.setattr(account, "finish_crawl", lambda: finished.append(True))
+
+    with WorkerPool(account, 3, driver_factory=FakeDriver) as pool:
+      drivers = [worker.driver for worker in pool.workers]
+      assert all(worker.local_library is account.local_library for worker in pool.workers)
+      assert pool.download_genre(site.genre_url(), site.pages) == []
+    account.http_downloader.close()
+
+    # Every page is crawled by exactly one worker
+    pages = [int(dict(parse_qsl(urlsplit(url).query))["page"]) for driver in drivers for url in driver.pages if "page=" in url]
+    assert sorted(pages) == list(range(1, site.pages + 1))
+
+    # Rows shown on two pages are fetched once through the shared library
+    fetched = collections.Counter(unquote(path[len("/download/"):]) for path in site.requests if path.startswith("/download/"))
+    assert fetched and max(fetched.values()) == 1
+    repeated = "{}-{}".format(unquote(FakeSite.GENRE), site.rows_per_page - 1)
+    assert any(song_id.startswith(repeated + ":") for song_id in fetched)
+
+    # The crawl is finished once, when the pool closes
+    assert finished == [True]
+
+  def test_shares_account_state(self, account):
+    failed = []
+    account.failure_listeners.append(failed.append)
+
+    with WorkerPool(account, 2, driver_factory=FakeDriver) as pool:
+      worker = pool.workers[0]
+      assert worker.journal is account.journal and worker.requeues is account.requeues
+
+      # A worker's failures and confirmations reach the account
+      row = {"name": "Song", "artists": ["Artist"], "versions": {"Dirty": "1-0-0"}, "urls": {}}
+      song = Song.from_row(worker.driver, row, "Dirty")
+      worker._report_http_download(song, OSError("reset"))
+      worker._report_http_download(Song.from_row(worker.driver, dict(row, name="Other"), "Dirty"), None)
+      assert failed == [song]
+      assert ("Artist - Other", "Other (Dirty)") in account.confirmed()
+    account.http_downloader.close()
+
+  def test_finishes_scheduled_crawl_once(self, site, account, monkeypatch):
+    finished = []
+    monkeypatch.setattr(account, "finish_crawl", lambda: finished.append(True))
+
+    with WorkerPool(account, 2, driver_factory=FakeDriver) as pool:
+      scheduler = CrawlScheduler(pool, quota=100)
+      scheduler.add(site.genre_url(), 2)
+      scheduler.run()
+      assert finished == [True]
+    account.http_downloader.close()
+
+    assert finished == [True]
+    assert account.failure_listeners == []
+
+  def test_default_driver_downloads_to_account(self, account, monkeypatch):
+    created = []
+    monkeypatch.setattr(worker_pool_module, "Firefox", lambda profile, options: created.append((profile, options)))
+
+    WorkerPool(account, 1).driver_factory()
+    profile, options = created[0]
+    assert profile.default_preferences["browser.download.dir"] == account.download_path
+    assert options.headless